@@ -0,0 +1,68 @@
+"""
+Benchmark: JSON encode/decode throughput over representative A2UI payloads.
+
+Payloads are full /agent/query results built from generate_a2ui_for_intent
+for every manifest intent plus the fallback surface. Each installed codec
+backend (stdlib, orjson, msgspec) is measured, along with the pre-rendered
+surface path used by /agent/query.
+
+    PYTHONPATH=src python benchmarks/bench_codec.py [iterations]
+"""
+import importlib.util
+import sys
+import time
+
+from backend import codec
+from backend.domain_config import DOMAIN_CONFIG, get_source_attribution
+from backend.intelligence import IntelligenceOrchestrator
+from backend.surfaces import encode_result
+
+
+def build_payloads():
+    orchestrator = IntelligenceOrchestrator(model_factory=object)
+    payloads = []
+    for intent in [i["name"] for i in DOMAIN_CONFIG["intents"]] + ["general"]:
+        context = f"{intent} metrics, GOOGL, roadmap"
+        payloads.append({
+            "intent": intent,
+            "text": f"Here is what I found about {intent}.",
+            "surface": orchestrator.generate_a2ui_for_intent(intent, context),
+            "source": get_source_attribution(context),
+        })
+    return payloads
+
+
+def measure(fn, payloads, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for payload in payloads:
+            fn(payload)
+    elapsed = time.perf_counter() - start
+    return iterations * len(payloads) / elapsed
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    payloads = build_payloads()
+    # Plain dicts, so the backends are compared on identical work
+    plain = [codec.loads(codec.dumps(p)) for p in payloads]
+    encoded_size = sum(len(codec.dumps(p)) for p in plain) / len(plain)
+    print(f"{len(payloads)} payloads, avg {encoded_size:.0f} bytes, {iterations} iterations, active codec: {codec.BACKEND}")
+    print(f"{'backend':<10} {'encode/s':>12} {'decode/s':>12}")
+
+    for name in ("stdlib", "orjson", "msgspec"):
+        if name != "stdlib" and importlib.util.find_spec(name) is None:
+            print(f"{name:<10} {'not installed':>12}")
+            continue
+        _, dumps, loads = codec._load_backend(name)
+        blobs = [dumps(p) for p in plain]
+        encode_rate = measure(dumps, plain, iterations)
+        decode_rate = measure(loads, blobs, iterations)
+        print(f"{name:<10} {encode_rate:12,.0f} {decode_rate:12,.0f}")
+
+    rate = measure(encode_result, payloads, iterations)
+    print(f"{'rendered':<10} {rate:12,.0f} {'-':>12}   (encode_result with pre-rendered surfaces, {codec.BACKEND})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,437 @@
+"""
+Load test: throughput and latency of the query path against a deterministic fake model.
+
+The fake stands in for GenerativeModel: a seeded latency distribution
+(fixed, uniform or lognormal around --latency), chunked streaming with a
+per-chunk delay, and injected transient errors. Nothing touches the network
+except the local HTTP hop, so it runs offline.
+
+Targets:
+- orchestrator: IntelligenceOrchestrator directly (no web stack needed),
+- asgi: the FastAPI app in-process through httpx.ASGITransport,
+- uvicorn: the app on a local uvicorn server in a background thread.
+
+N clients send requests back to back. Reported per scenario: RPS,
+p50/p95/p99 latency, fallback answers and HTTP errors, event-loop lag on
+the loop serving requests (sampled every 10 ms), and mean traced
+allocation per request (a separate sequential pass under tracemalloc, so
+it does not skew the timings).
+
+--cold measures start-up instead of throughput, on fresh orchestrators:
+the first query with no warm-up, the first query after `warm_up()`, and
+warm p50 (sequential). --model-init makes fake model construction take
+that long, standing in for SDK model creation.
+
+--save-baseline writes the results to a JSON file; --check compares
+against one and exits 1 when RPS, p95 or allocations regress by more than
+--tolerance. Timings are only comparable on the same machine; CI should
+keep its own baseline.
+
+    PYTHONPATH=src python benchmarks/bench_load.py [--target orchestrator|asgi|uvicorn] [--stream]
+        [--concurrency 32] [--requests 2000] [--latency 0.05] [--distribution fixed|uniform|lognormal]
+        [--chunk-size 16] [--chunk-delay 0.002] [--error-rate 0] [--seed 1]
+        [--cold [--cold-runs 5] [--model-init 0.2]]
+        [--save-baseline benchmarks/baseline.json | --check benchmarks/baseline.json [--tolerance 0.25]]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from types import SimpleNamespace
+from typing import Any, Awaitable, Callable, Dict, List
+
+# Every request should reach the fake model
+os.environ.setdefault("RESPONSE_CACHE_TTL_SECONDS", "0")
+
+from backend.intelligence import IntelligenceOrchestrator
+
+MIX = [
+    ("is it sunny or cloudy outside", "weather"),
+    ("GOOGL stock price", "stock"),
+    ("what time is it, check the clock", "time"),
+    ("list the team projects", "directory"),
+    ("show growth metrics and stats", "analytics"),
+    ("what is our roadmap and strategy", "vision"),
+    ("hello there", "greeting"),
+    ("how do I write a good postmortem", "general"),
+]
+TRUTH = dict(MIX)
+
+LAG_INTERVAL = 0.01
+ALLOC_SAMPLES = 100
+
+
+class ServiceUnavailable(Exception):
+    """Named like the Vertex SDK error, so it is retried as transient."""
+    code = 503
+
+
+def fake_model_factory(args) -> Callable[..., Any]:
+    rng = random.Random(args.seed)
+
+    def latency() -> float:
+        if args.distribution == "uniform":
+            return rng.uniform(0.5 * args.latency, 1.5 * args.latency)
+        if args.distribution == "lognormal":
+            # Median at --latency with a long right tail
+            return args.latency * rng.lognormvariate(0, 0.5)
+        return args.latency
+
+    class FakeModel:
+        def __init__(self, model_name, system_instruction):
+            self.model_name = model_name
+            time.sleep(args.model_init)  # blocking, like SDK model construction
+
+        @staticmethod
+        def _answer(contents) -> str:
+            query = contents[-1]["parts"][0]["text"]
+            intent = TRUTH.get(query.split(" #")[0], "general")
+            text = f"Here is a concise answer about {intent} for: {query}. " * 3
+            return json.dumps({"intent": intent, "text": text, "keywords": query})
+
+        async def generate_content_async(self, contents, generation_config=None, stream=False):
+            if rng.random() < args.error_rate:
+                await asyncio.sleep(latency() / 2)
+                raise ServiceUnavailable("injected failure")
+            payload = self._answer(contents)
+            if not stream:
+                await asyncio.sleep(latency())
+                return SimpleNamespace(text=payload)
+
+            async def chunks():
+                await asyncio.sleep(latency())  # time to first token
+                for i in range(0, len(payload), args.chunk_size):
+                    await asyncio.sleep(args.chunk_delay)
+                    yield SimpleNamespace(text=payload[i:i + args.chunk_size])
+            return chunks()
+
+    return FakeModel
+
+
+class LagMonitor:
+    """Samples how late the event loop wakes up from a short sleep."""
+    def __init__(self):
+        self.samples: List[float] = []
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(LAG_INTERVAL)
+            self.samples.append(max(loop.time() - start - LAG_INTERVAL, 0))
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def query_for(n: int) -> str:
+    # Distinct per request, so coalescing does not merge clients
+    return f"{MIX[n % len(MIX)][0]} #{n}"
+
+
+# -- targets -----------------------------------------------------------------
+# Each returns a `send(n) -> "ok" | "fallback" | "error"` coroutine function
+
+def orchestrator_target(orchestrator: IntelligenceOrchestrator, stream: bool) -> Callable[[int], Awaitable[str]]:
+    async def send(n: int) -> str:
+        if stream:
+            result = None
+            async for event in orchestrator.stream_query(query_for(n)):
+                if event["type"] == "done":
+                    result = event["result"]
+        else:
+            result = await orchestrator.process_query(query_for(n))
+        return "fallback" if result["text"].startswith("Running in fallback mode") else "ok"
+    return send
+
+
+def http_target(client, stream: bool) -> Callable[[int], Awaitable[str]]:
+    path = "/agent/query/stream" if stream else "/agent/query"
+
+    async def send(n: int) -> str:
+        response = await client.post(path, json={"query": query_for(n)})
+        if response.status_code != 200:
+            return "error"
+        body = response.text
+        if stream:
+            body = json.loads(body.strip().rsplit("\n", 1)[-1])["result"]["text"]
+        return "fallback" if "Running in fallback mode" in body else "ok"
+    return send
+
+
+# -- driver ------------------------------------------------------------------
+
+async def drive(send: Callable[[int], Awaitable[str]], concurrency: int, total: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    outcomes = {"ok": 0, "fallback": 0, "error": 0}
+    counter = iter(range(total))
+
+    async def client():
+        for n in counter:
+            start = time.perf_counter()
+            try:
+                outcome = await send(n)
+            except Exception:
+                outcome = "error"
+            latencies.append(time.perf_counter() - start)
+            outcomes[outcome] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": total,
+        "rps": round(total / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "fallbacks": outcomes["fallback"],
+        "errors": outcomes["error"],
+    }
+
+
+async def measure_allocations(send: Callable[[int], Awaitable[str]], offset: int) -> float:
+    """Mean peak traced KiB per request, one request at a time."""
+    peaks = []
+    tracemalloc.start()
+    try:
+        for n in range(offset, offset + ALLOC_SAMPLES):
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            await send(n)
+            peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    finally:
+        tracemalloc.stop()
+    return round(statistics.mean(peaks) / 1024, 1)
+
+
+def summarize_lag(monitor: LagMonitor) -> Dict[str, float]:
+    ordered = sorted(monitor.samples)
+    return {
+        "loop_lag_p99_ms": round(percentile(ordered, 0.99) * 1000, 2),
+        "loop_lag_max_ms": round((ordered[-1] if ordered else 0.0) * 1000, 2),
+    }
+
+
+async def run_in_loop(send, args) -> Dict[str, Any]:
+    """Clients and the code under test share this loop (orchestrator and asgi targets)."""
+    await drive(send, args.concurrency, min(args.requests, args.concurrency * 4))  # warm-up
+    monitor = LagMonitor()
+    monitor.start()
+    try:
+        result = await drive(send, args.concurrency, args.requests)
+    finally:
+        monitor.stop()
+    result.update(summarize_lag(monitor))
+    result["alloc_kib_per_request"] = await measure_allocations(send, args.requests)
+    return result
+
+
+def build_app(args):
+    from backend import agent
+
+    logging.getLogger("backend").setLevel(logging.WARNING)  # per-request INFO lines would dominate
+    os.chdir(tempfile.mkdtemp(prefix="bench-load-"))        # interaction log lands here
+    agent.orchestrator = IntelligenceOrchestrator(model_factory=fake_model_factory(args))
+    return agent
+
+
+def run_orchestrator(args) -> Dict[str, Any]:
+    orchestrator = IntelligenceOrchestrator(model_factory=fake_model_factory(args))
+    try:
+        return asyncio.run(run_in_loop(orchestrator_target(orchestrator, args.stream), args))
+    finally:
+        orchestrator.shutdown()
+
+
+def run_asgi(args) -> Dict[str, Any]:
+    import httpx
+
+    agent = build_app(args)
+
+    async def main():
+        transport = httpx.ASGITransport(app=agent.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            return await run_in_loop(http_target(client, args.stream), args)
+
+    try:
+        return asyncio.run(main())
+    finally:
+        agent.orchestrator.shutdown()
+
+
+def run_uvicorn(args) -> Dict[str, Any]:
+    import httpx
+    import uvicorn
+
+    agent = build_app(args)
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(agent.app, host="127.0.0.1", port=port, log_level="warning", access_log=False))
+    monitor = LagMonitor()
+
+    async def serve():
+        monitor.start()  # on the server's loop, not the clients'
+        try:
+            await server.serve()
+        finally:
+            monitor.stop()
+
+    thread = threading.Thread(target=asyncio.run, args=(serve(),), daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+
+    async def main():
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+            send = http_target(client, args.stream)
+            await drive(send, args.concurrency, min(args.requests, args.concurrency * 4))  # warm-up
+            monitor.samples.clear()
+            result = await drive(send, args.concurrency, args.requests)
+            result.update(summarize_lag(monitor))
+            result["alloc_kib_per_request"] = await measure_allocations(send, args.requests)
+            return result
+
+    try:
+        return asyncio.run(main())
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+def run_cold(args) -> Dict[str, Any]:
+    """First-query latency without and with warm-up, against warm p50."""
+    async def first_query(warm: bool):
+        orchestrator = IntelligenceOrchestrator(model_factory=fake_model_factory(args))
+        warmup_ms = 0.0
+        if warm:
+            start = time.perf_counter()
+            await orchestrator.warm_up()
+            warmup_ms = (time.perf_counter() - start) * 1000
+        send = orchestrator_target(orchestrator, args.stream)
+        start = time.perf_counter()
+        await send(0)
+        return orchestrator, send, (time.perf_counter() - start) * 1000, warmup_ms
+
+    async def main():
+        cold, warmed, warmups, steady = [], [], [], []
+        for run in range(args.cold_runs):
+            orchestrator, _, first_ms, _ = await first_query(warm=False)
+            orchestrator.shutdown()
+            cold.append(first_ms)
+            orchestrator, send, first_ms, warmup_ms = await first_query(warm=True)
+            warmed.append(first_ms)
+            warmups.append(warmup_ms)
+            for n in range(1, 21):
+                start = time.perf_counter()
+                await send(n)
+                steady.append((time.perf_counter() - start) * 1000)
+            orchestrator.shutdown()
+        return {
+            "runs": args.cold_runs,
+            "cold_first_ms": round(statistics.median(cold), 2),
+            "warmed_first_ms": round(statistics.median(warmed), 2),
+            "warm_p50_ms": round(statistics.median(steady), 2),
+            "warmup_ms": round(statistics.median(warmups), 2),
+        }
+
+    return asyncio.run(main())
+
+
+TARGETS = {"orchestrator": run_orchestrator, "asgi": run_asgi, "uvicorn": run_uvicorn}
+
+# metric -> True when higher is better
+CHECKED = {"rps": True, "p95_ms": False, "alloc_kib_per_request": False}
+
+
+def check(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    regressions = []
+    for scenario, result in results.items():
+        base = baseline.get(scenario)
+        if base is None:
+            continue
+        for metric, higher_is_better in CHECKED.items():
+            old, new = base.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (change < -tolerance) if higher_is_better else (change > tolerance):
+                regressions.append(f"{scenario}: {metric} {old} -> {new} ({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--target", choices=list(TARGETS) + ["all"], default="orchestrator")
+    parser.add_argument("--stream", action="store_true", help="use the streaming endpoint")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.05, help="fake model latency in seconds")
+    parser.add_argument("--distribution", choices=["fixed", "uniform", "lognormal"], default="fixed")
+    parser.add_argument("--chunk-size", type=int, default=16)
+    parser.add_argument("--chunk-delay", type=float, default=0.002)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--cold", action="store_true", help="measure first-query latency with and without warm-up")
+    parser.add_argument("--cold-runs", type=int, default=5)
+    parser.add_argument("--model-init", type=float, default=0.0, help="fake model construction time in seconds")
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--check", metavar="PATH")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    targets = list(TARGETS) if args.target == "all" else [args.target]
+    results = {}
+    if args.cold:
+        if args.target != "orchestrator":
+            parser.error("--cold runs against the orchestrator target only")
+        scenario = f"orchestrator/cold/{'stream' if args.stream else 'query'}"
+        results[scenario] = run_cold(args)
+        print(f"{scenario:<28} {json.dumps(results[scenario])}")
+        targets = []
+    for target in targets:
+        scenario = f"{target}/{'stream' if args.stream else 'query'}/c{args.concurrency}"
+        results[scenario] = TARGETS[target](args)
+        print(f"{scenario:<28} {json.dumps(results[scenario])}")
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.save_baseline):
+            with open(args.save_baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.save_baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+    if args.check:
+        with open(args.check) as f:
+            regressions = check(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Load benchmark: allocations per /agent/query request, before and after the
+typed models.
+
+"before" copies the request and every history message into dicts (the old
+`request.dict()` / `[m.dict() for m in history]` path); "after" passes the
+request models straight to the orchestrator. Both run `concurrency` queries
+at a time through process_query against an in-process fake model, under
+tracemalloc. Also reports the retained size of validated surfaces versus
+the equivalent plain dicts.
+
+    PYTHONPATH=src python benchmarks/bench_models.py [requests] [concurrency]
+
+History turns are schemas.Message; the request is validated by a pydantic
+model when installed (as in the server).
+"""
+import asyncio
+import json
+import os
+import sys
+import tracemalloc
+from types import SimpleNamespace
+from typing import List
+
+# Isolate the request path from response caching
+os.environ.setdefault("RESPONSE_CACHE_TTL_SECONDS", "0")
+
+from backend.intelligence import IntelligenceOrchestrator
+from backend.schemas import Message, validate_surface
+from backend.surfaces import SURFACE_TEMPLATES
+
+try:
+    from pydantic import BaseModel
+
+    class ChatRequest(BaseModel):
+        query: str
+        history: List[Message] = []
+
+    def to_dict(model):
+        return model.model_dump() if hasattr(model, "model_dump") else model.to_dict()
+except ImportError:
+    ChatRequest = SimpleNamespace
+
+    def to_dict(model):
+        return model.to_dict() if hasattr(model, "to_dict") else {"query": model.query, "history": [m.to_dict() for m in model.history]}
+
+
+REPLY = json.dumps({"intent": "analytics", "text": "Here are the metrics.", "keywords": "revenue"})
+
+
+class FakeModel:
+    def __init__(self, model_name, system_instruction):
+        pass
+
+    async def generate_content_async(self, contents, generation_config=None):
+        await asyncio.sleep(0)
+        return SimpleNamespace(text=REPLY)
+
+
+def make_request(i):
+    history = [Message("user" if t % 2 == 0 else "model", f"turn {t} of conversation {i} " * 8) for t in range(10)]
+    return ChatRequest(query=f"show revenue for region {i}", history=history)
+
+
+async def handle_before(orchestrator, request, sink):
+    sink.append(to_dict(request))
+    history = [to_dict(m) for m in request.history]
+    return await orchestrator.process_query(request.query, history)
+
+
+async def handle_after(orchestrator, request, sink):
+    sink.append(request)
+    return await orchestrator.process_query(request.query, request.history)
+
+
+async def drive(handler, requests, concurrency):
+    orchestrator = IntelligenceOrchestrator(model_factory=FakeModel)
+    sink = []  # stands in for the interaction log queue
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(request):
+        async with semaphore:
+            await handler(orchestrator, request, sink)
+
+    await asyncio.gather(*(one(r) for r in requests))
+    orchestrator.shutdown()
+
+
+def measure(label, handler, count, concurrency):
+    requests = [make_request(i) for i in range(count)]
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    asyncio.run(drive(handler, requests, concurrency))
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<8} retained {(current - before) / count:10,.0f} B/req   peak {(peak - before) / 1024:10,.0f} KiB")
+
+
+def surface_footprint(count):
+    templates = list(SURFACE_TEMPLATES.values())
+    for label, build in (("dicts", lambda t: json.loads(json.dumps(t))), ("typed", validate_surface)):
+        tracemalloc.start()
+        kept = [build(templates[i % len(templates)]) for i in range(count)]
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"{label:<8} {size / count:10,.0f} B/surface")
+        del kept
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    print(f"{count} requests, concurrency {concurrency}, request model: {ChatRequest.__module__}.{ChatRequest.__name__}")
+    measure("before", handle_before, count, concurrency)
+    measure("after", handle_after, count, concurrency)
+    surface_footprint(count)
+
+
+if __name__ == "__main__":
+    main()
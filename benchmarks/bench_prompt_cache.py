@@ -0,0 +1,67 @@
+"""
+Micro-benchmark: per-request prompt/model setup overhead in the orchestrator.
+
+"before" rebuilds the system prompt and constructs a model on every request
+(the original process_query behaviour); "after" goes through the cache keyed
+on (model name, manifest fingerprint).
+
+    PYTHONPATH=src python benchmarks/bench_prompt_cache.py [iterations]
+
+Uses the real GenerativeModel constructor when the Vertex SDK is installed
+(construction makes no network calls), otherwise a trivial stand-in.
+"""
+import asyncio
+import sys
+import time
+
+from backend import intelligence
+from backend.intelligence import IntelligenceOrchestrator
+
+
+class StandInModel:
+    def __init__(self, model_name, system_instruction):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+
+
+def bench(label, fn, iterations):
+    """`fn` is a function or a coroutine function; the loop's own overhead is not timed."""
+    async def run():
+        if asyncio.iscoroutinefunction(fn):
+            await fn()  # warm up
+            start = time.perf_counter()
+            for _ in range(iterations):
+                await fn()
+        else:
+            fn()  # warm up
+            start = time.perf_counter()
+            for _ in range(iterations):
+                fn()
+        return time.perf_counter() - start
+
+    per_call_us = asyncio.run(run()) / iterations * 1e6
+    print(f"{label:<8} {per_call_us:10.2f} us/request")
+    return per_call_us
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    factory = None if intelligence.HAS_VERTEX else StandInModel
+    orchestrator = IntelligenceOrchestrator(model_factory=factory)
+    orchestrator._ensure_init()
+    model_cls = intelligence.GenerativeModel if intelligence.HAS_VERTEX else StandInModel
+
+    def before():
+        return model_cls(model_name=orchestrator.model_name, system_instruction=orchestrator._build_system_prompt())
+
+    async def after():
+        return await orchestrator._get_model()
+
+    print(f"model: {model_cls.__module__}.{model_cls.__name__}, iterations: {iterations}")
+    slow = bench("before", before, iterations)
+    fast = bench("after", after, iterations)
+    print(f"speedup  {slow / fast:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
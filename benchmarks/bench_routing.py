@@ -0,0 +1,93 @@
+"""
+Benchmark: single-model vs routed latency and estimated cost on a query mix.
+
+Fake models sleep for a per-model latency (scaled down from typical
+Gemini figures) and answer with the query's true intent. "single" sends
+everything to the manifest's standard route; "routed" applies
+DOMAIN_CONFIG["routing"] as shipped; "escalate" also re-asks open-ended
+queries the small model answered "general" (GENAI_ROUTING_ESCALATION).
+Costs use the manifest's per-route prices and the router's token counts.
+
+    PYTHONPATH=src python benchmarks/bench_routing.py [rounds]
+"""
+import asyncio
+import copy
+import json
+import os
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+os.environ.setdefault("RESPONSE_CACHE_TTL_SECONDS", "0")
+os.environ["GENAI_ROUTING"] = "true"
+
+from backend.domain_config import DOMAIN_CONFIG
+from backend.intelligence import IntelligenceOrchestrator
+
+LATENCY = {"gemini-1.5-flash-8b": 0.04, "gemini-1.5-flash": 0.08, "gemini-1.5-pro": 0.30}
+
+# (query, true intent): mostly lookups, some open-ended questions
+MIX = [
+    ("is it sunny or cloudy outside", "weather"),
+    ("GOOGL stock price", "stock"),
+    ("what time is it, check the clock", "time"),
+    ("list the team projects", "directory"),
+    ("show growth metrics and stats", "analytics"),
+    ("what is our roadmap and strategy", "vision"),
+    ("hello there", "greeting"),
+    ("how do I write a good postmortem", "general"),
+    ("what time is it", "time"),
+    ("summarize what changed since last quarter", "general"),
+]
+TRUTH = dict(MIX)
+
+
+class FakeModel:
+    def __init__(self, model_name, system_instruction):
+        self.model_name = model_name
+
+    async def generate_content_async(self, contents, generation_config=None):
+        await asyncio.sleep(LATENCY[self.model_name])
+        query = contents[-1]["parts"][0]["text"]
+        intent = TRUTH[query]
+        text = f"A concise answer about {intent} for: {query}"
+        return SimpleNamespace(text=json.dumps({"intent": intent, "text": text, "keywords": query}))
+
+
+def run(label, routing, rounds, escalate=False):
+    DOMAIN_CONFIG["routing"] = routing
+    os.environ["GENAI_ROUTING_ESCALATION"] = "true" if escalate else "false"
+    orchestrator = IntelligenceOrchestrator(model_factory=FakeModel)
+    latencies = []
+
+    async def drive():
+        for _ in range(rounds):
+            for query, _ in MIX:
+                start = time.perf_counter()
+                await orchestrator.process_query(query)
+                latencies.append(time.perf_counter() - start)
+
+    asyncio.run(drive())
+    stats = orchestrator.router.snapshot()
+    cost = sum(route["cost_usd"] for route in stats.values())
+    calls = {name: route["calls"] for name, route in stats.items() if route["calls"]}
+    latencies.sort()
+    p95 = latencies[int(0.95 * (len(latencies) - 1))]
+    print(f"{label:<8} p50 {statistics.median(latencies) * 1000:7.1f} ms   p95 {p95 * 1000:7.1f} ms   "
+          f"cost/1k queries ${cost / len(latencies) * 1000:.4f}   calls {calls}")
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    shipped = copy.deepcopy(DOMAIN_CONFIG["routing"])
+    single = {"default_route": "standard", "routes": {"standard": shipped["routes"]["standard"]}}
+    print(f"{len(MIX)} queries x {rounds} rounds")
+    run("single", single, rounds)
+    run("routed", shipped, rounds)
+    run("escalate", shipped, rounds, escalate=True)
+    DOMAIN_CONFIG["routing"] = shipped
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Multi-worker scaling: throughput of `python -m backend.server` at 1, 2, 4... workers.
+
+Each run starts the production entry point as a subprocess with
+WEB_CONCURRENCY set, serving this module's `app`: the real FastAPI app
+with bench_load's fake model swapped in, built inside each worker. A
+short fake-model latency keeps the server CPU-bound (JSON, pydantic,
+surface rendering), which is the work extra workers spread across cores.
+
+Load comes from several client processes, so the client is not the
+bottleneck; each drives --concurrency / --client-processes connections.
+The server is stopped with SIGTERM, which also exercises the graceful
+drain; its exit status is reported.
+
+    PYTHONPATH=src python benchmarks/bench_workers.py [--workers 1,2,4] [--concurrency 64]
+        [--requests 4000] [--client-processes 4] [--latency 0.005] [--stream]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+import bench_load
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(os.path.dirname(HERE), "src")
+
+
+def __getattr__(name: str):
+    """`bench_workers:app`, built on first access inside each server worker."""
+    if name != "app":
+        raise AttributeError(name)
+    args = SimpleNamespace(**json.loads(os.environ["BENCH_WORKERS_MODEL"]))
+    app = bench_load.build_app(args).app
+    globals()["app"] = app
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_serving(port: int, timeout: float = 60.0):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/ready", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def client_process(port: int, stream: bool, concurrency: int, first: int, total: int) -> List[Any]:
+    """Runs in its own process; returns [latencies, outcomes]."""
+    import httpx
+
+    async def main():
+        latencies: List[float] = []
+        outcomes = {"ok": 0, "fallback": 0, "error": 0}
+        counter = iter(range(first, first + total))
+        limits = httpx.Limits(max_connections=concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+            send = bench_load.http_target(client, stream)
+
+            async def worker():
+                for n in counter:
+                    start = time.perf_counter()
+                    try:
+                        outcome = await send(n)
+                    except Exception:
+                        outcome = "error"
+                    latencies.append(time.perf_counter() - start)
+                    outcomes[outcome] += 1
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return [latencies, outcomes]
+
+    return asyncio.run(main())
+
+
+def drive(pool, args, port: int, total: int) -> Dict[str, Any]:
+    per_process = max(1, args.concurrency // args.client_processes)
+    share = total // args.client_processes
+    jobs = [(port, args.stream, per_process, i * share, share) for i in range(args.client_processes)]
+    start = time.perf_counter()
+    results = pool.starmap(client_process, jobs)
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for part, _ in results for latency in part)
+    outcomes = {key: sum(counts[key] for _, counts in results) for key in ("ok", "fallback", "error")}
+    return {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(bench_load.percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(bench_load.percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(bench_load.percentile(latencies, 0.99) * 1000, 2),
+        "fallbacks": outcomes["fallback"],
+        "errors": outcomes["error"],
+    }
+
+
+def run_server(workers: int, args, pool) -> Dict[str, Any]:
+    port = free_port()
+    model = {
+        "seed": args.seed, "latency": args.latency, "distribution": "fixed",
+        "chunk_size": 16, "chunk_delay": 0.0, "error_rate": 0.0, "model_init": 0.0,
+    }
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join([SRC, HERE, os.environ.get("PYTHONPATH", "")]),
+        "APP_MODULE": "bench_workers:app",
+        "WEB_CONCURRENCY": str(workers),
+        "HOST": "127.0.0.1",
+        "PORT": str(port),
+        "LOG_LEVEL": "warning",
+        "BENCH_WORKERS_MODEL": json.dumps(model),
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "backend.server"], env=env, cwd=tempfile.mkdtemp(prefix="bench-workers-"),
+    )
+    try:
+        wait_until_serving(port)
+        drive(pool, args, port, min(args.requests, args.concurrency * 4))  # warm-up: every worker
+        result = drive(pool, args, port, args.requests)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            result_code = server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+            result_code = server.wait()
+    result["exit_code"] = result_code
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--stream", action="store_true", help="use the streaming endpoint")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--client-processes", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.005, help="fake model latency in seconds")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs; client processes: {args.client_processes}")
+    baseline_rps = None
+    with multiprocessing.get_context("spawn").Pool(args.client_processes) as pool:
+        for workers in (int(w) for w in args.workers.split(",")):
+            result = run_server(workers, args, pool)
+            baseline_rps = baseline_rps or result["rps"]
+            result["speedup"] = round(result["rps"] / baseline_rps, 2)
+            scenario = f"workers={workers}/{'stream' if args.stream else 'query'}/c{args.concurrency}"
+            print(f"{scenario:<28} {json.dumps(result)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+# =============================================================================
+# ADMISSION CONTROL
+# =============================================================================
+# Sits in front of the model backend. At most `limit` calls run at once;
+# the limit adapts AIMD-style between `min_limit` and `max_limit`:
+# - it grows by about one per round of successful calls at normal latency,
+# - it shrinks by `latency_backoff` when latency exceeds `latency_tolerance`
+#   times the best recent latency, or when the call times out,
+# - it halves on quota errors (HTTP 429 / ResourceExhausted).
+# Excess requests wait in a bounded priority queue, interactive before
+# background. When the queue is full, or a request waits longer than
+# `max_wait`, it is shed immediately with a Retry-After hint instead of
+# piling more load on the backend.
+
+PRIORITIES = {"interactive": 0, "background": 1}
+
+# Latency differences below this are noise, not congestion
+LATENCY_FLOOR_SECONDS = 0.005
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed; `retry_after` is a hint in whole seconds."""
+    def __init__(self, retry_after: int, reason: str):
+        super().__init__(f"Model backend overloaded ({reason}); retry after {retry_after}s")
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+def is_overload_error(error: BaseException) -> bool:
+    """True for quota / rate-limit errors from the Vertex SDK or HTTP clients."""
+    if type(error).__name__ in ("ResourceExhausted", "TooManyRequests"):
+        return True
+    for attr in ("code", "status_code"):
+        if getattr(error, attr, None) == 429:
+            return True
+    return "429" in str(error) or "quota" in str(error).lower()
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_limit: int = 32,
+        min_limit: int = 1,
+        max_queue: int = 100,
+        max_wait: float = 5.0,
+        latency_tolerance: float = 2.0,
+        latency_backoff: float = 0.9,
+        overload_backoff: float = 0.5,
+    ):
+        self.max_limit = max_limit
+        self.min_limit = min(min_limit, max_limit)
+        self.limit = float(max_limit)
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.latency_tolerance = latency_tolerance
+        self.latency_backoff = latency_backoff
+        self.overload_backoff = overload_backoff
+        self.in_flight = 0
+        self._queue: List[Tuple[int, int, asyncio.Future]] = []
+        self._queued = 0
+        self._seq = itertools.count()
+        self._min_latency: Optional[float] = None
+        self._avg_latency: Optional[float] = None
+        self.stats = {"admitted": 0, "queued": 0, "rejected": 0, "timed_out": 0, "overloads": 0, "latency_backoffs": 0}
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        return cls(
+            max_limit=int(os.environ.get("ADMISSION_MAX_INFLIGHT", "32")),
+            min_limit=int(os.environ.get("ADMISSION_MIN_INFLIGHT", "1")),
+            max_queue=int(os.environ.get("ADMISSION_QUEUE_SIZE", "100")),
+            max_wait=float(os.environ.get("ADMISSION_MAX_WAIT_SECONDS", "5")),
+            latency_tolerance=float(os.environ.get("ADMISSION_LATENCY_TOLERANCE", "2.0")),
+        )
+
+    # -- admission -------------------------------------------------------------
+
+    def retry_after(self) -> int:
+        """Rough time for the current queue to drain at the current limit."""
+        per_call = self._avg_latency or 1.0
+        rounds = (self._queued + 1) / max(self.limit, 1.0)
+        return max(1, min(30, math.ceil(rounds * per_call)))
+
+    def _reject(self, reason: str) -> AdmissionRejected:
+        self.stats["rejected"] += 1
+        return AdmissionRejected(self.retry_after(), reason)
+
+    async def acquire(self, priority: str = "interactive"):
+        if self.in_flight < int(self.limit) and self._queued == 0:
+            self.in_flight += 1
+            self.stats["admitted"] += 1
+            return
+        if self._queued >= self.max_queue:
+            raise self._reject("queue full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (PRIORITIES.get(priority, 0), next(self._seq), waiter))
+        self._queued += 1
+        self.stats["queued"] += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up; pass it on
+                self._release()
+            else:
+                waiter.cancel()
+                self._queued -= 1
+            if isinstance(e, asyncio.TimeoutError):
+                self.stats["timed_out"] += 1
+                raise self._reject("queue wait exceeded") from None
+            raise
+        self.stats["admitted"] += 1
+
+    def _release(self):
+        # Hand the slot straight to the next live waiter, if the limit allows
+        while self._queue and self.in_flight <= int(self.limit):
+            _, _, waiter = heapq.heappop(self._queue)
+            if waiter.done():
+                continue  # cancelled or timed out, already uncounted
+            self._queued -= 1
+            waiter.set_result(None)
+            return
+        self.in_flight -= 1
+
+    # -- feedback --------------------------------------------------------------
+
+    def _on_success(self, latency: float):
+        self._avg_latency = latency if self._avg_latency is None else 0.8 * self._avg_latency + 0.2 * latency
+        # Best recent latency, drifting up slowly so the baseline can recover
+        self._min_latency = latency if self._min_latency is None else min(latency, self._min_latency * 1.01)
+        if latency > max(self._min_latency * self.latency_tolerance, LATENCY_FLOOR_SECONDS):
+            self.stats["latency_backoffs"] += 1
+            self.limit = max(self.min_limit, self.limit * self.latency_backoff)
+        else:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+    def _on_error(self, error: BaseException):
+        if is_overload_error(error):
+            self.stats["overloads"] += 1
+            self.limit = max(self.min_limit, self.limit * self.overload_backoff)
+        elif isinstance(error, asyncio.TimeoutError):
+            self.stats["latency_backoffs"] += 1
+            self.limit = max(self.min_limit, self.limit * self.latency_backoff)
+
+    @asynccontextmanager
+    async def admit(self, priority: str = "interactive") -> AsyncIterator[None]:
+        """Holds one slot for the duration of the block and feeds its outcome back into the limit."""
+        await self.acquire(priority)
+        start = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            self._on_error(e)
+            raise
+        else:
+            self._on_success(time.monotonic() - start)
+        finally:
+            self._release()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queue_depth": self._queued,
+            "avg_latency_ms": round((self._avg_latency or 0) * 1000, 1),
+        }
+
+
+def build_admission_from_env() -> Optional[AdmissionController]:
+    """ADMISSION_CONTROL=false disables the limiter."""
+    if os.environ.get("ADMISSION_CONTROL", "true").lower() in ("0", "false", "no"):
+        return None
+    return AdmissionController.from_env()
@@ -1,15 +1,25 @@
-from fastapi import FastAPI, Request
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Awaitable, AsyncIterator, Literal
+import asyncio
 import uvicorn
 import os
-import time
-import json
 import logging
+import time
 
 from .intelligence import IntelligenceOrchestrator
-from .auth_manager import AuthManager
+from .admission import AdmissionRejected
+from .auth_manager import get_auth_manager
+from .interaction_log import InteractionLogger, LogBroadcaster
+from .log_reader import read_log_page
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, AgentMetrics
+from .schemas import Message
+from .surfaces import encode_result
+from .server import install_drain_handler, on_drain
+from . import codec
 
 # Setup Logging (Observability Pattern)
 logging.basicConfig(level=logging.INFO)
@@ -18,7 +28,59 @@ logger = logging.getLogger(__name__)
 # Real-time Message Log for Developer Debugging
 LOG_FILE = "agent-interaction-log.json"
 
-app = FastAPI(title="Agent UI Cockpit Engine")
+# Live tail: keep-alive cadence for idle /agent/logs/stream connections
+LOG_STREAM_KEEPALIVE_SECONDS = 15.0
+
+# How often an in-flight query checks whether its client is still connected
+DISCONNECT_POLL_SECONDS = float(os.environ.get("DISCONNECT_POLL_SECONDS", "0.5"))
+
+# Startup warm-up: SDK init, token, prompt and models before the first query
+# (WARMUP=false skips it); WARMUP_GENERATION=true also sends one generation
+WARMUP = os.environ.get("WARMUP", "true").lower() in ("1", "true", "yes")
+WARMUP_GENERATION = os.environ.get("WARMUP_GENERATION", "false").lower() in ("1", "true", "yes")
+
+# /ready answers 200 once warm and until the server is asked to shut down (see server.py)
+ready = False
+draining = False
+warmup_report: Dict[str, Any] = {}
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+async def warm_up():
+    global ready, warmup_report
+    start = time.perf_counter()
+    if WARMUP:
+        warmup_report = await orchestrator.warm_up(generate=WARMUP_GENERATION)
+        warmup_report["total_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        logger.info(f"Warm-up finished in {warmup_report['total_ms']}ms: {warmup_report['stages_ms']}")
+    ready = True
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _loop
+    _loop = asyncio.get_running_loop()
+    install_drain_handler()
+    lag_monitor = asyncio.create_task(metrics.monitor_event_loop())
+    # In the background, so /health answers while warming and /ready reports progress
+    warming = asyncio.create_task(warm_up())
+    yield
+    warming.cancel()
+    lag_monitor.cancel()
+    orchestrator.shutdown()
+    await auth.stop_background_refresh()
+    # Pending interaction records are written before the process exits
+    await asyncio.to_thread(interaction_logger.stop)
+
+class FastJSONResponse(JSONResponse):
+    """Default response class: encodes through the shared codec (orjson/msgspec when installed)."""
+    def render(self, content: Any) -> bytes:
+        return codec.dumps(content)
+
+class SurfaceJSONResponse(FastJSONResponse):
+    """Serializes orchestrator results, splicing in each surface's pre-rendered JSON."""
+    def render(self, content: Any) -> bytes:
+        return encode_result(content)
+
+app = FastAPI(title="Agent UI Cockpit Engine", lifespan=lifespan, default_response_class=FastJSONResponse)
 
 # Enable CORS for frontend development
 app.add_middleware(
@@ -26,81 +88,324 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Retry-After"],
 )
 
-orchestrator = IntelligenceOrchestrator()
-auth = AuthManager()
+metrics = AgentMetrics()
+orchestrator = IntelligenceOrchestrator(metrics=metrics)
+auth = get_auth_manager()
+log_broadcaster = LogBroadcaster(
+    buffer_size=int(os.environ.get("LOG_STREAM_BUFFER_SIZE", "200")),
+    max_pending=int(os.environ.get("LOG_STREAM_MAX_PENDING", "100")),
+)
+interaction_logger = InteractionLogger.from_env(LOG_FILE, broadcaster=log_broadcaster)
+
+def begin_drain():
+    """
+    Runs from the shutdown signal handler: in-flight queries and streams are
+    left to finish, but live log tails never end on their own and would hold
+    the graceful shutdown open until it times out, so they are closed now.
+    """
+    global draining
+    draining = True
+    if _loop is not None and not _loop.is_closed():
+        _loop.call_soon_threadsafe(log_broadcaster.close_all)
 
-class ChatMessage(BaseModel):
-    role: str
-    text: str
+on_drain(begin_drain)
+
+def register_scrape_time_metrics(registry):
+    """Values owned by other components, read when /metrics is scraped rather than on every request."""
+    registry.gauge("agent_log_queue_depth", "Interaction log records waiting to be written.",
+                   function=lambda: interaction_logger.snapshot()["queue_depth"])
+    registry.counter("agent_log_records_dropped_total", "Interaction log records dropped on overflow.",
+                     function=lambda: interaction_logger.stats["dropped"])
+    registry.gauge("agent_admission_limit", "Adaptive limit on concurrent model calls (0 when disabled).",
+                   function=lambda: orchestrator.admission.limit if orchestrator.admission else 0)
+    registry.gauge("agent_admission_queue_depth", "Queries waiting for a model call slot.",
+                   function=lambda: orchestrator.admission.snapshot()["queue_depth"] if orchestrator.admission else 0)
+    registry.counter("agent_admission_rejected_total", "Queries shed with 503 by admission control.",
+                     function=lambda: orchestrator.admission.stats["rejected"] if orchestrator.admission else 0)
+    registry.gauge("agent_ready", "1 once warmed up and not draining.",
+                   function=lambda: ready and not draining)
+    registry.gauge("agent_model_circuit_open", "1 while the model circuit breaker is not closed.",
+                   function=lambda: orchestrator.resilience.breaker.state != "closed")
+
+register_scrape_time_metrics(metrics.registry)
 
 class ChatRequest(BaseModel):
     query: str
-    history: Optional[List[ChatMessage]] = []
+    # Validated straight into schemas.Message, which flows through unchanged
+    history: Optional[List[Message]] = []
+    # Session mode: the server keeps the conversation and `history` carries only new turns
+    session_id: Optional[str] = None
+
+    # Admission priority when the model backend is saturated
+    priority: Literal["interactive", "background"] = "interactive"
 
 def log_interaction(direction: str, data: Any):
-    """Observability: Logs all agent traffic to a JSON file for local debugging."""
+    """Observability: Logs all agent traffic to a JSON file for local debugging.
+    Records are queued and written in batches off the event loop."""
+    interaction_logger.log(direction, data)
+
+def overloaded_response(error: AdmissionRejected) -> Response:
+    """Fast 503 for shed requests; clients back off for Retry-After seconds."""
+    return FastJSONResponse(
+        {"detail": str(error), "retry_after": error.retry_after},
+        status_code=503,
+        headers={"Retry-After": str(error.retry_after)},
+    )
+
+class ClientDisconnected(Exception):
+    """Raised when the HTTP client goes away before its query finished."""
+
+async def run_until_disconnected(http_request: Request, work: Awaitable[Any]) -> Any:
+    """
+    Awaits `work`, cancelling it if the client goes away first.
+    Raises ClientDisconnected when the client went away.
+    """
+    task = asyncio.ensure_future(work)
     try:
-        log_entry = {
-            "timestamp": time.time(),
-            "direction": direction,
-            "data": data
-        }
-        with open(LOG_FILE, "a") as f:
-            f.write(json.dumps(log_entry) + "\n")
-    except:
-        pass
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                logger.info("Client disconnected, cancelling in-flight query")
+                task.cancel()
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
 
 @app.get("/health")
 async def health():
-    return {"status": "healthy", "project": auth.get_project_id()}
+    return {"status": "healthy", "project": await auth.get_project_id_async()}
+
+@app.get("/ready")
+async def readiness():
+    """
+    Readiness, distinct from /health (liveness): 503 until the startup
+    warm-up has finished and again once the server starts draining, so
+    traffic only reaches instances that will answer without cold-start costs.
+    """
+    if draining:
+        return JSONResponse({"status": "draining"}, status_code=503)
+    if not ready:
+        return JSONResponse({"status": "warming"}, status_code=503)
+    return {"status": "ready", "warmup": warmup_report}
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus scrape endpoint: request/model latency histograms, tokens, fallbacks, queues, loop lag."""
+    return Response(metrics.registry.render(), media_type=METRICS_CONTENT_TYPE)
 
 @app.get("/agent/logs")
-async def get_logs():
-    """Retrieve the latest interaction logs for debugging."""
-    if not os.path.exists(LOG_FILE):
-        return []
-    try:
-        with open(LOG_FILE, "r") as f:
-            lines = f.readlines()
-            return [json.loads(line) for line in lines[-50:]]  # Return last 50
-    except:
-        return []
+async def get_logs(
+    response: Response,
+    limit: int = Query(50, ge=1, le=1000),
+    since: Optional[float] = None,
+    direction: Literal["backward", "forward"] = "backward",
+    cursor: Optional[int] = Query(None, ge=0),
+):
+    """
+    Retrieve interaction logs for debugging, newest page by default.
+    Reads only the requested page from disk regardless of log size. The
+    `X-Next-Cursor` header continues the listing in the same direction.
+    """
+    page = await asyncio.to_thread(read_log_page, LOG_FILE, limit, since, direction, cursor)
+    if page.next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(page.next_cursor)
+    return page.records
+
+@app.get("/agent/cache/stats")
+async def cache_stats():
+    """Response cache hit/miss counters, for tuning TTL and similarity thresholds."""
+    cache = orchestrator.response_cache
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.snapshot()}
+
+@app.get("/agent/coalesce/stats")
+async def coalesce_stats():
+    """Request coalescing: leader calls, followers that shared them, and calls in flight."""
+    coalescer = orchestrator.coalescer
+    if coalescer is None:
+        return {"enabled": False}
+    return {"enabled": True, **coalescer.snapshot()}
+
+@app.get("/agent/admission/stats")
+async def admission_stats():
+    """Admission control: current adaptive limit, queue depth and shed counts."""
+    admission = orchestrator.admission
+    if admission is None:
+        return {"enabled": False}
+    return {"enabled": True, **admission.snapshot()}
+
+@app.get("/agent/resilience/stats")
+async def resilience_stats():
+    """Model call retries, hedges and circuit breaker state."""
+    return orchestrator.resilience.snapshot()
+
+@app.get("/agent/routing/stats")
+async def routing_stats():
+    """Per-route model, call counts, escalations, latency percentiles and estimated cost."""
+    router = orchestrator.router
+    if router is None:
+        return {"enabled": False, "model": orchestrator.model_name}
+    return {"enabled": True, "routes": router.snapshot()}
+
+@app.get("/agent/tracing/stats")
+async def tracing_stats():
+    """Tracing: exporter, sample rate, spans recorded, exported and dropped."""
+    return orchestrator.tracer.snapshot()
+
+@app.get("/agent/history/stats")
+async def history_stats():
+    """Conversation history manager: session store and summarization counters."""
+    return orchestrator.history.snapshot()
+
+@app.delete("/agent/session/{session_id}", status_code=204)
+async def end_session(session_id: str):
+    """Drops a session's server-side history."""
+    await orchestrator.history.forget(session_id)
+    return Response(status_code=204)
 
 @app.post("/agent/debug/reset")
 async def reset_debug():
     """Resets the debug log file."""
-    try:
-        if os.path.exists(LOG_FILE):
-            os.remove(LOG_FILE)
-        return {"status": "reset"}
-    except:
+    interaction_logger.reset()
+    if not await asyncio.to_thread(interaction_logger.flush):
         return {"status": "error"}
+    return {"status": "reset"}
 
-@app.post("/agent/query")
-async def chat(request: ChatRequest):
+@app.get("/agent/logs/stats")
+async def log_stats():
+    """Interaction logger counters: queue depth, drops, batches, rotations."""
+    return {
+        **interaction_logger.snapshot(),
+        "stream": {**log_broadcaster.stats, "subscribers": log_broadcaster.subscriber_count},
+    }
+
+@app.get("/agent/logs/stream")
+async def stream_logs(replay: int = Query(0, ge=0, le=1000), since: Optional[float] = None):
+    """
+    Live tail of agent traffic as Server-Sent Events, pushed as records are
+    logged. `replay` first sends up to that many recent records from memory,
+    with `since` only those newer than that timestamp, so a client that
+    reopens the stream from its last record neither misses nor repeats any.
+    Clients that fall too far behind receive a `dropped` event and are disconnected.
+    """
+    subscription = log_broadcaster.subscribe(replay, since)
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            while True:
+                try:
+                    payload = await asyncio.wait_for(subscription.get(), timeout=LOG_STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if payload is None:
+                    if subscription.overflowed:
+                        yield "event: dropped\ndata: {}\n\n"
+                    return
+                yield f"data: {payload}\n\n"
+        finally:
+            subscription.close()
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.post("/agent/query", response_class=SurfaceJSONResponse)
+async def chat(request: ChatRequest, http_request: Request):
     """
     The Main Entry Point.
     Implements the 'Bridge Agent' pattern: Intent Detection -> A2UI Surface.
     """
     logger.info(f"Query received: {request.query}")
     
-    # Log incoming request
-    log_interaction("CLIENT_TO_SERVER", request.dict())
+    # Log incoming request (the codec serializes the model directly, no intermediate dict)
+    log_interaction("CLIENT_TO_SERVER", request)
     
     # Process through the Intelligence Orchestrator
-    # Convert history to simpler list of dicts for the orchestrator
-    history_dicts = [m.dict() for m in request.history] if request.history else []
-    
-    result = await orchestrator.process_query(request.query, history_dicts)
+    # History turns are already schemas.Message objects, so nothing is copied
+    start = time.perf_counter()
+    in_flight = metrics.requests_in_flight.labels("query")
+    in_flight.inc()
+    try:
+        # Spans join the caller's trace when it sent a W3C traceparent
+        with orchestrator.tracer.continue_trace(http_request.headers.get("traceparent")):
+            result = await run_until_disconnected(
+                http_request,
+                orchestrator.process_query(request.query, request.history, request.session_id, request.priority),
+            )
+    except AdmissionRejected as e:
+        logger.warning(f"Shedding query: {e}")
+        return overloaded_response(e)
+    except ClientDisconnected:
+        # Nobody is listening any more; 499 mirrors nginx's "client closed request"
+        return Response(status_code=499)
+    finally:
+        in_flight.dec()
+    metrics.observe_request("query", result, time.perf_counter() - start)
     
     # Log outgoing response
     log_interaction("SERVER_TO_CLIENT", result)
     
-    return result
+    return SurfaceJSONResponse(result)
+
+@app.post("/agent/query/stream")
+async def chat_stream(request: ChatRequest, http_request: Request):
+    """
+    Streaming variant of /agent/query.
+    Emits the intent and surface skeleton as soon as the model commits to them,
+    then text deltas, then the complete surface. NDJSON by default, or
+    Server-Sent Events when the client accepts `text/event-stream`.
+    """
+    logger.info(f"Streaming query received: {request.query}")
+    log_interaction("CLIENT_TO_SERVER", request)
+    use_sse = "text/event-stream" in http_request.headers.get("accept", "")
+
+    start = time.perf_counter()
+    in_flight = metrics.requests_in_flight.labels("stream")
+    in_flight.inc()
+    streaming = False  # once true, events() owns the in-flight count
+    try:
+        stream = orchestrator.stream_query(request.query, request.history, request.session_id, request.priority)
+        # Admission is decided before the first event, while a 503 can still be sent
+        # (the trace's root span starts here too)
+        with orchestrator.tracer.continue_trace(http_request.headers.get("traceparent")):
+            first = await stream.__anext__()
+        streaming = True
+    except AdmissionRejected as e:
+        logger.warning(f"Shedding streaming query: {e}")
+        return overloaded_response(e)
+    finally:
+        if not streaming:
+            in_flight.dec()
+
+    async def events() -> AsyncIterator[str]:
+        # Starlette cancels this generator when the client disconnects
+        async def replay() -> AsyncIterator[Dict[str, Any]]:
+            yield first
+            async for event in stream:
+                yield event
+
+        try:
+            async for event in replay():
+                if event["type"] == "done":
+                    metrics.observe_request("stream", event["result"], time.perf_counter() - start)
+                    log_interaction("SERVER_TO_CLIENT", event["result"])
+                payload = codec.dumps_str(event)
+                yield f"event: {event['type']}\ndata: {payload}\n\n" if use_sse else payload + "\n"
+        finally:
+            in_flight.dec()
+
+    media_type = "text/event-stream" if use_sse else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type, headers={"Cache-Control": "no-cache"})
 
 if __name__ == "__main__":
+    # Local development: one process on :8000, where the frontend expects it.
+    # Production runs `python -m backend.server` (multi-worker, graceful drain).
     port = int(os.environ.get("PORT", 8000))
     logger.info(f"🚀 Starting Agent Cockpit Engine on port {port}")
     uvicorn.run(app, host="0.0.0.0", port=port)
@@ -1,9 +1,12 @@
+import asyncio
+import configparser
 import os
 import time
 import subprocess
-import json
 import logging
-from typing import Optional, Dict
+import threading
+from datetime import timezone
+from typing import Optional, Tuple
 
 try:
     import google.auth
@@ -14,39 +17,78 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Tokens are treated as expired this many seconds before their real expiry
+EXPIRY_MARGIN_SECONDS = 60
+# gcloud's print-access-token does not report an expiry; tokens live ~1 hour
+GCLOUD_TOKEN_LIFETIME_SECONDS = 3000
+
 class AuthManager:
     """
     Handles Google Cloud authentication triaging.
     Ports the robust logic from the Portfolio Agent to Python.
+
+    Refreshes are single-flight: concurrent callers (threads or coroutines)
+    share one in-progress refresh instead of each starting their own. Once a
+    token has been fetched asynchronously, a background task renews it ahead
+    of expiry so request paths never wait on a refresh.
+
+    Use the process-wide instance from `get_auth_manager()`.
     """
     def __init__(self):
         self.cached_token: Optional[str] = None
         self.expires_at: float = 0
-        self.project_id = os.environ.get("GOOGLE_CLOUD_PROJECT")
+        self.project_id: Optional[str] = None
+        self._project_resolved = False
+        self._project_lock = threading.Lock()
+        self.proactive_refresh_seconds = float(os.environ.get("AUTH_PROACTIVE_REFRESH_SECONDS", "300"))
+        self._refresh_lock = threading.Lock()
+        self._inflight: Optional[asyncio.Future] = None
+        self._background_task: Optional[asyncio.Task] = None
 
-    def get_access_token(self) -> str:
-        """Get access token with caching and multi-method triaging."""
-        now = time.time()
-        if self.cached_token and self.expires_at > now + 60:
+    def _is_fresh(self, min_validity: float) -> bool:
+        return bool(self.cached_token) and self.expires_at > time.time() + min_validity
+
+    def get_access_token(self, min_validity: float = EXPIRY_MARGIN_SECONDS) -> str:
+        """Get access token with caching and multi-method triaging (blocking)."""
+        if self._is_fresh(min_validity):
             return self.cached_token
+        with self._refresh_lock:
+            # Another thread may have refreshed while we waited
+            if self._is_fresh(min_validity):
+                return self.cached_token
+            self.cached_token, self.expires_at = self._fetch_token()
+            return self.cached_token
+
+    async def get_access_token_async(self, min_validity: float = EXPIRY_MARGIN_SECONDS) -> str:
+        """Non-blocking variant: the refresh runs on a worker thread and is shared by all awaiting callers."""
+        if self._is_fresh(min_validity):
+            return self.cached_token
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.ensure_future(asyncio.to_thread(self.get_access_token, min_validity))
+        # Shielded so one caller's cancellation does not abort the shared refresh
+        token = await asyncio.shield(self._inflight)
+        self._ensure_background_refresh()
+        return token
 
+    def _fetch_token(self) -> Tuple[str, float]:
+        """Obtains a fresh token and its absolute expiry time."""
         # 1. Try Google Auth (ADC / Service Account / Environment)
         if HAS_GOOGLE_AUTH:
             try:
-                credentials, project = google.auth.default(
+                credentials, _ = google.auth.default(
                     scopes=['https://www.googleapis.com/auth/cloud-platform']
                 )
-                if not self.project_id:
-                    self.project_id = project
-                
+
                 auth_req = Request()
                 credentials.refresh(auth_req)
-                
-                self.cached_token = credentials.token
-                # Typical expiry is 1 hour, we assume 50 mins
-                self.expires_at = now + 3000
+
+                if credentials.expiry is not None:
+                    # google-auth reports expiry as naive UTC
+                    expires_at = credentials.expiry.replace(tzinfo=timezone.utc).timestamp()
+                else:
+                    expires_at = time.time() + GCLOUD_TOKEN_LIFETIME_SECONDS
                 logger.debug("Obtained token via google-auth ADC")
-                return self.cached_token
+                return credentials.token, expires_at
             except Exception as e:
                 logger.debug(f"google-auth ADC failed: {e}")
 
@@ -56,24 +98,121 @@ class AuthManager:
                 ["gcloud", "auth", "print-access-token"],
                 capture_output=True, text=True, check=True
             )
-            self.cached_token = result.stdout.strip()
-            self.expires_at = now + 3000
             logger.debug("Obtained token via gcloud CLI")
-            return self.cached_token
+            return result.stdout.strip(), time.time() + GCLOUD_TOKEN_LIFETIME_SECONDS
         except Exception as e:
             logger.error(f"Failed to obtain token via gcloud: {e}")
             raise Exception("Authentication failed. Run 'gcloud auth application-default login'")
 
-    def get_project_id(self) -> str:
-        """Returns the detected or configured project ID."""
-        if not self.project_id:
-            # Try to get from gcloud if not in env
+    def _ensure_background_refresh(self):
+        if self.proactive_refresh_seconds <= 0:
+            return
+        if self._background_task is None or self._background_task.done():
+            self._background_task = asyncio.get_running_loop().create_task(self._refresh_ahead_of_expiry())
+
+    async def _refresh_ahead_of_expiry(self):
+        """Renews the token `proactive_refresh_seconds` before it expires."""
+        while True:
+            delay = self.expires_at - self.proactive_refresh_seconds - time.time()
+            await asyncio.sleep(max(delay, 1))
             try:
-                result = subprocess.run(
-                    ["gcloud", "config", "get-value", "project"],
-                    capture_output=True, text=True, check=True
-                )
-                self.project_id = result.stdout.strip()
-            except:
+                await self.get_access_token_async(min_validity=self.proactive_refresh_seconds)
+            except Exception as e:
+                logger.warning(f"Background token refresh failed, retrying in 30s: {e}")
+                await asyncio.sleep(30)
+
+    async def stop_background_refresh(self):
+        task, self._background_task = self._background_task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
                 pass
+
+    def get_project_id(self) -> str:
+        """
+        Returns the detected or configured project ID, memoized after the first call.
+        Discovery order: environment, ADC, then the gcloud config file on disk
+        (read directly; no `gcloud` subprocess).
+        """
+        if not self._project_resolved:
+            with self._project_lock:
+                if not self._project_resolved:
+                    self.project_id = self._discover_project_id()
+                    self._project_resolved = True
         return self.project_id or "unknown-project"
+
+    async def get_project_id_async(self) -> str:
+        """Non-blocking variant: the first discovery (ADC may do I/O) runs on a worker thread."""
+        if self._project_resolved:
+            return self.project_id or "unknown-project"
+        return await asyncio.to_thread(self.get_project_id)
+
+    def invalidate(self):
+        """Forgets the cached token and project so both are rediscovered on next use."""
+        with self._project_lock:
+            self.project_id = None
+            self._project_resolved = False
+        self.cached_token = None
+        self.expires_at = 0
+
+    def _discover_project_id(self) -> Optional[str]:
+        for env_var in ("GOOGLE_CLOUD_PROJECT", "GCLOUD_PROJECT", "CLOUDSDK_CORE_PROJECT"):
+            if os.environ.get(env_var):
+                return os.environ[env_var]
+
+        if HAS_GOOGLE_AUTH:
+            try:
+                _, project = google.auth.default()
+                if project:
+                    logger.debug("Resolved project via ADC")
+                    return project
+            except Exception as e:
+                logger.debug(f"ADC project discovery failed: {e}")
+
+        project = read_gcloud_config_project()
+        if project:
+            logger.debug("Resolved project via gcloud config file")
+        return project
+
+
+def read_gcloud_config_project() -> Optional[str]:
+    """Reads `core/project` from the active gcloud configuration file."""
+    config_dir = os.environ.get("CLOUDSDK_CONFIG")
+    if not config_dir:
+        if os.name == "nt" and os.environ.get("APPDATA"):
+            config_dir = os.path.join(os.environ["APPDATA"], "gcloud")
+        else:
+            config_dir = os.path.join(os.path.expanduser("~"), ".config", "gcloud")
+
+    active = os.environ.get("CLOUDSDK_ACTIVE_CONFIG_NAME")
+    if not active:
+        try:
+            with open(os.path.join(config_dir, "active_config")) as f:
+                active = f.read().strip()
+        except OSError:
+            active = ""
+    active = active or "default"
+
+    parser = configparser.ConfigParser()
+    try:
+        if not parser.read(os.path.join(config_dir, "configurations", f"config_{active}")):
+            return None
+    except configparser.Error as e:
+        logger.debug(f"Unreadable gcloud config: {e}")
+        return None
+    return parser.get("core", "project", fallback=None) or None
+
+
+_shared_auth: Optional[AuthManager] = None
+_shared_auth_lock = threading.Lock()
+
+def get_auth_manager() -> AuthManager:
+    """The process-wide AuthManager, created on first use."""
+    global _shared_auth
+    if _shared_auth is None:
+        with _shared_auth_lock:
+            if _shared_auth is None:
+                _shared_auth = AuthManager()
+    return _shared_auth
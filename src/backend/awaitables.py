@@ -0,0 +1,15 @@
+import inspect
+from typing import Any
+
+# =============================================================================
+# SYNC-OR-ASYNC HOOKS
+# =============================================================================
+# Cache backends, embedders, session stores and summarizers may be plain
+# callables or coroutines; callers await whatever they return through here.
+
+
+async def maybe_await(value: Any) -> Any:
+    """Returns `value`, awaiting it first if it is awaitable."""
+    if inspect.isawaitable(value):
+        return await value
+    return value
@@ -0,0 +1,153 @@
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Generic, List, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# BATCH WRITER
+# =============================================================================
+# A bounded in-memory queue drained in batches by one daemon thread, shared
+# by the interaction log and the span exporter. Producers never block on
+# I/O: a full queue drops an item instead. The thread starts on first use
+# and hands each batch to `handle`.
+
+T = TypeVar("T")
+
+
+class BatchWriter(Generic[T]):
+    """
+    - Batches go to `handle` when `batch_size` items are pending or
+      `flush_interval` elapses; `handle` runs on the writer thread.
+    - When the queue is full, `overflow` decides what is lost: "drop_newest"
+      discards the incoming item, "drop_oldest" evicts the oldest queued one.
+    - `on_stop` runs on the writer thread after the last batch.
+    """
+    def __init__(
+        self,
+        handle: Callable[[List[T]], None],
+        name: str,
+        max_queue: int = 10000,
+        batch_size: int = 256,
+        flush_interval: float = 0.5,
+        overflow: str = "drop_newest",
+        on_stop: Optional[Callable[[], None]] = None,
+    ):
+        if overflow not in ("drop_newest", "drop_oldest"):
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.handle = handle
+        self.name = name
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.on_stop = on_stop
+        self._pending: Deque[T] = deque()
+        self._cond = threading.Condition()
+        self._accepted = 0      # items ever queued
+        self._completed = 0     # items handled or discarded
+        self._action: Optional[Callable[[], None]] = None
+        self._flush_requested = False
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def depth(self) -> int:
+        return len(self._pending)
+
+    def put(self, item: T) -> bool:
+        """Queues one item without blocking. Returns False when the queue was full and an item was dropped."""
+        with self._cond:
+            self._ensure_started()
+            kept = True
+            if len(self._pending) >= self.max_queue:
+                if self.overflow == "drop_newest":
+                    return False
+                self._pending.popleft()
+                self._completed += 1
+                kept = False
+            self._pending.append(item)
+            self._accepted += 1
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+            return kept
+
+    def discard(self, then: Optional[Callable[[], None]] = None):
+        """Drops everything queued; `then` runs on the writer thread before the next batch."""
+        with self._cond:
+            self._ensure_started()
+            self._completed += len(self._pending)
+            self._pending.clear()
+            self._action = then or (lambda: None)
+            self._cond.notify_all()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Blocks until everything queued so far is handled. Returns False on timeout."""
+        with self._cond:
+            if self._thread is None:
+                return True
+            target = self._accepted
+            self._flush_requested = True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: self._completed >= target and self._action is None, timeout)
+
+    def stop(self, timeout: float = 5.0) -> bool:
+        """Handles pending items and stops the thread. Returns False if it did not stop in time."""
+        with self._cond:
+            thread = self._thread
+            if thread is None:
+                return True
+            self._stopping = True
+            self._cond.notify_all()
+        thread.join(timeout)
+        if thread.is_alive():
+            return False
+        with self._cond:
+            self._thread = None
+            self._stopping = False
+        return True
+
+    def _ensure_started(self):
+        # Called with the condition held
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: (
+                        len(self._pending) >= self.batch_size
+                        or self._stopping or self._action is not None or self._flush_requested
+                    ),
+                    self.flush_interval,
+                )
+                action = self._action
+                batch = [self._pending.popleft() for _ in range(min(len(self._pending), self.batch_size))]
+                stopping = self._stopping and not self._pending
+
+            if action is not None:
+                self._call(action)
+            if batch:
+                self._call(self.handle, batch)
+
+            with self._cond:
+                if action is not None and self._action is action:
+                    self._action = None
+                if not self._pending:
+                    self._flush_requested = False
+                self._completed += len(batch)
+                self._cond.notify_all()
+            if stopping:
+                if self.on_stop is not None:
+                    self._call(self.on_stop)
+                return
+
+    def _call(self, fn: Callable[..., None], *args: Any):
+        # The handlers report their own failures; this keeps the thread alive regardless
+        try:
+            fn(*args)
+        except Exception as e:
+            logger.warning(f"{self.name}: {e}")
@@ -0,0 +1,62 @@
+import re
+from typing import Dict, List, NamedTuple, Optional
+
+from .domain_config import DOMAIN_CONFIG
+
+# =============================================================================
+# LOCAL INTENT PRE-CLASSIFIER
+# =============================================================================
+# Matches the manifest's intent keywords with a single compiled regex so the
+# obvious queries ("show me the stock price") can be classified without a
+# model round trip.
+
+
+class IntentMatch(NamedTuple):
+    intent: str
+    confidence: float
+    keywords: List[str]
+
+
+class IntentClassifier:
+    """
+    Keyword classifier built once from the manifest.
+    Confidence rewards both agreement (share of hits for the winning intent)
+    and evidence (number of distinct hits): one unambiguous keyword scores 0.5,
+    two score 0.75, three 0.875.
+    """
+    def __init__(self, intents: Optional[List[Dict]] = None):
+        intents = DOMAIN_CONFIG["intents"] if intents is None else intents
+        self._intents_by_keyword: Dict[str, List[str]] = {}
+        for intent in intents:
+            for keyword in intent.get("keywords", []):
+                owners = self._intents_by_keyword.setdefault(keyword.lower(), [])
+                if intent["name"] not in owners:
+                    owners.append(intent["name"])
+
+        # Longest first so multi-word keywords win over their prefixes
+        keywords = sorted(self._intents_by_keyword, key=len, reverse=True)
+        self._pattern = None
+        if keywords:
+            alternation = "|".join(re.escape(k) for k in keywords)
+            self._pattern = re.compile(rf"\b(?:{alternation})\b", re.IGNORECASE)
+
+    def classify(self, query: str) -> Optional[IntentMatch]:
+        """Returns the best matching intent, or None when no keyword matches."""
+        if self._pattern is None:
+            return None
+        hits = {m.lower() for m in self._pattern.findall(query)}
+        if not hits:
+            return None
+
+        scores: Dict[str, float] = {}
+        matched: Dict[str, List[str]] = {}
+        for keyword in hits:
+            owners = self._intents_by_keyword[keyword]
+            for name in owners:
+                scores[name] = scores.get(name, 0.0) + 1.0 / len(owners)
+                matched.setdefault(name, []).append(keyword)
+
+        intent = max(scores, key=scores.get)
+        top = scores[intent]
+        confidence = (top / sum(scores.values())) * (1 - 0.5 ** top)
+        return IntentMatch(intent, round(confidence, 4), sorted(matched[intent]))
@@ -0,0 +1,79 @@
+import asyncio
+import hashlib
+import os
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Sequence
+
+from .response_cache import normalize_query
+from .schemas import MessageLike, message_fields
+
+# =============================================================================
+# REQUEST COALESCING
+# =============================================================================
+# Single-flight for model calls: concurrent requests with the same key share
+# one upstream call and all receive its result (or its exception). Unlike the
+# response cache, nothing outlives the call, so it helps with a zero TTL too.
+# The shared call keeps running while any caller still waits for it and is
+# cancelled once all of them have gone.
+
+# (query, history, summary, model name) -> key; None opts the request out
+CoalesceKey = Callable[[str, Sequence[MessageLike], Optional[str], str], Optional[Hashable]]
+
+
+def default_coalesce_key(query: str, history: Sequence[MessageLike], summary: Optional[str], model_name: str) -> Hashable:
+    """Normalized query + hash of everything sent as context + model."""
+    digest = hashlib.sha1()
+    if summary:
+        digest.update(summary.encode("utf-8") + b"\x1d")
+    for turn in history:
+        role, text = message_fields(turn)
+        digest.update(f"{role}\x1f{text}\x1e".encode("utf-8"))
+    return (normalize_query(query), digest.hexdigest(), model_name)
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task[Any]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Deduplicates concurrent awaitables by key, with leader/follower counters."""
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+        self.stats = {"leaders": 0, "coalesced": 0}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _, key=key, flight=flight: self._finish(key, flight))
+            self.stats["leaders"] += 1
+        else:
+            self.stats["coalesced"] += 1
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Every caller gave up (e.g. clients disconnected)
+                flight.task.cancel()
+
+    def _finish(self, key: Hashable, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.task.cancelled():
+            flight.task.exception()  # mark retrieved; callers re-raise it themselves
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**self.stats, "in_flight": len(self._flights)}
+
+
+def build_single_flight_from_env() -> Optional[SingleFlight]:
+    """REQUEST_COALESCING=false disables deduplication."""
+    if os.environ.get("REQUEST_COALESCING", "true").lower() in ("0", "false", "no"):
+        return None
+    return SingleFlight()
@@ -0,0 +1,75 @@
+import json
+import logging
+import os
+from typing import Any, Callable, Union
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# JSON CODEC
+# =============================================================================
+# One JSON implementation for responses, the interaction log and the log
+# reader. Uses orjson or msgspec when installed and falls back to the stdlib;
+# JSON_CODEC=stdlib|orjson|msgspec forces a choice.
+
+
+def _default(obj: Any) -> Any:
+    """Encodes the non-JSON types that reach the codec (pydantic models, sets, ...)."""
+    for method in ("model_dump", "dict", "to_dict"):
+        fn = getattr(obj, method, None)
+        if callable(fn):
+            return fn()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    return str(obj)
+
+
+def _stdlib_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def _stdlib_loads(data: Union[bytes, str]) -> Any:
+    return json.loads(data)
+
+
+def _load_backend(preferred: str):
+    if preferred in ("", "orjson"):
+        try:
+            import orjson
+            options = orjson.OPT_NON_STR_KEYS
+
+            def dumps(obj: Any) -> bytes:
+                return orjson.dumps(obj, default=_default, option=options)
+
+            return "orjson", dumps, orjson.loads
+        except ImportError:
+            if preferred:
+                logger.warning("JSON_CODEC=orjson but orjson is not installed; using stdlib json")
+    if preferred in ("", "msgspec"):
+        try:
+            import msgspec
+            encoder = msgspec.json.Encoder(enc_hook=_default)
+            decoder = msgspec.json.Decoder()
+
+            def loads(data: Union[bytes, str]) -> Any:
+                try:
+                    return decoder.decode(data)
+                except msgspec.DecodeError as e:
+                    # Callers handle malformed input as ValueError, like json/orjson
+                    raise ValueError(str(e)) from e
+
+            return "msgspec", encoder.encode, loads
+        except ImportError:
+            if preferred:
+                logger.warning("JSON_CODEC=msgspec but msgspec is not installed; using stdlib json")
+    return "stdlib", _stdlib_dumps, _stdlib_loads
+
+
+BACKEND: str
+dumps: Callable[[Any], bytes]
+loads: Callable[[Union[bytes, str]], Any]
+BACKEND, dumps, loads = _load_backend(os.environ.get("JSON_CODEC", "").lower())
+
+
+def dumps_str(obj: Any) -> str:
+    return dumps(obj).decode("utf-8")
@@ -1,3 +1,5 @@
+import hashlib
+import json
 from typing import Dict, List, Any
 
 # =============================================================================
@@ -22,60 +24,101 @@ DOMAIN_CONFIG = {
         "default": {"title": "Knowledge Base", "url": "https://example.com/docs"}
     },
 
-    # Define the "High-Signal" intents for this domain
+    # Define the "High-Signal" intents for this domain.
+    # `keywords` feed the local pre-classifier; `response` is the templated
+    # reply used when a confident local match skips the model entirely.
     "intents": [
         {
             "name": "vision",
             "description": "User wants to see high-level strategy, roadmaps, or future goals.",
-            "keywords": ["roadmap", "future", "strategy", "vision"]
+            "keywords": ["roadmap", "future", "strategy", "vision"],
+            "response": "Here is the strategic roadmap and where we are headed next."
         },
         {
             "name": "analytics",
             "description": "User asks for data, metrics, stats, or performance charts.",
-            "keywords": ["stats", "metrics", "performance", "growth", "numbers"]
+            "keywords": ["stats", "metrics", "performance", "growth", "numbers"],
+            "response": "Here are the latest performance metrics."
         },
         {
             "name": "directory",
             "description": "User wants to see a list of items, team members, or project catalog.",
-            "keywords": ["list", "team", "projects", "catalog"]
+            "keywords": ["list", "team", "projects", "catalog"],
+            "response": "Here is the current project directory."
         },
         {
             "name": "workflow",
             "description": "User asks about steps, processes, or how things move from A to B.",
-            "keywords": ["steps", "process", "workflow", "journey"]
+            "keywords": ["steps", "process", "workflow", "journey"],
+            "response": "Here is how the process moves from start to finish."
         },
         {
             "name": "quiz",
             "description": "User wants an interactive knowledge check or quiz.",
-            "keywords": ["quiz", "test", "check knowledge"]
+            "keywords": ["quiz", "test", "check knowledge"],
+            "response": "Let's check your knowledge."
         },
         {
             "name": "weather",
             "description": "User asks about the weather, temperature, or conditions.",
-            "keywords": ["weather", "temperature", "cloudy", "sunny"]
+            "keywords": ["weather", "temperature", "cloudy", "sunny"],
+            "response": "Here are the current weather conditions."
         },
         {
             "name": "stock",
             "description": "User asks for stock market data, market price, or GOOGL info.",
-            "keywords": ["stock", "price", "market", "GOOGL"]
+            "keywords": ["stock", "price", "market", "GOOGL"],
+            "response": "Here is the latest market data."
         },
         {
             "name": "time",
             "description": "User asks for the current time, date, or clock status.",
-            "keywords": ["time", "date", "clock", "today"]
+            "keywords": ["time", "date", "clock", "today"],
+            "response": "Here is the current system time."
         }
-    ]
+    ],
+
+    # Model routing, used when GENAI_ROUTING=true (otherwise every query goes
+    # to GENAI_MODEL). Rules are checked in order against the local
+    # classifier's match; the first rule whose conditions all hold picks the
+    # route (`intents`, `min_confidence`, `max_confidence`, `matched`).
+    # Queries no rule claims go to `default_route`. With
+    # GENAI_ROUTING_ESCALATION=true, a model answer whose intent is listed
+    # under `escalate` is re-asked once on the escalation route, if that route
+    # costs more than the one that answered. Costs are USD per million tokens;
+    # they feed the per-route stats and rank routes for escalation.
+    "routing": {
+        "default_route": "fast",
+        "routes": {
+            "fast": {"model": "gemini-1.5-flash-8b", "input_cost": 0.0375, "output_cost": 0.15},
+            "standard": {"model": "gemini-1.5-flash", "input_cost": 0.075, "output_cost": 0.30},
+            "large": {"model": "gemini-1.5-pro", "input_cost": 1.25, "output_cost": 5.00}
+        },
+        "rules": [
+            # Confident, simple lookups
+            {"route": "fast", "intents": ["weather", "time", "stock", "directory"], "min_confidence": 0.5},
+            {"route": "standard", "min_confidence": 0.5},
+            # Keyword hits that disagree: ambiguous, so use the strongest model
+            {"route": "large", "matched": True}
+        ],
+        # Unmatched queries are classified by the fast model first; open-ended
+        # ones it can only call "general" may get a full answer from a larger model
+        "escalate": {"intents": ["general"], "route": "standard"}
+    }
 }
 
 def get_intent_guidance() -> str:
     """Generates the system prompt fragment for intent detection based on the manifest."""
-    guidance = "## INTENT CLASSIFICATION\nAnalyze the request to determine one of these intents:\n"
-    for intent in DOMAIN_CONFIG["intents"]:
-        guidance += f"- {intent['name']}: {intent['description']}\n"
-    
-    guidance += "- greeting: hello, hi, etc.\n"
-    guidance += "- general: everything else.\n"
-    return guidance
+    lines = ["## INTENT CLASSIFICATION", "Analyze the request to determine one of these intents:"]
+    lines.extend(f"- {intent['name']}: {intent['description']}" for intent in DOMAIN_CONFIG["intents"])
+    lines.append("- greeting: hello, hi, etc.")
+    lines.append("- general: everything else.")
+    return "\n".join(lines) + "\n"
+
+def get_manifest_fingerprint() -> str:
+    """Content hash of the manifest; derived artifacts (prompts, models) are keyed on it."""
+    encoded = json.dumps(DOMAIN_CONFIG, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha1(encoded).hexdigest()
 
 def get_source_attribution(topic: str) -> Dict[str, str]:
     """Resolves which source info to return based on topic matching."""
@@ -84,3 +127,10 @@ def get_source_attribution(topic: str) -> Dict[str, str]:
         if key in topic_lower:
             return {**source, "provider": DOMAIN_CONFIG["name"]}
     return {**DOMAIN_CONFIG["sources"]["default"], "provider": DOMAIN_CONFIG["name"]}
+
+def get_intent_response(intent_name: str) -> str:
+    """Returns the templated reply for an intent (used when the model is skipped)."""
+    for intent in DOMAIN_CONFIG["intents"]:
+        if intent["name"] == intent_name:
+            return intent.get("response", "I've processed your request.")
+    return "I've processed your request."
@@ -0,0 +1,153 @@
+import asyncio
+import os
+import weakref
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Sequence, Union
+
+from .awaitables import maybe_await
+from .schemas import Message, MessageLike, message_fields
+from .sessions import InMemorySessionStore, build_session_store_from_env
+
+# =============================================================================
+# CONVERSATION HISTORY
+# =============================================================================
+# Keeps the prompt a flat size however long a conversation runs: the last
+# `keep_turns` turns go to the model verbatim, within a token budget, and
+# everything older is folded into a rolling summary. With a session ID the
+# summary and recent turns are kept server-side between requests (see
+# sessions.py), so clients send only the new turn instead of the whole
+# conversation.
+
+CHARS_PER_TOKEN = 4
+SUMMARY_SNIPPET_WORDS = 40
+
+# (previous summary, turns to fold in, max summary tokens) -> new summary
+Summarizer = Callable[[Optional[str], Sequence[MessageLike], int], Union[str, Awaitable[str]]]
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap length-based token estimate (no tokenizer round trip)."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def extractive_summary(previous: Optional[str], turns: Sequence[MessageLike], max_tokens: int) -> str:
+    """
+    Default summarizer: one clipped line per folded turn, appended to the
+    previous summary. The oldest lines roll off once it outgrows `max_tokens`.
+    """
+    lines = previous.split("\n") if previous else []
+    for turn in turns:
+        role, text = message_fields(turn)
+        words = text.split()
+        snippet = " ".join(words[:SUMMARY_SNIPPET_WORDS])
+        if len(words) > SUMMARY_SNIPPET_WORDS:
+            snippet += " ..."
+        lines.append(f"{'User' if role == 'user' else 'Assistant'}: {snippet}")
+    total = sum(estimate_tokens(line) + 1 for line in lines)
+    start = 0
+    while total > max_tokens and start < len(lines) - 1:
+        total -= estimate_tokens(lines[start]) + 1
+        start += 1
+    return "\n".join(lines[start:])
+
+
+class PreparedHistory(NamedTuple):
+    summary: Optional[str]          # rolling summary of the folded turns, None when nothing was folded
+    turns: List[MessageLike]        # recent turns to send verbatim, oldest first
+
+
+class HistoryManager:
+    """
+    Token-budgeted history. `max_tokens` bounds summary + verbatim turns;
+    `summary_max_tokens` of it is reserved for the summary. Session state
+    lives in `store` (see sessions.py), in-process by default.
+    """
+    def __init__(
+        self,
+        max_tokens: int = 4000,
+        keep_turns: int = 6,
+        summary_max_tokens: int = 500,
+        store: Any = None,
+        summarizer: Optional[Summarizer] = None,
+    ):
+        self.max_tokens = max_tokens
+        self.keep_turns = keep_turns
+        self.summary_max_tokens = min(summary_max_tokens, max_tokens)
+        self.store = store if store is not None else InMemorySessionStore()
+        self.summarizer: Summarizer = summarizer or extractive_summary
+        # One lock per active session serializes its prepare/compact steps
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self.stats = {"folds": 0, "turns_folded": 0}
+
+    @classmethod
+    def from_env(cls) -> "HistoryManager":
+        return cls(
+            max_tokens=int(os.environ.get("HISTORY_MAX_TOKENS", "4000")),
+            keep_turns=int(os.environ.get("HISTORY_KEEP_TURNS", "6")),
+            summary_max_tokens=int(os.environ.get("HISTORY_SUMMARY_MAX_TOKENS", "500")),
+            store=build_session_store_from_env(),
+        )
+
+    def _lock(self, session_id: str) -> asyncio.Lock:
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = self._locks[session_id] = asyncio.Lock()
+        return lock
+
+    def _overflow(self, turns: Sequence[MessageLike]) -> int:
+        """How many of the oldest turns must be folded for count and token budget to fit."""
+        turn_budget = self.max_tokens - self.summary_max_tokens
+        tokens = [estimate_tokens(message_fields(t)[1]) for t in turns]
+        total = sum(tokens)
+        drop = 0
+        while drop < len(turns) and (len(turns) - drop > self.keep_turns or total > turn_budget):
+            total -= tokens[drop]
+            drop += 1
+        return drop
+
+    async def _fold(self, summary: Optional[str], turns: Sequence[MessageLike]) -> str:
+        self.stats["folds"] += 1
+        self.stats["turns_folded"] += len(turns)
+        return await maybe_await(self.summarizer(summary, turns, self.summary_max_tokens))
+
+    async def prepare(self, history: Optional[Sequence[MessageLike]], session_id: Optional[str] = None) -> PreparedHistory:
+        """
+        Without a session ID, `history` is the full conversation and is trimmed
+        statelessly. With one, `history` holds only turns the server has not
+        seen yet; they are appended to the stored session.
+        """
+        if session_id is None:
+            turns = list(history or [])
+            drop = self._overflow(turns)
+            if not drop:
+                return PreparedHistory(None, turns)
+            return PreparedHistory(await self._fold(None, turns[:drop]), turns[drop:])
+
+        async with self._lock(session_id):
+            if history:
+                await maybe_await(self.store.append(session_id, [Message(*message_fields(t)) for t in history]))
+            data = await maybe_await(self.store.load(session_id))
+            drop = self._overflow(data.turns)
+            if not drop:
+                return PreparedHistory(data.summary, data.turns)
+            summary = await self._fold(data.summary, data.turns[:drop])
+            await maybe_await(self.store.compact(session_id, summary, drop))
+            return PreparedHistory(summary, data.turns[drop:])
+
+    async def record(self, session_id: str, query: str, reply: str):
+        """Appends a completed exchange (O(1)); it is folded, if needed, on the next prepare."""
+        await maybe_await(self.store.append(session_id, [Message("user", query), Message("model", reply)]))
+
+    async def forget(self, session_id: str):
+        await maybe_await(self.store.delete(session_id))
+
+    def snapshot(self) -> Dict[str, Any]:
+        snapshot: Dict[str, Any] = {
+            **self.stats,
+            "store": type(self.store).__name__,
+            "max_tokens": self.max_tokens,
+            "keep_turns": self.keep_turns,
+        }
+        if hasattr(self.store, "__len__"):
+            snapshot["sessions"] = len(self.store)
+            snapshot["evictions"] = self.store.evictions
+        return snapshot
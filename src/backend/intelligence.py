@@ -1,9 +1,29 @@
-import json
+import asyncio
+import contextlib
+import datetime
+import functools
 import logging
 import os
-from typing import Dict, Any, List, Optional
-from .domain_config import DOMAIN_CONFIG, get_intent_guidance, get_source_attribution
-from .auth_manager import AuthManager
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Callable, AsyncIterator, Iterator, Tuple
+from .domain_config import (
+    DOMAIN_CONFIG, get_intent_guidance, get_intent_response, get_manifest_fingerprint, get_source_attribution
+)
+from .classifier import IntentClassifier, IntentMatch
+from .auth_manager import get_auth_manager
+from .awaitables import maybe_await
+from .stream_parser import PartialResponseParser, parse_response
+from .response_cache import CacheLookup, ResponseCache, build_response_cache_from_env
+from .history import CHARS_PER_TOKEN, HistoryManager, estimate_tokens
+from .admission import AdmissionController, AdmissionRejected, build_admission_from_env
+from .resilience import CircuitOpen, ResilientCaller
+from .routing import ModelRouter, Route
+from .coalesce import CoalesceKey, SingleFlight, build_single_flight_from_env, default_coalesce_key
+from .surfaces import SurfaceRegistry, surface_id_of
+from .schemas import MessageLike, SurfaceValidationError, message_fields, validate_surface
+from .tracing import Tracer, build_tracer_from_env, current_span
+from .metrics import AgentMetrics
 
 # Using Vertex AI SDK
 try:
@@ -14,34 +34,589 @@ except ImportError:
     HAS_VERTEX = False
 
 logger = logging.getLogger(__name__)
-auth = AuthManager()
+
+GENERATION_CONFIG = {"response_mime_type": "application/json"}
+# Sent once at startup with WARMUP_GENERATION=true; the answer is discarded
+WARM_UP_QUERY = "hello"
+
+
+def _token_counts(prompt_chars: int, output_text: str, usage: Any = None) -> Tuple[int, int, bool]:
+    """(input, output, estimated): the SDK's usage metadata, else length-based estimates."""
+    if getattr(usage, "prompt_token_count", None) is not None:
+        return usage.prompt_token_count, usage.candidates_token_count or 0, False
+    return -(-prompt_chars // CHARS_PER_TOKEN), estimate_tokens(output_text or ""), True
+
+
+def _usage_attributes(tokens: Tuple[int, int, bool]) -> Dict[str, Any]:
+    attributes = {"gen_ai.usage.input_tokens": tokens[0], "gen_ai.usage.output_tokens": tokens[1]}
+    if tokens[2]:
+        attributes["gen_ai.usage.estimated"] = True
+    return attributes
 
 class IntelligenceOrchestrator:
     """
     The 'Brain' of the Agent Cockpit.
     Handles Intent Detection, Response Generation, and A2UI Surface Factory.
     """
-    def __init__(self):
+    def __init__(
+        self,
+        model_factory: Optional[Callable[..., Any]] = None,
+        response_cache: Optional[ResponseCache] = None,
+        history_manager: Optional[HistoryManager] = None,
+        coalescer: Optional[SingleFlight] = None,
+        coalesce_key: Optional[CoalesceKey] = None,
+        admission: Optional[AdmissionController] = None,
+        resilience: Optional[ResilientCaller] = None,
+        tracer: Optional[Tracer] = None,
+        metrics: Optional[AgentMetrics] = None,
+    ):
         self.model_name = os.environ.get("GENAI_MODEL", "gemini-1.5-flash")
-        self.project_id = auth.get_project_id()
+        self.project_id: Optional[str] = None  # resolved lazily by _ensure_init
         self.location = os.environ.get("GOOGLE_CLOUD_LOCATION", "us-central1")
+        # Concurrency: bounded pool for SDKs without an async API, per-call deadline
+        self.max_workers = int(os.environ.get("GENAI_MAX_WORKERS", "32"))
+        self.timeout = float(os.environ.get("GENAI_TIMEOUT_SECONDS", "30"))
+        self._model_factory = model_factory
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Local pre-classification: confident keyword matches pin the intent,
+        # and with templates enabled skip the model call altogether
+        self.classifier: Optional[IntentClassifier] = None
+        # Per-query model choice from the manifest's routing rules (opt-in with GENAI_ROUTING=true; None: always GENAI_MODEL)
+        self.router: Optional[ModelRouter] = ModelRouter.from_manifest()
+        self.local_intent_threshold = float(os.environ.get("INTENT_CLASSIFIER_THRESHOLD", "0.75"))
+        self.local_templates = os.environ.get("INTENT_CLASSIFIER_TEMPLATES", "false").lower() in ("1", "true", "yes")
+        # Prompt, classifier and models are derived from the manifest once per
+        # fingerprint; models are cached per (model name, fingerprint)
+        self.context_cache_ttl = int(os.environ.get("GENAI_CONTEXT_CACHE_TTL_SECONDS", "0"))
+        self.manifest_check_interval = float(os.environ.get("MANIFEST_CHECK_INTERVAL_SECONDS", "5"))
+        self._manifest_fingerprint: Optional[str] = None
+        self._manifest_checked_at = 0.0
+        self._system_prompt = ""
+        self._models: Dict[Tuple[str, str], Tuple[Any, float]] = {}
+        # One in-flight build per key, shared by concurrent cache misses
+        self._model_builds: Dict[Tuple[str, str], "asyncio.Future[Any]"] = {}
+        self.surfaces = SurfaceRegistry.from_manifest()
+        # Successful model responses are cached (None when RESPONSE_CACHE_TTL_SECONDS=0)
+        self.response_cache = response_cache if response_cache is not None else build_response_cache_from_env()
+        # History is trimmed to a token budget; older turns become a rolling summary
+        self.history = history_manager or HistoryManager.from_env()
+        # Identical concurrent queries share one model call (None when REQUEST_COALESCING=false)
+        self.coalescer = coalescer if coalescer is not None else build_single_flight_from_env()
+        self.coalesce_key: CoalesceKey = coalesce_key or default_coalesce_key
+        # Adaptive concurrency limit + priority queue in front of the model (None when ADMISSION_CONTROL=false)
+        self.admission = admission if admission is not None else build_admission_from_env()
+        # Retries, deadline, hedging and circuit breaker around each model call
+        self.resilience = resilience or ResilientCaller.from_env(default_deadline=self.timeout)
+        # Per-stage spans (no-op unless TRACE_EXPORTER is set)
+        self.tracer = tracer if tracer is not None else build_tracer_from_env()
+        # Prometheus instruments, rendered at /metrics
+        self.metrics = metrics if metrics is not None else AgentMetrics()
         self._initialized = False
 
     def _ensure_init(self):
-        if not self._initialized and HAS_VERTEX:
-            vertexai.init(project=self.project_id, location=self.location)
+        if not self._initialized and HAS_VERTEX and self._model_factory is None:
+            with self.tracer.span("auth.init"):
+                self.project_id = get_auth_manager().get_project_id()
+                vertexai.init(project=self.project_id, location=self.location)
             self._initialized = True
 
-    async def process_query(self, query: str, history: List[Dict] = None) -> Dict[str, Any]:
+    def _refresh_manifest(self):
+        """
+        Rebuilds manifest-derived state when DOMAIN_CONFIG has changed.
+        Fingerprinting costs more than the rebuild it guards against, so it runs
+        at most once per MANIFEST_CHECK_INTERVAL_SECONDS.
+        """
+        now = time.monotonic()
+        if self._manifest_fingerprint is not None and now - self._manifest_checked_at < self.manifest_check_interval:
+            return
+        self._manifest_checked_at = now
+        fingerprint = get_manifest_fingerprint()
+        if fingerprint == self._manifest_fingerprint:
+            return
+        if self._manifest_fingerprint is not None:
+            logger.info("Domain manifest changed, rebuilding prompt and models")
+        self._system_prompt = self._build_system_prompt()
+        self.classifier = IntentClassifier()
+        self.surfaces = SurfaceRegistry.from_manifest()
+        self.metrics.set_vocabulary(self.surfaces)
+        self.router = ModelRouter.from_manifest()
+        self._models.clear()
+        self._manifest_fingerprint = fingerprint
+
+    def invalidate_manifest(self):
+        """Forces manifest-derived state to be rebuilt on the next request."""
+        self._manifest_fingerprint = None
+
+    async def _get_model(self, model_name: Optional[str] = None):
+        """
+        Returns the cached model for (model name, manifest fingerprint), building it on a miss.
+        Builds run on a worker thread (SDK init, model construction and
+        CachedContent creation all block), and concurrent misses for the
+        same key share one build.
+        """
+        self._refresh_manifest()
+        key = (model_name or self.model_name, self._manifest_fingerprint)
+        cached = self._models.get(key)
+        if cached is not None and cached[1] > time.time():
+            return cached[0]
+        build = self._model_builds.get(key)
+        if build is None:
+            build = asyncio.ensure_future(self._build_model(key))
+            self._model_builds[key] = build
+            build.add_done_callback(lambda _: self._model_builds.pop(key, None))
+        # Shielded so one caller's cancellation does not abort the shared build
+        return await asyncio.shield(build)
+
+    async def _build_model(self, key: Tuple[str, str]):
+        system_prompt = self._system_prompt
+
+        def build() -> Tuple[Any, float]:
+            self._ensure_init()
+            return self._create_model(key[0], system_prompt)
+
+        with self.tracer.span("model.create") as span:
+            span.set_attribute("gen_ai.request.model", key[0])
+            model, expires_at = await asyncio.to_thread(build)
+        if key[1] == self._manifest_fingerprint:  # not superseded by a manifest change meanwhile
+            self._models[key] = (model, expires_at)
+        return model
+
+    def _create_model(self, model_name: str, system_prompt: str) -> Tuple[Any, float]:
+        """
+        Constructs the generative model (injectable for tests and benchmarks).
+        With GENAI_CONTEXT_CACHE_TTL_SECONDS set, the system prompt is stored as
+        Vertex cached content so it is not re-sent and re-billed on every turn;
+        the model is then rebuilt shortly before the cache entry expires.
+        """
+        if self._model_factory is not None:
+            return self._model_factory(model_name=model_name, system_instruction=system_prompt), float("inf")
+        if self.context_cache_ttl > 0:
+            try:
+                from vertexai.preview import caching
+                cached_content = caching.CachedContent.create(
+                    model_name=model_name,
+                    system_instruction=system_prompt,
+                    ttl=datetime.timedelta(seconds=self.context_cache_ttl),
+                )
+                model = GenerativeModel.from_cached_content(cached_content=cached_content)
+                return model, time.time() + max(self.context_cache_ttl - 60, self.context_cache_ttl / 2)
+            except Exception as e:
+                # e.g. prompt below the minimum cacheable size; plain prompts still work
+                logger.warning(f"Context caching unavailable, sending system prompt inline: {e}")
+        return GenerativeModel(model_name=model_name, system_instruction=system_prompt), float("inf")
+
+    async def warm_up(self, generate: bool = False) -> Dict[str, Any]:
+        """
+        Pays the first-request costs up front: project discovery, SDK init,
+        the access token, the system prompt and classifier, a model per routed
+        model name and, with `generate`, one small generation to open the
+        connection. Stages are best effort: a failure is reported and the
+        request path retries it lazily. Returns per-stage timings in ms.
+        """
+        report: Dict[str, Any] = {"stages_ms": {}, "errors": {}}
+
+        async def stage(name: str, work: Callable[[], Any]):
+            start = time.perf_counter()
+            try:
+                await maybe_await(work())
+            except Exception as e:
+                logger.warning(f"Warm-up stage {name} failed: {e}")
+                report["errors"][name] = f"{type(e).__name__}: {e}"
+            report["stages_ms"][name] = round((time.perf_counter() - start) * 1000, 2)
+
+        def build_models():
+            names = {self.model_name}
+            if self.router is not None:
+                names.update(route.model for route in self.router.routes.values())
+            return asyncio.gather(*(self._get_model(name) for name in sorted(names)))
+
+        # Without the SDK or an injected factory every query is answered in fallback mode
+        live = self._model_factory is not None or HAS_VERTEX
+        with self.tracer.span("agent.warm_up"):
+            # Also without the SDK: /health reports the project
+            await stage("project", get_auth_manager().get_project_id_async)
+            if self._model_factory is None and HAS_VERTEX:
+                await stage("sdk_init", lambda: asyncio.to_thread(self._ensure_init))
+                await stage("token", get_auth_manager().get_access_token_async)
+            await stage("prompt", lambda: asyncio.to_thread(self._refresh_manifest))
+            if live:
+                await stage("models", build_models)
+            if live and generate:
+                async def generation():
+                    model = await self._get_model()
+                    await self._generate(model, self._build_contents(WARM_UP_QUERY, None), GENERATION_CONFIG)
+                await stage("generation", generation)
+        return report
+
+    def _build_contents(self, query: str, history: Optional[List[MessageLike]], summary: Optional[str] = None) -> List[Any]:
+        """Simple wrapper for history to Vertex format (plain dicts without the SDK)."""
+        turns = []
+        for h in history or []:
+            role, text = message_fields(h)
+            turns.append(("user" if role == "user" else "model", text))
+        turns.append(("user", query))
+        if summary:
+            # Leads the first user turn so roles keep alternating
+            preamble = f"Summary of the earlier conversation:\n{summary}"
+            if turns[0][0] == "user":
+                turns[0] = ("user", f"{preamble}\n\n{turns[0][1]}")
+            else:
+                turns.insert(0, ("user", preamble))
+        if HAS_VERTEX:
+            return [Content(role=role, parts=[Part.from_text(text)]) for role, text in turns]
+        return [{"role": role, "parts": [{"text": text}]} for role, text in turns]
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="genai"
+            )
+        return self._executor
+
+    async def _generate(self, model, contents: List[Any], generation_config: Dict[str, Any], timeout: Optional[float] = None):
+        """
+        Runs a generation without blocking the event loop.
+        Prefers the SDK's native async API and falls back to the bounded thread pool.
+        Cancelling the awaiting task (e.g. on client disconnect) abandons the call.
+        """
+        generate_async = getattr(model, "generate_content_async", None)
+        if generate_async is not None:
+            call = generate_async(contents, generation_config=generation_config)
+        else:
+            loop = asyncio.get_running_loop()
+            call = loop.run_in_executor(
+                self._get_executor(),
+                functools.partial(model.generate_content, contents, generation_config=generation_config),
+            )
+        return await asyncio.wait_for(call, timeout=self.timeout if timeout is None else min(timeout, self.timeout))
+
+    def shutdown(self):
+        """Releases the generation thread pool and exports pending spans."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self.tracer.shutdown()
+
+    async def process_query(
+        self,
+        query: str,
+        history: Optional[List[MessageLike]] = None,
+        session_id: Optional[str] = None,
+        priority: str = "interactive",
+    ) -> Dict[str, Any]:
         """
         Refactored Intent-First Orchestrator.
         1. Classifies Intent
         2. Generates Conversational Text
         3. Identifies Keywords for A2UI
+        With a `session_id`, `history` carries only new turns (see history.py).
+        Raises AdmissionRejected when the model backend is saturated.
         """
-        self._ensure_init()
+        with self.tracer.span("agent.process_query") as span:
+            span.set_attributes({"query.length": len(query), "priority": priority, "session": session_id is not None})
+            result = await self._process_query(query, history, session_id, priority)
+            if span.recording:
+                span.set_attributes(self._result_attributes(result))
+            return result
+
+    async def _process_query(
+        self,
+        query: str,
+        history: Optional[List[MessageLike]],
+        session_id: Optional[str],
+        priority: str,
+    ) -> Dict[str, Any]:
+        self._refresh_manifest()
+        prepared = await self._prepare_history(history, session_id)
+        history = prepared.turns
+        match = self._classify_traced(query)
+        if match and self.local_templates:
+            return await self._record(session_id, query, self._build_local_result(match, query))
         
-        system_prompt = f"""
+        route = self._choose_route(query, match)
+        model_name = route.model if route else self.model_name
+        current_span().set_attribute("gen_ai.request.model", model_name)
+        vector = None
+        if self.response_cache is not None:
+            cached, vector = await self._cache_lookup(query, history, prepared.summary, model_name)
+            if cached is not None:
+                return await self._record(session_id, query, cached)
+        
+        try:
+            key = self.coalesce_key(query, history, prepared.summary, model_name) if self.coalescer else None
+            if key is None:
+                result = await self._query_model(query, history, prepared.summary, match, priority, route, vector)
+            else:
+                result = await self.coalescer.do(
+                    key, lambda: self._query_model(query, history, prepared.summary, match, priority, route, vector)
+                )
+            return await self._record(session_id, query, result)
+            
+        except AdmissionRejected:
+            raise
+        except CircuitOpen:
+            self._fallback("circuit_open")
+            return self._build_degraded_result(query)
+        except asyncio.TimeoutError as e:
+            logger.error(f"Model call exceeded {self.resilience.deadline}s deadline")
+            self._fallback("timeout", e)
+            return self.get_fallback_response(query, f"model timed out after {self.resilience.deadline}s")
+        except Exception as e:
+            logger.error(f"Intelligence processing failed: {e}")
+            self._fallback("error", e)
+            return self.get_fallback_response(query, str(e))
+
+    def _fallback(self, reason: str, error: Optional[BaseException] = None):
+        """Counts an answer served in fallback mode and marks it on the current trace."""
+        self.metrics.fallbacks.labels(reason).inc()
+        span = current_span()
+        span.set_attribute("fallback", reason)
+        if error is not None:
+            span.record_exception(error)
+
+    async def _prepare_history(self, history: Optional[List[MessageLike]], session_id: Optional[str]):
+        with self.tracer.span("history.prepare") as span:
+            prepared = await self.history.prepare(history, session_id)
+            span.set_attributes({"history.turns": len(prepared.turns), "history.summarized": prepared.summary is not None})
+            return prepared
+
+    def _classify_traced(self, query: str) -> Optional[IntentMatch]:
+        with self.tracer.span("intent.classify") as span:
+            match = self._classify_locally(query)
+            if match:
+                span.set_attributes({"intent.local": match.intent, "intent.confidence": match.confidence})
+            return match
+
+    async def _cache_lookup(self, query: str, history: List[MessageLike], summary: Optional[str], model_name: str) -> CacheLookup:
+        with self.tracer.span("cache.lookup") as span:
+            lookup = await self.response_cache.lookup(query, history, model_name, summary)
+            span.set_attribute("cache.hit", lookup.result is not None)
+            return lookup
+
+    @staticmethod
+    def _result_attributes(result: Dict[str, Any]) -> Dict[str, Any]:
+        return {"intent": result["intent"], "surface_id": surface_id_of(result["surface"])}
+
+    def _admit(self, priority: str):
+        return self.admission.admit(priority) if self.admission is not None else contextlib.nullcontext()
+
+    def _choose_route(self, query: str, match: Optional[IntentMatch]) -> Optional[Route]:
+        if self.router is None:
+            return None
+        # Routing also uses matches below the pinning threshold
+        return self.router.choose(match or self.classifier.classify(query))
+
+    def _prompt_chars(self, query: str, history: List[MessageLike], summary: Optional[str]) -> int:
+        return len(self._system_prompt) + len(query) + len(summary or "") + sum(len(message_fields(h)[1]) for h in history)
+
+    async def _call_model(self, route: Optional[Route], contents: List[Any], priority: str, prompt_chars: int) -> Dict[str, Any]:
+        """One resilient model call on `route` (or GENAI_MODEL), recorded in the route's stats."""
+        model_name = route.model if route else self.model_name
+        model = await self._get_model(model_name)
+        
+        async def attempt(timeout: float) -> Tuple[str, Dict[str, Any], Tuple[int, int, bool]]:
+            with self.tracer.span("model.generate") as span:
+                span.set_attributes({"gen_ai.request.model": model_name, "route": route.name if route else ""})
+                async with self._admit(priority):
+                    response = await self._generate(
+                        model,
+                        contents,
+                        generation_config=GENERATION_CONFIG,
+                        timeout=timeout,
+                    )
+                tokens = _token_counts(prompt_chars, response.text, getattr(response, "usage_metadata", None))
+                span.set_attributes(_usage_attributes(tokens))
+            # Parsing is part of the attempt, so malformed output is retried
+            with self.tracer.span("response.parse"):
+                return response.text, parse_response(response.text), tokens
+        
+        start = time.monotonic()
+        try:
+            text, data, tokens = await self.resilience.call(attempt)
+        except (AdmissionRejected, CircuitOpen):
+            raise
+        except Exception:
+            self.metrics.observe_model_call(model_name, time.monotonic() - start, "error")
+            if route is not None:
+                self.router.record(route, time.monotonic() - start, None)
+            raise
+        self.metrics.observe_model_call(model_name, time.monotonic() - start, "ok", tokens[0], tokens[1])
+        if route is not None:
+            self.router.record(route, time.monotonic() - start, tokens[:2])
+        return data
+
+    async def _query_model(
+        self,
+        query: str,
+        history: List[MessageLike],
+        summary: Optional[str],
+        match: Optional[IntentMatch],
+        priority: str = "interactive",
+        route: Optional[Route] = None,
+        vector: Optional[List[float]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Model call(s) plus result building and caching; shared by coalesced
+        requests. `vector` is the query embedding from the cache lookup.
+        """
+        with self.tracer.span("prompt.build") as span:
+            contents = self._build_contents(query, history, summary)
+            prompt_chars = self._prompt_chars(query, history, summary)
+            span.set_attribute("prompt.chars", prompt_chars)
+        data = await self._call_model(route, contents, priority, prompt_chars)
+        
+        escalated = self.router.escalation(route, data.get("intent", "general")) if route and not match else None
+        if escalated is not None:
+            try:
+                data = await self._call_model(escalated, contents, priority, prompt_chars)
+            except Exception as e:
+                # The cheaper model's answer is still a valid answer
+                logger.warning(f"Escalation to {escalated.model} failed, keeping {route.model} answer: {e}")
+        
+        with self.tracer.span("surface.render"):
+            result = self._build_result(data, query, match)
+        if self.response_cache is not None:
+            model_name = route.model if route else self.model_name
+            await self.response_cache.put(query, history, model_name, result, summary, vector)
+        return result
+
+    async def stream_query(
+        self,
+        query: str,
+        history: Optional[List[MessageLike]] = None,
+        session_id: Optional[str] = None,
+        priority: str = "interactive",
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of process_query. Yields events as soon as they are known:
+          {"type": "intent", "intent": ..., "surface": {"surfaceId": ..., "content": []}}
+          {"type": "text", "delta": ...}
+          {"type": "surface", "surface": ...}   (complete surface once keywords arrive)
+          {"type": "done", "result": ...}       (same shape as process_query's result)
+        Raises AdmissionRejected before the first event when the model backend is saturated.
+        """
+        # The consumer may resume the stream from another context, so the root
+        # span is made current around each step rather than for the whole stream
+        root = self.tracer.start_span("agent.stream_query")
+        root.set_attributes({"query.length": len(query), "priority": priority, "session": session_id is not None})
+        events = self._stream_query(query, history, session_id, priority)
+        try:
+            while True:
+                with self.tracer.use(root):
+                    try:
+                        event = await events.__anext__()
+                    except StopAsyncIteration:
+                        break
+                if event["type"] == "done" and root.recording:
+                    root.set_attributes(self._result_attributes(event["result"]))
+                yield event
+        except Exception as e:
+            root.record_exception(e)
+            raise
+        finally:
+            await events.aclose()
+            root.end()
+
+    async def _stream_query(
+        self,
+        query: str,
+        history: Optional[List[MessageLike]],
+        session_id: Optional[str],
+        priority: str,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        self._refresh_manifest()
+        prepared = await self._prepare_history(history, session_id)
+        history = prepared.turns
+        match = self._classify_traced(query)
+        if match:
+            # The intent is already known, so the skeleton goes out before any model call
+            yield self._intent_event(match.intent)
+        result = None
+        if match and self.local_templates:
+            result = self._build_local_result(match, query)
+        route = self._choose_route(query, match)
+        model_name = route.model if route else self.model_name
+        current_span().set_attribute("gen_ai.request.model", model_name)
+        vector = None
+        if result is None and self.response_cache is not None:
+            result, vector = await self._cache_lookup(query, history, prepared.summary, model_name)
+            if result is not None and not match:
+                yield self._intent_event(result["intent"])
+        if result is not None:
+            await self._record(session_id, query, result)
+            yield {"type": "text", "delta": result["text"]}
+            yield {"type": "surface", "surface": result["surface"]}
+            yield {"type": "done", "result": result}
+            return
+        
+        parser = PartialResponseParser()
+        buffer: List[str] = []
+        usage = None  # the SDK reports cumulative usage on the final chunk
+        
+        start = time.monotonic()
+        # Spans the yields below, so it is ended explicitly instead of by a `with`
+        span = self.tracer.start_span("model.stream")
+        try:
+            model = await self._get_model(model_name)
+            with self.tracer.span("prompt.build"):
+                contents = self._build_contents(query, history, prepared.summary)
+            prompt_chars = self._prompt_chars(query, history, prepared.summary)
+            span.set_attribute("gen_ai.request.model", model_name)
+            
+            # Chunks are forwarded as they arrive, so streams get the breaker but no retries
+            async with self.resilience.guard(), self._admit(priority):
+                async for chunk in self._generate_stream(model, contents, GENERATION_CONFIG):
+                    chunk_text = chunk.text
+                    usage = getattr(chunk, "usage_metadata", None) or usage
+                    if not buffer:
+                        span.set_attribute("stream.first_chunk_ms", round((time.monotonic() - start) * 1000, 1))
+                    buffer.append(chunk_text)
+                    for event in self._stream_events(parser.feed(chunk_text), match):
+                        yield event
+                # Truncated output keeps what arrived; nothing usable is an error
+                for event in self._stream_events(parser.finish(), match):
+                    yield event
+                data = parser.result()
+            text = "".join(buffer)
+            tokens = _token_counts(prompt_chars, text, usage)
+            span.set_attributes({**_usage_attributes(tokens), "stream.repaired": parser.repaired})
+            span.end()
+            self.metrics.observe_model_call(model_name, time.monotonic() - start, "ok", tokens[0], tokens[1])
+            if route is not None:
+                self.router.record(route, time.monotonic() - start, tokens[:2])
+            with self.tracer.span("surface.render"):
+                result = self._build_result(data, query, match)
+            if self.response_cache is not None:
+                await self.response_cache.put(query, history, model_name, result, prepared.summary, vector)
+            await self._record(session_id, query, result)
+        except AdmissionRejected as e:
+            if not match:
+                raise  # nothing sent yet, so the endpoint can still answer 503
+            self._fallback("rejected")
+            result = self.get_fallback_response(query, str(e))
+        except CircuitOpen:
+            self._fallback("circuit_open")
+            result = self._build_degraded_result(query)
+        except asyncio.TimeoutError as e:
+            logger.error(f"Model stream exceeded {self.timeout}s deadline")
+            span.record_exception(e)
+            self.metrics.observe_model_call(model_name, time.monotonic() - start, "error")
+            self._fallback("timeout", e)
+            result = self.get_fallback_response(query, f"model timed out after {self.timeout}s")
+        except Exception as e:
+            logger.error(f"Intelligence streaming failed: {e}")
+            span.record_exception(e)
+            self.metrics.observe_model_call(model_name, time.monotonic() - start, "error")
+            self._fallback("error", e)
+            result = self.get_fallback_response(query, str(e))
+        finally:
+            span.end()
+        
+        yield {"type": "surface", "surface": result["surface"]}
+        yield {"type": "done", "result": result}
+
+    def _build_system_prompt(self) -> str:
+        return f"""
 {DOMAIN_CONFIG['persona']}
 
 ## RESPONSE FORMAT
@@ -54,122 +629,131 @@ Respond ONLY with a valid JSON object.
 
 {get_intent_guidance()}
 """
+
+    async def _record(self, session_id: Optional[str], query: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Adds a successful exchange to the server-side session (fallbacks are not recorded)."""
+        if session_id is not None:
+            await self.history.record(session_id, query, result["text"])
+        return result
+
+    def _classify_locally(self, query: str) -> Optional[IntentMatch]:
+        """Returns the local keyword match when it clears the confidence threshold."""
+        match = self.classifier.classify(query)
+        if match and match.confidence >= self.local_intent_threshold:
+            logger.debug(f"Local intent match: {match.intent} ({match.confidence})")
+            return match
+        return None
+
+    def _build_local_result(self, match: IntentMatch, query: str) -> Dict[str, Any]:
+        """Model-free response from the manifest's templated reply."""
+        data = {"intent": match.intent, "text": get_intent_response(match.intent), "keywords": ", ".join(match.keywords)}
+        return self._build_result(data, query)
+
+    def _stream_events(self, events: List[Tuple[str, str]], match: Optional[IntentMatch]) -> Iterator[Dict[str, Any]]:
+        for kind, value in events:
+            if kind == "intent":
+                if not match:
+                    yield self._intent_event(value)
+            else:
+                yield {"type": "text", "delta": value}
+
+    def _intent_event(self, intent: str) -> Dict[str, Any]:
+        skeleton = {"surfaceId": self.surfaces.surface_id(intent), "content": []}
+        return {"type": "intent", "intent": intent, "surface": skeleton}
+
+    def _build_result(self, data: Dict[str, Any], query: str, match: Optional[IntentMatch] = None) -> Dict[str, Any]:
+        # A confident local match overrides the model's classification
+        intent = match.intent if match else data.get("intent", "general")
+        text = data.get("text", "I've processed your request.")
+        keywords = data.get("keywords", query)
+        
+        # 4. Surface Generation (The Dynamic Part)
+        a2ui_surface = self._model_surface(data) or self.generate_a2ui_for_intent(intent, keywords)
         
+        return {
+            "intent": intent,
+            "text": text,
+            "surface": a2ui_surface,
+            "source": get_source_attribution(keywords)
+        }
+
+    def _model_surface(self, data: Dict[str, Any]) -> Optional[Any]:
+        """A surface composed by the model itself, validated once against the A2UI schema."""
+        raw = data.get("surface")
+        if raw is None:
+            return None
         try:
-            model = GenerativeModel(
-                model_name=self.model_name,
-                system_instruction=system_prompt
+            return validate_surface(raw)
+        except SurfaceValidationError as e:
+            logger.warning(f"Discarding invalid model surface: {e}")
+            return None
+
+    async def _generate_stream(self, model, contents: List[Any], generation_config: Dict[str, Any]) -> AsyncIterator[Any]:
+        """
+        Streams response chunks without blocking the event loop, under one overall deadline.
+        Sync SDK iterators are advanced one chunk at a time on the thread pool.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        
+        def remaining() -> float:
+            return max(deadline - loop.time(), 0)
+        
+        generate_async = getattr(model, "generate_content_async", None)
+        if generate_async is not None:
+            stream = await asyncio.wait_for(
+                generate_async(contents, generation_config=generation_config, stream=True),
+                timeout=remaining(),
             )
-            
-            # Simple wrapper for history to Vertex format
-            contents = []
-            if history:
-                for h in history:
-                    role = "user" if h["role"] == "user" else "model"
-                    contents.append(Content(role=role, parts=[Part.from_text(h["text"])]))
-            
-            contents.append(Content(role="user", parts=[Part.from_text(query)]))
-            
-            response = model.generate_content(
-                contents,
-                generation_config={"response_mime_type": "application/json"}
+            iterator = stream.__aiter__()
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(iterator.__anext__(), timeout=remaining())
+                except StopAsyncIteration:
+                    return
+                yield chunk
+        
+        executor = self._get_executor()
+        iterator = await asyncio.wait_for(
+            loop.run_in_executor(
+                executor,
+                functools.partial(model.generate_content, contents, generation_config=generation_config, stream=True),
+            ),
+            timeout=remaining(),
+        )
+        iterator = iter(iterator)
+        sentinel = object()
+        while True:
+            chunk = await asyncio.wait_for(
+                loop.run_in_executor(executor, next, iterator, sentinel), timeout=remaining()
             )
-            
-            data = json.loads(response.text)
-            intent = data.get("intent", "general")
-            text = data.get("text", "I've processed your request.")
-            keywords = data.get("keywords", query)
-            
-            # 4. Surface Generation (The Dynamic Part)
-            a2ui_surface = self.generate_a2ui_for_intent(intent, keywords)
-            
-            return {
-                "intent": intent,
-                "text": text,
-                "surface": a2ui_surface,
-                "source": get_source_attribution(keywords)
-            }
-            
-        except Exception as e:
-            logger.error(f"Intelligence processing failed: {e}")
-            # Fallback to hardcoded mock
-            return {
-                "intent": "general",
-                "text": f"Running in fallback mode. Error: {str(e)}",
-                "surface": self.get_mock_surface(query),
-                "source": get_source_attribution("default")
-            }
+            if chunk is sentinel:
+                return
+            yield chunk
+
+    def _build_degraded_result(self, query: str) -> Dict[str, Any]:
+        """While the model circuit is open: the local classifier's best guess, at any confidence."""
+        match = self.classifier.classify(query) if self.classifier else None
+        if match:
+            return self._build_local_result(match, query)
+        return self.get_fallback_response(query, "model temporarily unavailable")
+
+    def get_fallback_response(self, query: str, error: str) -> Dict[str, Any]:
+        """Fallback to hardcoded mock when the model path fails."""
+        return {
+            "intent": "general",
+            "text": f"Running in fallback mode. Error: {error}",
+            "surface": self.get_mock_surface(query),
+            "source": get_source_attribution("default")
+        }
 
     def generate_a2ui_for_intent(self, intent: str, context: str) -> Dict[str, Any]:
         """
         Surface Factory: Maps intents to high-fidelity A2UI components.
-        This is the 'Graceful Degradation' fallback pattern.
-        """
-        if intent == "analytics":
-            return {
-                "surfaceId": "analytics-view",
-                "content": [
-                    {"type": "Text", "props": {"text": f"Analytics: {context}", "variant": "h2"}},
-                    {"type": "StatBar", "props": {"label": "Performance Index", "value": 85, "color": "#3b82f6"}},
-                    {"type": "StatBar", "props": {"label": "Growth Rate", "value": 12, "color": "#10b981"}}
-                ]
-            }
-        elif intent == "vision":
-            return {
-                "surfaceId": "vision-roadmap",
-                "content": [
-                    {"type": "Text", "props": {"text": "Strategic Roadmap", "variant": "h2"}},
-                    {"type": "Card", "props": {"title": "Phase 1: Foundation"}, "children": [{"type": "Text", "props": {"text": "Laying the global infrastructure for A2UI.", "variant": "body"}}]},
-                    {"type": "Card", "props": {"title": "Phase 2: Scale"}, "children": [{"type": "Text", "props": {"text": "Expanding intelligence to niche industries.", "variant": "body"}}]}
-                ]
-            }
-        elif intent == "directory":
-            return {
-                "surfaceId": "directory-list",
-                "content": [
-                    {"type": "Text", "props": {"text": "Project Directory", "variant": "h2"}},
-                    {"type": "List", "props": {"title": "Active Items", "items": ["Global Supply Chain", "Healthcare Dashboard", "Fintech Bridge"]}}
-                ]
-            }
-        elif intent == "weather":
-            return {
-                "surfaceId": "weather-widget",
-                "content": [
-                    {"type": "Text", "props": {"text": f"Current Weather: {context}", "variant": "h2"}},
-                    {"type": "StatBar", "props": {"label": "Temperature", "value": 72, "color": "#f59e0b"}},
-                    {"type": "StatBar", "props": {"label": "Humidity", "value": 45, "color": "#3b82f6"}}
-                ]
-            }
-        elif intent == "stock":
-            return {
-                "surfaceId": "stock-ticker",
-                "content": [
-                    {"type": "Text", "props": {"text": f"Market Data: {context}", "variant": "h2"}},
-                    {"type": "Card", "props": {"title": "GOOGL (Alphabet Inc.)"}, "children": [
-                        {"type": "Text", "props": {"text": "$142.50 (+2.4%)", "variant": "h1"}},
-                        {"type": "StatBar", "props": {"label": "Volume", "value": 85, "color": "#10b981"}}
-                    ]}
-                ]
-            }
-        elif intent == "time":
-            return {
-                "surfaceId": "time-display",
-                "content": [
-                    {"type": "Text", "props": {"text": "System Clock", "variant": "h2"}},
-                    {"type": "Card", "children": [
-                        {"type": "Text", "props": {"text": "10:14 PM GMT-8", "variant": "h1"}},
-                        {"type": "Text", "props": {"text": "Tuesday, Jan 27, 2026", "variant": "body"}}
-                    ]}
-                ]
-            }
-        
-        # Default fallback
-        return self.get_mock_surface(context)
+        Templates are compiled once (see surfaces.py); unknown intents get the
+        standard surface. This is the 'Graceful Degradation' fallback pattern.
+        """
+        return self.surfaces.render(intent, context)
 
     def get_mock_surface(self, query: str) -> Dict[str, Any]:
-        return {
-            "surfaceId": "standard-surface",
-            "content": [
-                {"type": "Card", "props": {"title": "Intelligence Node"}, "children": [{"type": "Text", "props": {"text": f"Generated responsive UI for: {query}", "variant": "body"}}]}
-            ]
-        }
+        return self.surfaces.default.render({"context": query})
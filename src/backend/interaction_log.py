@@ -0,0 +1,295 @@
+import asyncio
+import contextlib
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Set
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single process writes the log
+    fcntl = None
+
+from . import codec
+from .batch_writer import BatchWriter
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# INTERACTION LOG WRITER
+# =============================================================================
+# Agent traffic is appended to a JSON-lines file for the Ops Console. Records
+# are queued in memory and written in batches by a background thread, so
+# logging never does file I/O on the event loop. Live subscribers (the Ops
+# Console tail) are fed from an in-memory ring buffer instead of the file.
+# Several server workers may share one log file: each batch is appended,
+# and rotation done, under an exclusive lock on `<path>.lock`, so records
+# never interleave and a worker reopens the file after another rotated it.
+
+class LogSubscription:
+    """
+    One live-tail client. Records arrive pre-encoded in a bounded queue; a
+    subscriber that falls `max_pending` records behind is disconnected rather
+    than allowed to hold memory or stall the publisher.
+    """
+    def __init__(self, broadcaster: "LogBroadcaster", loop: asyncio.AbstractEventLoop, max_pending: int):
+        self._broadcaster = broadcaster
+        self._loop = loop
+        self._queue: "asyncio.Queue[Optional[str]]" = asyncio.Queue(maxsize=max_pending)
+        self.closed = False
+        self.overflowed = False
+
+    def offer(self, payload: str):
+        """Thread-safe: hops onto the subscriber's loop when called from elsewhere."""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._put(payload)
+        elif not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._put, payload)
+
+    def _put(self, payload: str):
+        if self.closed:
+            return
+        try:
+            self._queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            self._broadcaster.stats["subscribers_dropped"] += 1
+            self.close()
+
+    async def get(self) -> Optional[str]:
+        """Next encoded record, or None once the subscription is closed."""
+        return await self._queue.get()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._broadcaster._subscribers.discard(self)
+        # Make room for the end-of-stream marker
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(None)
+
+
+class LogBroadcaster:
+    """Fans interaction records out to live subscribers and keeps the newest in a ring buffer."""
+    def __init__(self, buffer_size: int = 200, max_pending: int = 100):
+        self.max_pending = max_pending
+        self._ring: Deque[Dict[str, Any]] = deque(maxlen=buffer_size)
+        self._subscribers: Set[LogSubscription] = set()
+        self.stats = {"published": 0, "subscribers_dropped": 0}
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, record: Dict[str, Any]):
+        self._ring.append(record)
+        self.stats["published"] += 1
+        if not self._subscribers:
+            return
+        # Encode once for every subscriber
+        payload = codec.dumps_str(record)
+        for subscription in list(self._subscribers):
+            subscription.offer(payload)
+
+    def subscribe(self, replay: int = 0, since: Optional[float] = None) -> LogSubscription:
+        """
+        Must be called from the event loop that will consume the subscription.
+        Replays up to `replay` recent records, only those newer than `since`
+        (the last record a reconnecting client has).
+        """
+        subscription = LogSubscription(self, asyncio.get_running_loop(), self.max_pending)
+        backlog = list(self._ring)[-replay:] if replay > 0 else []
+        if since is not None:
+            backlog = [record for record in backlog if record["timestamp"] > since]
+        for record in backlog[-self.max_pending:]:
+            subscription._put(codec.dumps_str(record))
+        self._subscribers.add(subscription)
+        return subscription
+
+    def close_all(self):
+        """Ends every live tail (e.g. when the server drains); call from the event loop."""
+        for subscription in list(self._subscribers):
+            subscription.close()
+
+
+class InteractionLogger:
+    """
+    Records are queued in a `BatchWriter` (see batch_writer.py) and appended
+    to `path` by its thread.
+    - Batches flush when `batch_size` records are pending or `flush_interval` elapses.
+    - When the queue is full, `overflow` decides what is lost: "drop_newest"
+      discards the incoming record, "drop_oldest" evicts the oldest queued one.
+      Producers never block on I/O.
+    - The file rotates to `<path>.1 .. <path>.<backup_count>` past `max_bytes`.
+    """
+    def __init__(
+        self,
+        path: str,
+        max_queue: int = 10000,
+        batch_size: int = 256,
+        flush_interval: float = 0.5,
+        max_bytes: int = 50 * 1024 * 1024,
+        backup_count: int = 3,
+        overflow: str = "drop_newest",
+        broadcaster: Optional[LogBroadcaster] = None,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.broadcaster = broadcaster
+        self._writer: BatchWriter[Dict[str, Any]] = BatchWriter(
+            self._write_batch,
+            "interaction-log-writer",
+            max_queue=max_queue,
+            batch_size=batch_size,
+            flush_interval=flush_interval,
+            overflow=overflow,
+            on_stop=self._close,
+        )
+        self._file = None
+        self._lock_file = None
+        self.stats = {"enqueued": 0, "written": 0, "dropped": 0, "batches": 0, "rotations": 0, "write_errors": 0}
+
+    @classmethod
+    def from_env(cls, path: str, broadcaster: Optional[LogBroadcaster] = None) -> "InteractionLogger":
+        return cls(
+            path,
+            max_queue=int(os.environ.get("INTERACTION_LOG_QUEUE_SIZE", "10000")),
+            batch_size=int(os.environ.get("INTERACTION_LOG_BATCH_SIZE", "256")),
+            flush_interval=float(os.environ.get("INTERACTION_LOG_FLUSH_SECONDS", "0.5")),
+            max_bytes=int(os.environ.get("INTERACTION_LOG_MAX_BYTES", str(50 * 1024 * 1024))),
+            backup_count=int(os.environ.get("INTERACTION_LOG_BACKUPS", "3")),
+            overflow=os.environ.get("INTERACTION_LOG_OVERFLOW", "drop_newest"),
+            broadcaster=broadcaster,
+        )
+
+    # -- producer side ---------------------------------------------------------
+
+    def log(self, direction: str, data: Any):
+        """Queues one record; never blocks on I/O and never raises."""
+        record = {"timestamp": time.time(), "direction": direction, "data": data}
+        if self.broadcaster is not None:
+            try:
+                self.broadcaster.publish(record)
+            except Exception as e:
+                logger.debug(f"Live log publish failed: {e}")
+        if not self._writer.put(record):
+            self.stats["dropped"] += 1
+            if self._writer.overflow == "drop_newest":
+                return
+        self.stats["enqueued"] += 1
+
+    def reset(self):
+        """Discards queued records and deletes the log and its rotations."""
+        self._writer.discard(then=self._delete_all)
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Blocks until everything queued so far is handled. Returns False on timeout."""
+        return self._writer.flush(timeout)
+
+    def stop(self, timeout: float = 5.0):
+        """Flushes pending records and stops the writer thread."""
+        if not self._writer.stop(timeout):
+            logger.warning("Interaction log writer did not stop in time; pending records may be lost")
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**self.stats, "queue_depth": self._writer.depth}
+
+    # -- writer thread ---------------------------------------------------------
+
+    def _delete_all(self):
+        with self._locked():
+            self._delete_files()
+
+    def _write_batch(self, batch: List[Dict[str, Any]]):
+        try:
+            encoded = b"".join(codec.dumps(record) + b"\n" for record in batch)
+            with self._locked():
+                self._reopen_if_replaced()
+                if self.max_bytes and self._current_size() + len(encoded) > self.max_bytes:
+                    self._rotate()
+                handle = self._open()
+                handle.write(encoded)
+                handle.flush()
+            self.stats["written"] += len(batch)
+            self.stats["batches"] += 1
+        except Exception as e:
+            self.stats["write_errors"] += 1
+            logger.warning(f"Interaction log write failed ({len(batch)} records lost): {e}")
+            self._close()
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.path, "ab")
+        return self._file
+
+    def _close(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            finally:
+                self._file = None
+
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Exclusive across processes sharing `path` (no-op without fcntl)."""
+        if fcntl is None:
+            yield
+            return
+        if self._lock_file is None:
+            self._lock_file = open(f"{self.path}.lock", "ab")
+        fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _reopen_if_replaced(self):
+        # Another process may have rotated or deleted the file since we opened it
+        if self._file is None:
+            return
+        try:
+            replaced = os.stat(self.path).st_ino != os.fstat(self._file.fileno()).st_ino
+        except FileNotFoundError:
+            replaced = True
+        if replaced:
+            self._close()
+
+    def _current_size(self) -> int:
+        if self._file is not None:
+            # Other processes append too, so ask the file rather than our offset
+            return os.fstat(self._file.fileno()).st_size
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def _rotate(self):
+        self._close()
+        self.stats["rotations"] += 1
+        if self.backup_count <= 0:
+            os.remove(self.path)
+            return
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if os.path.exists(self.path):
+            os.replace(self.path, f"{self.path}.1")
+
+    def _delete_files(self):
+        self._close()
+        for candidate in [self.path] + [f"{self.path}.{i}" for i in range(1, self.backup_count + 1)]:
+            try:
+                os.remove(candidate)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Could not remove {candidate}: {e}")
@@ -0,0 +1,157 @@
+import os
+from typing import Any, BinaryIO, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from . import codec
+
+# =============================================================================
+# INTERACTION LOG READER
+# =============================================================================
+# Pages through the JSON-lines interaction log without loading it: backward
+# pages read fixed-size blocks from the end of the file, forward pages start
+# at a byte-offset cursor (or a binary search on `since`). The cost depends
+# on the page size, not on how big the log has grown.
+
+BLOCK_SIZE = 64 * 1024
+
+
+class LogPage(NamedTuple):
+    records: List[Dict[str, Any]]   # always in chronological order
+    next_cursor: Optional[int]      # byte offset to continue from, None when exhausted
+
+
+def _parse(line: bytes) -> Optional[Dict[str, Any]]:
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        return codec.loads(line)
+    except ValueError:
+        # A torn or corrupt line should not hide the rest of the page
+        return None
+
+
+def _lines_backward(f: BinaryIO, end: int, block_size: int) -> Iterator[Tuple[int, bytes]]:
+    """Yields (offset, line) for complete lines ending at or before `end`, newest first."""
+    pos = end
+    carry = b""
+    first_window = True
+    while pos > 0:
+        size = min(block_size, pos)
+        pos -= size
+        f.seek(pos)
+        window = f.read(size) + carry
+        segments = window.split(b"\n")
+        # The first segment may continue before `pos`; it is completed by the next window
+        carry = segments[0] if pos > 0 else b""
+        start_index = 1 if pos > 0 else 0
+        # In the first window, whatever follows the last newline is unterminated
+        stop_index = len(segments) - 1 if first_window else len(segments)
+        first_window = False
+
+        offsets = []
+        offset = pos
+        for index, segment in enumerate(segments):
+            if start_index <= index < stop_index:
+                offsets.append((offset, segment))
+            offset += len(segment) + 1
+        yield from reversed(offsets)
+
+
+def _lines_forward(f: BinaryIO, start: int, block_size: int) -> Iterator[Tuple[int, bytes, int]]:
+    """Yields (offset, line, next_offset) for complete lines from `start`, oldest first."""
+    f.seek(start)
+    offset = start
+    pending = b""
+    while True:
+        block = f.read(block_size)
+        if not block:
+            return
+        pending += block
+        segments = pending.split(b"\n")
+        pending = segments.pop()  # unterminated remainder
+        for segment in segments:
+            next_offset = offset + len(segment) + 1
+            yield offset, segment, next_offset
+            offset = next_offset
+
+
+def _seek_since(f: BinaryIO, size: int, since: float, block_size: int) -> int:
+    """Binary search for a line-aligned offset at or before the first record with timestamp >= since."""
+    lo, hi = 0, size
+    while hi - lo > block_size:
+        mid = (lo + hi) // 2
+        f.seek(mid)
+        f.readline()  # skip the partial line
+        record = _parse(f.readline())
+        if record is not None and record.get("timestamp", 0) < since:
+            lo = mid
+        else:
+            hi = mid
+    if lo == 0:
+        return 0
+    f.seek(lo - 1)
+    f.readline()  # align to the next line start
+    return f.tell()
+
+
+def read_log_page(
+    path: str,
+    limit: int = 50,
+    since: Optional[float] = None,
+    direction: str = "backward",
+    cursor: Optional[int] = None,
+    block_size: int = BLOCK_SIZE,
+) -> LogPage:
+    """
+    backward: the `limit` newest records before `cursor` (default: end of file);
+              next_cursor pages further into the past.
+    forward:  the `limit` oldest records from `cursor` (default: start, or the
+              first record at/after `since`); next_cursor resumes after the last
+              record, so it doubles as a "what's new" poll position.
+    `since` drops records older than the given unix timestamp in both directions.
+    """
+    if direction not in ("backward", "forward"):
+        raise ValueError(f"Unknown direction: {direction}")
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return LogPage([], None if direction == "backward" else 0)
+
+    with f:
+        size = os.fstat(f.fileno()).st_size
+        records: List[Dict[str, Any]] = []
+
+        if direction == "backward":
+            end = size if cursor is None else max(0, min(cursor, size))
+            next_cursor: Optional[int] = None
+            for offset, line in _lines_backward(f, end, block_size):
+                record = _parse(line)
+                if record is None:
+                    continue
+                if since is not None and record.get("timestamp", 0) < since:
+                    break
+                records.append(record)
+                if len(records) >= limit:
+                    next_cursor = offset if offset > 0 else None
+                    break
+            records.reverse()
+            return LogPage(records, next_cursor)
+
+        if cursor is not None:
+            start = max(0, min(cursor, size))
+        elif since is not None:
+            start = _seek_since(f, size, since, block_size)
+        else:
+            start = 0
+        next_offset = start
+        for offset, line, after in _lines_forward(f, start, block_size):
+            next_offset = after
+            record = _parse(line)
+            if record is None:
+                continue
+            if since is not None and record.get("timestamp", 0) < since:
+                continue
+            records.append(record)
+            if len(records) >= limit:
+                break
+        return LogPage(records, next_offset)
@@ -0,0 +1,236 @@
+import asyncio
+import bisect
+import math
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .domain_config import DOMAIN_CONFIG
+from .surfaces import SurfaceRegistry, surface_id_of
+
+# =============================================================================
+# METRICS
+# =============================================================================
+# A small Prometheus-compatible registry, rendered in the text exposition
+# format at /metrics. Recording is a dict lookup plus an integer or float
+# add, with no locks: instruments are updated from the event loop thread,
+# and the GIL keeps the structures consistent for the occasional update from
+# a worker thread. Values that already live elsewhere (queue depths,
+# admission limits) are read through callbacks at scrape time instead of
+# being mirrored on the hot path.
+#
+# Label values that come from model output (intent, surfaceId) are clamped
+# to the manifest's vocabulary, with anything else counted as "other", so a
+# model that invents intents cannot create unbounded series.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+LabelValues = Tuple[str, ...]
+
+OTHER = "other"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # per bucket; the last one is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), function: Optional[Callable[[], float]] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.function = function
+        self._children: Dict[LabelValues, Any] = {}
+
+    def _new_child(self) -> Any:
+        return _Value()
+
+    def labels(self, *values: str) -> Any:
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        if self.function is not None:
+            yield self.name, "", float(self.function())
+            return
+        for values, child in list(self._children.items()):
+            yield self.name, _format_labels(self.labelnames, values), child.value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self.labels().dec(amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        for values, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), list(child.counts)):
+                cumulative += count
+                yield f"{self.name}_bucket", _format_labels(self.labelnames, values, f'le="{_format_value(bound)}"'), cumulative
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}_sum", labels, child.sum
+            yield f"{self.name}_count", labels, cumulative
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> Any:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = (), function: Optional[Callable[[], float]] = None) -> Counter:
+        return self.register(Counter(name, documentation, labelnames, function))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (), function: Optional[Callable[[], float]] = None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, function))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Prometheus text exposition format, version 0.0.4."""
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class AgentMetrics:
+    """The backend's instruments, on one registry."""
+    def __init__(self, registry: Optional[Registry] = None):
+        self.registry = registry or Registry()
+        r = self.registry
+        self.request_seconds = r.histogram(
+            "agent_request_duration_seconds", "Query latency by endpoint, intent and surfaceId.",
+            ("endpoint", "intent", "surface_id"),
+        )
+        self.requests_in_flight = r.gauge("agent_requests_in_flight", "Queries being processed.", ("endpoint",))
+        self.model_seconds = r.histogram(
+            "agent_model_call_duration_seconds", "Model call latency, retries included.", ("model", "outcome"),
+        )
+        self.model_tokens = r.counter(
+            "agent_model_tokens_total", "Model tokens from usage metadata, or estimated.", ("model", "direction"),
+        )
+        self.fallbacks = r.counter("agent_fallbacks_total", "Answers served in fallback mode.", ("reason",))
+        self.loop_lag_seconds = r.histogram(
+            "agent_event_loop_lag_seconds", "How late the event loop ran a scheduled wake-up.", buckets=LAG_BUCKETS,
+        )
+        self.set_vocabulary(SurfaceRegistry.from_manifest())
+
+    def set_vocabulary(self, surfaces: SurfaceRegistry):
+        """The intents and surfaceIds allowed as label values; called again when the manifest changes."""
+        manifest_intents = {intent["name"] for intent in DOMAIN_CONFIG["intents"]}
+        self._intents = frozenset(manifest_intents | surfaces.intents | {"greeting", "general"})
+        self._surface_ids = surfaces.surface_ids
+
+    def observe_request(self, endpoint: str, result: Dict[str, Any], seconds: float):
+        intent = result.get("intent", "")
+        surface_id = surface_id_of(result.get("surface"))
+        self.request_seconds.labels(
+            endpoint,
+            intent if intent in self._intents else OTHER,
+            surface_id if surface_id in self._surface_ids else OTHER,
+        ).observe(seconds)
+
+    def observe_model_call(self, model: str, seconds: float, outcome: str, input_tokens: int = 0, output_tokens: int = 0):
+        self.model_seconds.labels(model, outcome).observe(seconds)
+        if input_tokens:
+            self.model_tokens.labels(model, "input").inc(input_tokens)
+        if output_tokens:
+            self.model_tokens.labels(model, "output").inc(output_tokens)
+
+    async def monitor_event_loop(self, interval: float = 0.25):
+        """Runs until cancelled, recording how late each `interval` sleep wakes up."""
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(interval)
+            self.loop_lag_seconds.observe(max(loop.time() - start - interval, 0.0))
@@ -0,0 +1,242 @@
+import asyncio
+import logging
+import math
+import os
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Optional, Set
+
+from .admission import AdmissionRejected, is_overload_error
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# MODEL CALL RESILIENCE
+# =============================================================================
+# Wraps one logical model call (generate + parse) in:
+# - classified retries: transient failures (timeouts, 429/5xx, connection
+#   resets, unparseable output) are retried with full-jitter exponential
+#   backoff; anything else fails at once,
+# - a per-request deadline that bounds all attempts and backoff together,
+# - optional hedging: if an attempt outlives the observed p95 latency, a
+#   second one is started and the first success wins,
+# - a circuit breaker that stops calling a failing backend for a while so
+#   requests degrade straight to the local surface factory.
+
+# An attempt gets the seconds it may take and returns the parsed response
+Attempt = Callable[[float], Awaitable[Any]]
+
+_TRANSIENT_NAMES = {
+    "ServiceUnavailable", "InternalServerError", "DeadlineExceeded", "ResourceExhausted",
+    "TooManyRequests", "Aborted", "Unavailable", "ConnectionError", "ConnectionResetError",
+}
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling the model while the breaker is open."""
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, AdmissionRejected):
+        return False
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError, ValueError)):
+        # ValueError covers malformed JSON from the model (json/orjson/msgspec)
+        return True
+    if type(error).__name__ in _TRANSIENT_NAMES or is_overload_error(error):
+        return True
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    return isinstance(code, int) and code >= 500
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failed calls;
+    open -> half-open after `reset_timeout`, letting a single probe through;
+    the probe's outcome closes or re-opens it.
+    """
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.stats = {"opened": 0, "short_circuited": 0}
+
+    def allow(self) -> bool:
+        if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self._probing:
+                self.stats["short_circuited"] += 1
+                return False
+            self._probing = True
+            return True
+        if self.state == "open":
+            self.stats["short_circuited"] += 1
+            return False
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self._probing = False
+        self.state = "closed"
+
+    def record_failure(self):
+        self._probing = False
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.stats["opened"] += 1
+                logger.warning(f"Model circuit opened after {self.failures} failures")
+            self.state = "open"
+            self._opened_at = time.monotonic()
+
+    def release_probe(self):
+        """A probe that ended without a verdict (e.g. cancelled) frees the slot for the next one."""
+        self._probing = False
+
+
+class ResilientCaller:
+    def __init__(
+        self,
+        deadline: float = 30.0,
+        max_attempts: int = 3,
+        base_delay: float = 0.2,
+        max_delay: float = 2.0,
+        hedge: bool = False,
+        hedge_quantile: float = 0.95,
+        hedge_initial_delay: float = 2.0,
+        hedge_min_samples: int = 20,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.deadline = deadline
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_initial_delay = hedge_initial_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker = breaker or CircuitBreaker()
+        self._latencies: Deque[float] = deque(maxlen=500)
+        self.stats = {"calls": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "failures": 0}
+
+    @classmethod
+    def from_env(cls, default_deadline: float = 30.0) -> "ResilientCaller":
+        return cls(
+            deadline=float(os.environ.get("GENAI_DEADLINE_SECONDS", str(default_deadline))),
+            max_attempts=int(os.environ.get("GENAI_MAX_ATTEMPTS", "3")),
+            base_delay=float(os.environ.get("GENAI_RETRY_BASE_SECONDS", "0.2")),
+            max_delay=float(os.environ.get("GENAI_RETRY_MAX_SECONDS", "2")),
+            hedge=os.environ.get("GENAI_HEDGE", "false").lower() in ("1", "true", "yes"),
+            hedge_quantile=float(os.environ.get("GENAI_HEDGE_QUANTILE", "0.95")),
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.environ.get("GENAI_BREAKER_FAILURES", "5")),
+                reset_timeout=float(os.environ.get("GENAI_BREAKER_RESET_SECONDS", "30")),
+            ),
+        )
+
+    def hedge_delay(self) -> float:
+        if len(self._latencies) < self.hedge_min_samples:
+            return self.hedge_initial_delay
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(math.ceil(self.hedge_quantile * len(ordered))) - 1)]
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: uniform in [0, min(max_delay, base * 2^attempt)]
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    async def _timed(self, attempt: Attempt, timeout: float) -> Any:
+        start = time.monotonic()
+        result = await attempt(timeout)
+        self._latencies.append(time.monotonic() - start)
+        return result
+
+    async def _hedged(self, attempt: Attempt, timeout: float) -> Any:
+        """Runs `attempt`, adding a second copy if the first is slower than the hedge delay."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        tasks: Set[asyncio.Task] = {asyncio.ensure_future(self._timed(attempt, timeout))}
+        primary = next(iter(tasks))
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=min(self.hedge_delay(), timeout))
+            if not done:
+                self.stats["hedges"] += 1
+                tasks.add(asyncio.ensure_future(self._timed(attempt, max(deadline - loop.time(), 0))))
+            error: Optional[BaseException] = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.stats["hedge_wins"] += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def call(self, attempt: Attempt) -> Any:
+        """Runs `attempt` under the retry, deadline, hedging and breaker policies."""
+        if not self.breaker.allow():
+            raise CircuitOpen("model circuit is open")
+        self.stats["calls"] += 1
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline
+        try:
+            for n in range(self.max_attempts):
+                remaining = deadline - loop.time()
+                try:
+                    if self.hedge:
+                        result = await self._hedged(attempt, remaining)
+                    else:
+                        result = await self._timed(attempt, remaining)
+                    self.breaker.record_success()
+                    return result
+                except Exception as e:
+                    if isinstance(e, AdmissionRejected):
+                        self.breaker.release_probe()
+                        raise
+                    delay = self._backoff(n)
+                    last_try = n == self.max_attempts - 1 or loop.time() + delay >= deadline
+                    if not is_retryable(e) or last_try:
+                        self.stats["failures"] += 1
+                        self.breaker.record_failure()
+                        raise
+                    self.stats["retries"] += 1
+                    logger.info(f"Retrying model call in {delay:.2f}s after: {e}")
+                    await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.breaker.release_probe()
+            raise
+
+    @asynccontextmanager
+    async def guard(self) -> AsyncIterator[None]:
+        """Breaker accounting only, for calls that cannot be retried (e.g. a stream already emitting)."""
+        if not self.breaker.allow():
+            raise CircuitOpen("model circuit is open")
+        try:
+            yield
+        except AdmissionRejected:
+            self.breaker.release_probe()
+            raise
+        except Exception:
+            self.stats["failures"] += 1
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            self.breaker.release_probe()
+            raise
+        else:
+            self.breaker.record_success()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "hedge_delay_ms": round(self.hedge_delay() * 1000, 1) if self.hedge else None,
+            "breaker": {"state": self.breaker.state, "failures": self.breaker.failures, **self.breaker.stats},
+        }
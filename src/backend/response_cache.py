@@ -0,0 +1,297 @@
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from . import codec
+from .awaitables import maybe_await
+from .schemas import MessageLike, message_fields
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# RESPONSE CACHE
+# =============================================================================
+# Sits in front of the model call in process_query. Two tiers:
+#   1. exact: normalized query + fingerprint of the last N history turns and
+#      of the rolling summary of older ones + model
+#   2. semantic (optional): embedding cosine similarity within the same scope
+#      (a miss's embedding is handed back so storing the answer reuses it)
+# Entries live in a pluggable backend (in-process LRU, or Redis-compatible).
+
+_FILLER_WORDS = {"please", "pls", "plz", "kindly", "thanks", "thx"}
+_NON_WORD = re.compile(r"[^\w\s]+")
+
+Embedder = Callable[[str], Union[List[float], Awaitable[List[float]]]]
+
+
+def normalize_query(query: str) -> str:
+    """Lowercases, strips punctuation and filler words, collapses whitespace."""
+    words = _NON_WORD.sub(" ", query.lower()).split()
+    return " ".join(w for w in words if w not in _FILLER_WORDS)
+
+
+def history_fingerprint(history: Optional[Sequence[MessageLike]], turns: int) -> str:
+    """Stable hash of the last `turns` history messages ("" when there are none)."""
+    recent = list(history or [])[-turns:] if turns > 0 else []
+    if not recent:
+        return ""
+    digest = hashlib.sha1()
+    for h in recent:
+        role, text = message_fields(h)
+        digest.update(f"{role}\x1f{text}\x1e".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class InMemoryCacheBackend:
+    """Size-bounded LRU with per-entry TTL, local to the process."""
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: float):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: str):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisCacheBackend:
+    """
+    Redis-compatible backend. Works with `redis.Redis`, `redis.asyncio.Redis`
+    or any fake exposing get/set(ex=)/delete. TTL and eviction are delegated to
+    the server (configure `maxmemory-policy allkeys-lru` for size bounds).
+    """
+    def __init__(self, client: Any, prefix: str = "agentui:response:"):
+        self.client = client
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await maybe_await(self.client.get(self.prefix + key))
+        return codec.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any, ttl: float):
+        await maybe_await(self.client.set(self.prefix + key, codec.dumps(value), ex=max(int(math.ceil(ttl)), 1)))
+
+    async def delete(self, key: str):
+        await maybe_await(self.client.delete(self.prefix + key))
+
+    def clear(self):
+        # Keys expire on their own; flushing a shared Redis is not ours to do
+        pass
+
+
+def _cosine(a: Sequence[float], b: Sequence[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class CacheLookup(NamedTuple):
+    result: Optional[Dict[str, Any]]
+    # The query's embedding when the semantic tier computed one; pass it to `put`
+    vector: Optional[List[float]] = None
+
+
+class ResponseCache:
+    """
+    Two-tier response cache with hit/miss counters.
+    The semantic tier is enabled by passing an `embedder` (text -> vector);
+    its index is process-local and bounded to `max_semantic_entries`.
+    """
+    def __init__(
+        self,
+        backend: Any = None,
+        ttl: float = 300,
+        history_turns: int = 3,
+        embedder: Optional[Embedder] = None,
+        similarity_threshold: float = 0.92,
+        max_semantic_entries: int = 512,
+    ):
+        self.backend = backend if backend is not None else InMemoryCacheBackend()
+        self.ttl = ttl
+        self.history_turns = history_turns
+        self.embedder = embedder
+        self.similarity_threshold = similarity_threshold
+        self.max_semantic_entries = max_semantic_entries
+        self._semantic_index: "OrderedDict[str, Tuple[str, List[float]]]" = OrderedDict()
+        self.stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "stores": 0, "errors": 0}
+
+    def _scope(self, history: Optional[Sequence[MessageLike]], model_name: str, summary: Optional[str]) -> str:
+        summary_fingerprint = hashlib.sha1(summary.encode("utf-8")).hexdigest() if summary else ""
+        return f"{model_name}|{history_fingerprint(history, self.history_turns)}|{summary_fingerprint}"
+
+    @staticmethod
+    def _key(scope: str, normalized: str) -> str:
+        return hashlib.sha1(f"{scope}|{normalized}".encode("utf-8")).hexdigest()
+
+    async def get(
+        self,
+        query: str,
+        history: Optional[Sequence[MessageLike]],
+        model_name: str,
+        summary: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        return (await self.lookup(query, history, model_name, summary)).result
+
+    async def lookup(
+        self,
+        query: str,
+        history: Optional[Sequence[MessageLike]],
+        model_name: str,
+        summary: Optional[str] = None,
+    ) -> CacheLookup:
+        """Like `get`, but a semantic-tier miss also returns the query's embedding for `put`."""
+        scope = self._scope(history, model_name, summary)
+        normalized = normalize_query(query)
+        vector = None
+        try:
+            value = await maybe_await(self.backend.get(self._key(scope, normalized)))
+            if value is not None:
+                self.stats["exact_hits"] += 1
+                return CacheLookup(value)
+            if self.embedder is not None:
+                vector = list(await maybe_await(self.embedder(normalized)))
+                if self._semantic_index:
+                    value = await self._semantic_get(scope, vector)
+                    if value is not None:
+                        self.stats["semantic_hits"] += 1
+                        return CacheLookup(value, vector)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"Response cache lookup failed: {e}")
+        self.stats["misses"] += 1
+        return CacheLookup(None, vector)
+
+    async def put(
+        self,
+        query: str,
+        history: Optional[Sequence[MessageLike]],
+        model_name: str,
+        result: Dict[str, Any],
+        summary: Optional[str] = None,
+        vector: Optional[List[float]] = None,
+    ):
+        """Stores `result`; `vector` is the embedding from this query's `lookup`, computed here if absent."""
+        scope = self._scope(history, model_name, summary)
+        normalized = normalize_query(query)
+        key = self._key(scope, normalized)
+        try:
+            await maybe_await(self.backend.set(key, result, self.ttl))
+            self.stats["stores"] += 1
+            if self.embedder is not None:
+                if vector is None:
+                    vector = await maybe_await(self.embedder(normalized))
+                self._semantic_index[key] = (scope, list(vector))
+                self._semantic_index.move_to_end(key)
+                while len(self._semantic_index) > self.max_semantic_entries:
+                    self._semantic_index.popitem(last=False)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"Response cache store failed: {e}")
+
+    async def _semantic_get(self, scope: str, vector: List[float]) -> Optional[Dict[str, Any]]:
+        best_key, best_score = None, self.similarity_threshold
+        for key, (entry_scope, entry_vector) in self._semantic_index.items():
+            if entry_scope != scope:
+                continue
+            score = _cosine(vector, entry_vector)
+            if score >= best_score:
+                best_key, best_score = key, score
+        if best_key is None:
+            return None
+        value = await maybe_await(self.backend.get(best_key))
+        if value is None:
+            # Expired or evicted in the backend; drop the stale vector too
+            self._semantic_index.pop(best_key, None)
+        return value
+
+    def clear(self):
+        self.backend.clear()
+        self._semantic_index.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters for tuning, plus the derived hit ratio."""
+        lookups = self.stats["exact_hits"] + self.stats["semantic_hits"] + self.stats["misses"]
+        hits = lookups - self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "semantic_index_size": len(self._semantic_index),
+        }
+
+
+def vertex_embedder(model_name: str) -> Embedder:
+    """Embeds text with a Vertex AI text embedding model, off the event loop."""
+    from vertexai.language_models import TextEmbeddingModel
+
+    model = TextEmbeddingModel.from_pretrained(model_name)
+
+    async def embed(text: str) -> List[float]:
+        embeddings = await asyncio.to_thread(model.get_embeddings, [text])
+        return embeddings[0].values
+
+    return embed
+
+
+def build_response_cache_from_env() -> Optional[ResponseCache]:
+    """
+    RESPONSE_CACHE_TTL_SECONDS (0 disables), RESPONSE_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_HISTORY_TURNS, RESPONSE_CACHE_REDIS_URL,
+    RESPONSE_CACHE_EMBEDDING_MODEL and RESPONSE_CACHE_SIMILARITY_THRESHOLD.
+    """
+    ttl = float(os.environ.get("RESPONSE_CACHE_TTL_SECONDS", "300"))
+    if ttl <= 0:
+        return None
+
+    backend: Any = InMemoryCacheBackend(int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "1024")))
+    redis_url = os.environ.get("RESPONSE_CACHE_REDIS_URL")
+    if redis_url:
+        try:
+            import redis.asyncio as redis_asyncio
+            backend = RedisCacheBackend(redis_asyncio.from_url(redis_url))
+        except ImportError:
+            logger.warning("RESPONSE_CACHE_REDIS_URL set but redis is not installed; using in-process cache")
+
+    embedder = None
+    embedding_model = os.environ.get("RESPONSE_CACHE_EMBEDDING_MODEL")
+    if embedding_model:
+        try:
+            embedder = vertex_embedder(embedding_model)
+        except Exception as e:
+            logger.warning(f"Semantic cache tier disabled: {e}")
+
+    return ResponseCache(
+        backend=backend,
+        ttl=ttl,
+        history_turns=int(os.environ.get("RESPONSE_CACHE_HISTORY_TURNS", "3")),
+        embedder=embedder,
+        similarity_threshold=float(os.environ.get("RESPONSE_CACHE_SIMILARITY_THRESHOLD", "0.92")),
+    )
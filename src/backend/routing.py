@@ -0,0 +1,144 @@
+import os
+from collections import deque
+from typing import Any, Deque, Dict, List, NamedTuple, Optional, Tuple
+
+from .classifier import IntentMatch
+from .domain_config import DOMAIN_CONFIG
+
+# =============================================================================
+# MODEL ROUTING
+# =============================================================================
+# Picks a model per query from the manifest's `routing` block: cheap, fast
+# models for confident simple intents and for first-pass classification, and
+# a larger model for ambiguous queries. Each route keeps latency, token and
+# cost stats.
+#
+# Routing is opt-in (GENAI_ROUTING=true); otherwise every query goes to
+# GENAI_MODEL. Escalation, which re-asks a pricier route when the cheap one
+# could only answer "general", costs a second sequential model call and is
+# opt-in separately (GENAI_ROUTING_ESCALATION=true).
+
+
+def _enabled(name: str) -> bool:
+    return os.environ.get(name, "false").lower() in ("1", "true", "yes")
+
+
+class Route(NamedTuple):
+    name: str
+    model: str
+    input_cost: float    # USD per million input tokens
+    output_cost: float   # USD per million output tokens
+
+    @property
+    def price(self) -> float:
+        """Orders routes by capability: escalation only moves to a pricier route."""
+        return self.input_cost + self.output_cost
+
+
+class RouteStats:
+    __slots__ = ("calls", "errors", "escalations", "input_tokens", "output_tokens", "cost", "latencies")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.escalations = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cost = 0.0
+        self.latencies: Deque[float] = deque(maxlen=1000)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def snapshot(self) -> Dict[str, Any]:
+        p50, p95 = self.percentile(0.5), self.percentile(0.95)
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "escalations": self.escalations,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cost_usd": round(self.cost, 6),
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        }
+
+
+class ModelRouter:
+    def __init__(self, config: Dict[str, Any], escalate: bool = False):
+        self.routes: Dict[str, Route] = {
+            name: Route(name, spec["model"], float(spec.get("input_cost", 0)), float(spec.get("output_cost", 0)))
+            for name, spec in config["routes"].items()
+        }
+        self.default = self.routes[config.get("default_route", next(iter(self.routes)))]
+        self.rules: List[Dict[str, Any]] = list(config.get("rules", []))
+        escalation = (config.get("escalate") or {}) if escalate else {}
+        self.escalate_intents = set(escalation.get("intents", []))
+        self.escalate_route = self.routes.get(escalation.get("route", ""))
+        for rule in self.rules:
+            if rule["route"] not in self.routes:
+                raise ValueError(f"Routing rule refers to unknown route {rule['route']!r}")
+        self.stats: Dict[str, RouteStats] = {name: RouteStats() for name in self.routes}
+
+    @classmethod
+    def from_manifest(cls) -> Optional["ModelRouter"]:
+        """None (single GENAI_MODEL) unless GENAI_ROUTING=true and the manifest declares routing."""
+        config = DOMAIN_CONFIG.get("routing")
+        if not config or not _enabled("GENAI_ROUTING"):
+            return None
+        return cls(config, escalate=_enabled("GENAI_ROUTING_ESCALATION"))
+
+    @staticmethod
+    def _applies(rule: Dict[str, Any], match: Optional[IntentMatch]) -> bool:
+        intent = match.intent if match else "general"
+        confidence = match.confidence if match else 0.0
+        if "intents" in rule and intent not in rule["intents"]:
+            return False
+        if "min_confidence" in rule and confidence < rule["min_confidence"]:
+            return False
+        if "max_confidence" in rule and confidence > rule["max_confidence"]:
+            return False
+        if "matched" in rule and bool(match) != rule["matched"]:
+            return False
+        return True
+
+    def choose(self, match: Optional[IntentMatch]) -> Route:
+        """Route for a query given the local classifier's match (at any confidence)."""
+        for rule in self.rules:
+            if self._applies(rule, match):
+                return self.routes[rule["route"]]
+        return self.default
+
+    def escalation(self, route: Route, intent: str) -> Optional[Route]:
+        """
+        The route to re-ask on when `route` answered with an escalating intent.
+        None when `route` is already at or above the escalation route, whose
+        answer would cost a second call and replace a stronger model's.
+        """
+        target = self.escalate_route
+        if target is None or intent not in self.escalate_intents or target.price <= route.price:
+            return None
+        self.stats[route.name].escalations += 1
+        return self.escalate_route
+
+    def record(self, route: Route, latency: float, tokens: Optional[Tuple[int, int]]):
+        """Counts one call with its (input, output) token counts; `tokens` is None when it failed."""
+        stats = self.stats[route.name]
+        stats.calls += 1
+        stats.latencies.append(latency)
+        if tokens is None:
+            stats.errors += 1
+            return
+        input_tokens, output_tokens = tokens
+        stats.input_tokens += input_tokens
+        stats.output_tokens += output_tokens
+        stats.cost += (input_tokens * route.input_cost + output_tokens * route.output_cost) / 1_000_000
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            name: {"model": self.routes[name].model, **stats.snapshot()}
+            for name, stats in self.stats.items()
+        }
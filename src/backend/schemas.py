@@ -0,0 +1,216 @@
+import abc
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+# =============================================================================
+# A2UI TYPED MODELS
+# =============================================================================
+# Compact __slots__ types for conversation turns and A2UI surfaces, plus a
+# schema compiled once into per-component validators. Model-produced and
+# manifest-declared surfaces are validated on arrival; after that they are
+# trusted and only converted to plain data at serialization time.
+
+
+class SurfaceValidationError(ValueError):
+    """Raised when a surface does not match the A2UI component schema."""
+
+
+class Message:
+    """One conversation turn. Dicts and other objects with the same keys are accepted interchangeably."""
+    __slots__ = ("role", "text")
+
+    def __init__(self, role: str, text: str):
+        self.role = role
+        self.text = text
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source: Any, handler: Any) -> Any:
+        # Lets request models declare List[Message]: pydantic checks the two
+        # fields and builds the slots object directly, with no model in between
+        from pydantic_core import core_schema
+
+        fields = core_schema.typed_dict_schema({
+            "role": core_schema.typed_dict_field(core_schema.str_schema()),
+            "text": core_schema.typed_dict_field(core_schema.str_schema()),
+        })
+        from_fields = core_schema.no_info_after_validator_function(lambda data: cls(data["role"], data["text"]), fields)
+        return core_schema.json_or_python_schema(
+            json_schema=from_fields,
+            python_schema=core_schema.union_schema([core_schema.is_instance_schema(cls), from_fields]),
+            serialization=core_schema.plain_serializer_function_ser_schema(cls.to_dict),
+        )
+
+    def to_dict(self) -> Dict[str, str]:
+        return {"role": self.role, "text": self.text}
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, Message) and (self.role, self.text) == (other.role, other.text)
+
+    def __repr__(self) -> str:
+        return f"Message(role={self.role!r}, text={self.text!r})"
+
+
+MessageLike = Union[Message, Dict[str, str], Any]
+
+
+def message_fields(message: MessageLike) -> Tuple[str, str]:
+    """(role, text) from a Message, a dict or any object with those attributes, without copying."""
+    if isinstance(message, dict):
+        return message["role"], message["text"]
+    return message.role, message.text
+
+
+class Component(abc.ABC):
+    __slots__ = ()
+    type_name = ""
+
+    @abc.abstractmethod
+    def to_dict(self) -> Dict[str, Any]:
+        ...
+
+
+class Text(Component):
+    __slots__ = ("text", "variant")
+    type_name = "Text"
+
+    def __init__(self, text: str, variant: Optional[str] = None):
+        self.text = text
+        self.variant = variant
+
+    def to_dict(self) -> Dict[str, Any]:
+        props: Dict[str, Any] = {"text": self.text}
+        if self.variant is not None:
+            props["variant"] = self.variant
+        return {"type": "Text", "props": props}
+
+
+class StatBar(Component):
+    __slots__ = ("label", "value", "color")
+    type_name = "StatBar"
+
+    def __init__(self, label: str, value: float, color: Optional[str] = None):
+        self.label = label
+        self.value = value
+        self.color = color
+
+    def to_dict(self) -> Dict[str, Any]:
+        props: Dict[str, Any] = {"label": self.label, "value": self.value}
+        if self.color is not None:
+            props["color"] = self.color
+        return {"type": "StatBar", "props": props}
+
+
+class Card(Component):
+    __slots__ = ("title", "children")
+    type_name = "Card"
+
+    def __init__(self, title: Optional[str] = None, children: Optional[List[Component]] = None):
+        self.title = title
+        self.children = children or []
+
+    def to_dict(self) -> Dict[str, Any]:
+        node: Dict[str, Any] = {"type": "Card"}
+        if self.title is not None:
+            node["props"] = {"title": self.title}
+        if self.children:
+            node["children"] = [c.to_dict() for c in self.children]
+        return node
+
+
+class List_(Component):
+    """The A2UI `List` component (trailing underscore avoids shadowing typing.List)."""
+    __slots__ = ("title", "items")
+    type_name = "List"
+
+    def __init__(self, items: List[str], title: Optional[str] = None):
+        self.items = items
+        self.title = title
+
+    def to_dict(self) -> Dict[str, Any]:
+        props: Dict[str, Any] = {"items": list(self.items)}
+        if self.title is not None:
+            props["title"] = self.title
+        return {"type": "List", "props": props}
+
+
+class Surface:
+    __slots__ = ("surface_id", "content")
+
+    def __init__(self, surface_id: str, content: List[Component]):
+        self.surface_id = surface_id
+        self.content = content
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"surfaceId": self.surface_id, "content": [c.to_dict() for c in self.content]}
+
+
+# -- schema ------------------------------------------------------------------
+# type name -> (class, {prop: (python types, required)}, accepts children)
+
+_NUMBER = (int, float)
+COMPONENT_SCHEMA: Dict[str, Tuple[type, Dict[str, Tuple[Tuple[type, ...], bool]], bool]] = {
+    "Text": (Text, {"text": ((str,), True), "variant": ((str,), False)}, False),
+    "StatBar": (StatBar, {"label": ((str,), True), "value": (_NUMBER, True), "color": ((str,), False)}, False),
+    "Card": (Card, {"title": ((str,), False)}, True),
+    "List": (List_, {"items": ((list,), True), "title": ((str,), False)}, False),
+}
+
+Validator = Callable[[Any, str], Component]
+
+
+def _compile_component(type_name: str, cls: type, props_spec: Dict[str, Tuple[Tuple[type, ...], bool]], has_children: bool) -> Validator:
+    required = [name for name, (_, req) in props_spec.items() if req]
+    checks = [(name, types) for name, (types, _) in props_spec.items()]
+
+    def validate(node: Dict[str, Any], path: str) -> Component:
+        props = node.get("props") or {}
+        if not isinstance(props, dict):
+            raise SurfaceValidationError(f"{path}.props must be an object")
+        for name in required:
+            if name not in props:
+                raise SurfaceValidationError(f"{path}: {type_name} requires props.{name}")
+        values = {}
+        for name, types in checks:
+            if name in props:
+                value = props[name]
+                if not isinstance(value, types) or isinstance(value, bool):
+                    raise SurfaceValidationError(f"{path}.props.{name} has invalid type {type(value).__name__}")
+                values[name] = value
+        if type_name == "List" and not all(isinstance(i, str) for i in values["items"]):
+            raise SurfaceValidationError(f"{path}.props.items must be a list of strings")
+        if has_children:
+            children = node.get("children") or []
+            if not isinstance(children, list):
+                raise SurfaceValidationError(f"{path}.children must be a list")
+            values["children"] = [_validate_component(c, f"{path}.children[{i}]") for i, c in enumerate(children)]
+        elif "children" in node:
+            raise SurfaceValidationError(f"{path}: {type_name} does not accept children")
+        return cls(**values)
+
+    return validate
+
+
+_VALIDATORS: Dict[str, Validator] = {
+    name: _compile_component(name, cls, spec, has_children) for name, (cls, spec, has_children) in COMPONENT_SCHEMA.items()
+}
+
+
+def _validate_component(node: Any, path: str) -> Component:
+    if not isinstance(node, dict):
+        raise SurfaceValidationError(f"{path} must be an object")
+    validator = _VALIDATORS.get(node.get("type"))
+    if validator is None:
+        raise SurfaceValidationError(f"{path}: unknown component type {node.get('type')!r}")
+    return validator(node, path)
+
+
+def validate_surface(data: Any) -> Surface:
+    """Validates a surface dict (e.g. produced by the model) into typed components."""
+    if not isinstance(data, dict):
+        raise SurfaceValidationError("surface must be an object")
+    surface_id = data.get("surfaceId")
+    if not isinstance(surface_id, str) or not surface_id:
+        raise SurfaceValidationError("surface.surfaceId must be a non-empty string")
+    content = data.get("content")
+    if not isinstance(content, list):
+        raise SurfaceValidationError("surface.content must be a list")
+    return Surface(surface_id, [_validate_component(c, f"content[{i}]") for i, c in enumerate(content)])
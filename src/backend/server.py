@@ -0,0 +1,148 @@
+import importlib
+import inspect
+import logging
+import math
+import os
+import signal
+import threading
+from typing import Callable, List, Optional
+
+import uvicorn
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# PRODUCTION SERVER
+# =============================================================================
+# `python -m backend.server` runs WEB_CONCURRENCY uvicorn workers (default:
+# the CPUs this container may use) on one shared listening socket, with
+# uvloop and httptools when installed ("auto"). Workers are spawned, not
+# forked, and import the app themselves, so every per-process singleton
+# (orchestrator, auth manager, caches, thread pools) is built inside its
+# worker and nothing is inherited from the supervisor, which never imports
+# the app.
+#
+# On SIGTERM each worker runs the drain hooks registered with `on_drain`
+# (e.g. ending live log tails so they do not hold the shutdown open), stops
+# accepting connections, lets in-flight requests and streams finish for up
+# to GRACEFUL_TIMEOUT_SECONDS, then runs the app's lifespan shutdown. The
+# hooks are chained in front of uvicorn's own signal handlers by
+# `install_drain_handler`, which the app calls from its lifespan startup:
+# that is the one place that runs inside every worker, whichever server
+# class the supervisor builds.
+#
+# State that must be shared between workers lives outside the process:
+# sessions and the response cache in Redis (SESSION_REDIS_URL,
+# RESPONSE_CACHE_REDIS_URL); the interaction log is one file appended under
+# a file lock (see interaction_log.py).
+
+_drain_hooks: List[Callable[[], None]] = []
+_drained = False
+
+
+def on_drain(hook: Callable[[], None]):
+    """
+    Registers a callback run when the worker is asked to shut down, before
+    connections drain. It runs in a signal handler: keep it to setting flags
+    and scheduling work with `loop.call_soon_threadsafe`.
+    """
+    _drain_hooks.append(hook)
+
+
+def available_cpus() -> int:
+    """CPUs this process may use: the cgroup quota (Cloud Run, Docker --cpus) or affinity mask."""
+    try:
+        count = len(os.sched_getaffinity(0))
+    except AttributeError:
+        count = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            count = min(count, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return max(1, count)
+
+
+def run_drain_hooks():
+    """Runs every `on_drain` hook once; a failing hook does not stop the others or the shutdown."""
+    global _drained
+    if _drained:
+        return
+    _drained = True
+    for hook in list(_drain_hooks):
+        try:
+            hook()
+        except Exception as e:
+            logger.warning(f"Drain hook failed: {e}")
+
+
+def install_drain_handler():
+    """
+    Chains `run_drain_hooks` in front of the current SIGTERM/SIGINT handlers.
+    Call from the app's lifespan startup, after uvicorn has installed its
+    handlers; a no-op off the main thread (e.g. under a test client).
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        previous = signal.getsignal(sig)
+
+        def handler(signum, frame, previous=previous):
+            run_drain_hooks()
+            if callable(previous):
+                previous(signum, frame)
+            else:
+                signal.signal(signum, previous)
+                signal.raise_signal(signum)
+
+        signal.signal(sig, handler)
+
+
+def build_config(app: str = "backend.agent:app", workers: Optional[int] = None) -> uvicorn.Config:
+    return uvicorn.Config(
+        app,
+        host=os.environ.get("HOST", "0.0.0.0"),
+        port=int(os.environ.get("PORT", "8080")),
+        workers=workers or int(os.environ.get("WEB_CONCURRENCY", "0")) or available_cpus(),
+        loop="auto",    # uvloop when installed
+        http="auto",    # httptools when installed
+        timeout_graceful_shutdown=float(os.environ.get("GRACEFUL_TIMEOUT_SECONDS", "8")),
+        log_level=os.environ.get("LOG_LEVEL", "info").lower(),
+        access_log=os.environ.get("ACCESS_LOG", "false").lower() in ("1", "true", "yes"),
+        proxy_headers=True,
+        forwarded_allow_ips="*",
+    )
+
+
+def run(config: uvicorn.Config):
+    if config.workers <= 1:
+        uvicorn.Server(config).run()
+        return
+    if not os.environ.get("SESSION_REDIS_URL"):
+        logger.warning(
+            f"{config.workers} workers without SESSION_REDIS_URL: server-side sessions are per worker "
+            "and a follow-up request may not find its conversation"
+        )
+    from uvicorn.supervisors import Multiprocess
+    sock = config.bind_socket()
+    if "target" in inspect.signature(Multiprocess).parameters:
+        # Older uvicorn releases take the worker entry point explicitly
+        Multiprocess(config, target=uvicorn.Server(config).run, sockets=[sock]).run()
+    else:
+        Multiprocess(config, sockets=[sock]).run()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    config = build_config(os.environ.get("APP_MODULE", "backend.agent:app"))
+    logger.info(f"🚀 Starting Agent Cockpit Engine on {config.host}:{config.port} with {config.workers} worker(s)")
+    run(config)
+
+
+if __name__ == "__main__":
+    # Through the importable module, so the supervisor, the workers and the
+    # app share one `backend.server` (and one hook registry) rather than a
+    # second copy named __main__
+    importlib.import_module("backend.server").main()
@@ -0,0 +1,137 @@
+import logging
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, List, NamedTuple, Optional, Sequence, Tuple
+
+from . import codec
+from .awaitables import maybe_await
+from .schemas import Message, MessageLike, message_fields
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# SESSION STORE
+# =============================================================================
+# Server-side conversation state for session mode: a rolling summary plus
+# the verbatim tail of recent turns (see history.py). Clients send a
+# `session_id` and only the new turns. Appends are O(1) on both backends,
+# and compaction drops folded turns from the head of the list.
+
+
+class SessionData(NamedTuple):
+    summary: Optional[str]
+    turns: List[MessageLike]    # oldest first
+
+
+class _Session:
+    __slots__ = ("expires_at", "summary", "turns")
+
+    def __init__(self):
+        self.expires_at = 0.0
+        self.summary: Optional[str] = None
+        self.turns: Deque[MessageLike] = deque()
+
+
+class InMemorySessionStore:
+    """Process-local store: LRU over sessions, each idle-expiring after `ttl` seconds."""
+    def __init__(self, max_sessions: int = 10000, ttl: float = 3600):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self.evictions = 0
+
+    def _get(self, session_id: str, create: bool) -> Optional[_Session]:
+        now = time.monotonic()
+        session = self._sessions.get(session_id)
+        if session is not None and session.expires_at <= now:
+            del self._sessions[session_id]
+            session = None
+        if session is None:
+            if not create:
+                return None
+            session = self._sessions[session_id] = _Session()
+        session.expires_at = now + self.ttl
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evictions += 1
+        return session
+
+    def load(self, session_id: str) -> SessionData:
+        session = self._get(session_id, create=False)
+        if session is None:
+            return SessionData(None, [])
+        return SessionData(session.summary, list(session.turns))
+
+    def append(self, session_id: str, turns: Sequence[MessageLike]):
+        self._get(session_id, create=True).turns.extend(turns)
+
+    def compact(self, session_id: str, summary: Optional[str], drop: int):
+        """Replaces the summary and removes the `drop` oldest turns it now covers."""
+        session = self._get(session_id, create=True)
+        session.summary = summary
+        for _ in range(min(drop, len(session.turns))):
+            session.turns.popleft()
+
+    def delete(self, session_id: str):
+        self._sessions.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+class RedisSessionStore:
+    """
+    Redis-compatible store (sync or asyncio client, or any fake exposing
+    rpush/lrange/ltrim/get/set(ex=)/expire/delete). Turns live in a list per
+    session and the summary in a string key; both expire after `ttl` idle seconds.
+    """
+    def __init__(self, client: Any, prefix: str = "agentui:session:", ttl: float = 3600):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = max(int(math.ceil(ttl)), 1)
+
+    def _keys(self, session_id: str) -> Tuple[str, str]:
+        return f"{self.prefix}{session_id}:turns", f"{self.prefix}{session_id}:summary"
+
+    async def load(self, session_id: str) -> SessionData:
+        turns_key, summary_key = self._keys(session_id)
+        raw_turns = await maybe_await(self.client.lrange(turns_key, 0, -1))
+        raw_summary = await maybe_await(self.client.get(summary_key))
+        turns = [Message(*codec.loads(raw)) for raw in raw_turns or []]
+        if isinstance(raw_summary, bytes):
+            raw_summary = raw_summary.decode("utf-8")
+        return SessionData(raw_summary, turns)
+
+    async def append(self, session_id: str, turns: Sequence[MessageLike]):
+        if not turns:
+            return
+        turns_key, summary_key = self._keys(session_id)
+        await maybe_await(self.client.rpush(turns_key, *(codec.dumps(list(message_fields(t))) for t in turns)))
+        await maybe_await(self.client.expire(turns_key, self.ttl))
+        await maybe_await(self.client.expire(summary_key, self.ttl))
+
+    async def compact(self, session_id: str, summary: Optional[str], drop: int):
+        turns_key, summary_key = self._keys(session_id)
+        if summary is not None:
+            await maybe_await(self.client.set(summary_key, summary, ex=self.ttl))
+        if drop:
+            await maybe_await(self.client.ltrim(turns_key, drop, -1))
+
+    async def delete(self, session_id: str):
+        await maybe_await(self.client.delete(*self._keys(session_id)))
+
+
+def build_session_store_from_env() -> Any:
+    """SESSION_MAX_ENTRIES, SESSION_TTL_SECONDS and SESSION_REDIS_URL (shared across workers)."""
+    ttl = float(os.environ.get("SESSION_TTL_SECONDS", "3600"))
+    redis_url = os.environ.get("SESSION_REDIS_URL")
+    if redis_url:
+        try:
+            import redis.asyncio as redis_asyncio
+            return RedisSessionStore(redis_asyncio.from_url(redis_url), ttl=ttl)
+        except ImportError:
+            logger.warning("SESSION_REDIS_URL set but redis is not installed; using in-process sessions")
+    return InMemorySessionStore(int(os.environ.get("SESSION_MAX_ENTRIES", "10000")), ttl=ttl)
@@ -0,0 +1,286 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import codec
+
+# =============================================================================
+# STREAMING RESPONSE PARSER
+# =============================================================================
+# Consumes the model's `{intent, text, keywords}` JSON as it streams in and
+# emits events as soon as they can be known: the intent the moment its value
+# closes, and the text value as incremental deltas.
+#
+# It is also deliberately tolerant, so common model slips cost a repair
+# instead of a retry or a fallback:
+# - prose or ```json fences around the object are skipped,
+# - trailing commas are ignored, including inside nested values,
+# - truncated output keeps every value received (`finish()`); an unclosed
+#   nested value gets its brackets closed.
+
+_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+Event = Tuple[str, Any]
+
+
+class PartialResponseParser:
+    """
+    Incremental scanner for a flat JSON object whose values are mostly strings.
+    Call `feed()` with each chunk; it returns the events the chunk completed:
+      ("intent", "<name>")  once the intent string is closed
+      ("text", "<delta>")   decoded characters of the text value
+    Completed top-level values are available in `fields`.
+    """
+    def __init__(self, stream_keys: Tuple[str, ...] = ("text",)):
+        self.stream_keys = stream_keys
+        self.fields: Dict[str, Any] = {}
+        self._state = "start"
+        self._key: List[str] = []
+        self._value: List[str] = []
+        self._current_key: Optional[str] = None
+        self._escape: Optional[str] = None
+        self._surrogate: Optional[int] = None  # high half of a \uD83D\uDE00 pair
+        self._depth = 0
+        self._in_nested_string = False
+        self.repaired = False
+
+    @property
+    def done(self) -> bool:
+        return self._state == "done"
+
+    def feed(self, chunk: str) -> List[Event]:
+        events: List[Event] = []
+        delta: List[str] = []
+        for ch in chunk:
+            state = self._state
+            if state == "start":
+                if ch == "{":
+                    self._state = "key_or_end"
+            elif state == "key_or_end":
+                if ch == '"':
+                    self._key = []
+                    self._state = "key"
+                elif ch == "}":
+                    self._state = "done"
+            elif state == "key":
+                if self._escape is not None or ch == "\\":
+                    decoded = self._decode_escape(ch)
+                    if decoded is not None:
+                        self._key.append(decoded)
+                    continue
+                if self._surrogate is not None:
+                    self._key.append(self._unpaired_surrogate())
+                if ch == '"':
+                    self._current_key = "".join(self._key)
+                    self._state = "colon"
+                else:
+                    self._key.append(ch)
+            elif state == "colon":
+                if ch == ":":
+                    self._state = "value_start"
+            elif state == "value_start":
+                if ch == '"':
+                    self._value = []
+                    self._state = "string"
+                elif not ch.isspace():
+                    self._value = [ch]
+                    self._depth = 1 if ch in "{[" else 0
+                    self._in_nested_string = False
+                    self._state = "raw"
+            elif state == "string":
+                streaming = self._current_key in self.stream_keys
+                if self._escape is not None or ch == "\\":
+                    decoded = self._decode_escape(ch)
+                    if decoded is not None:
+                        self._value.append(decoded)
+                        if streaming:
+                            delta.append(decoded)
+                    continue
+                if self._surrogate is not None:
+                    decoded = self._unpaired_surrogate()
+                    self._value.append(decoded)
+                    if streaming:
+                        delta.append(decoded)
+                if ch == '"':
+                    self._close_value("".join(self._value), events, delta)
+                else:
+                    self._value.append(ch)
+                    if streaming:
+                        delta.append(ch)
+            elif state == "raw":
+                self._scan_raw(ch, events, delta)
+            elif state == "comma_or_end":
+                if ch == ",":
+                    self._state = "key_or_end"
+                elif ch == "}":
+                    self._state = "done"
+        if delta:
+            events.append(("text", "".join(delta)))
+        return events
+
+    def _decode_escape(self, ch: str) -> Optional[str]:
+        """
+        Accumulates an escape sequence; returns the decoded text once complete.
+        A high surrogate is held until the low half arrives, possibly in a
+        later chunk, so characters outside the BMP (emoji) come out whole.
+        """
+        if self._escape is None:
+            self._escape = ""
+            return None
+        self._escape += ch
+        if self._escape[0] != "u":
+            decoded = _ESCAPES.get(self._escape, self._escape)
+            self._escape = None
+            return self._unpaired_surrogate() + decoded if self._surrogate is not None else decoded
+        if len(self._escape) < 5:
+            return None
+        try:
+            code = int(self._escape[1:], 16)
+        except ValueError:
+            code = None
+        self._escape = None
+        if code is not None and 0xDC00 <= code < 0xE000 and self._surrogate is not None:
+            high, self._surrogate = self._surrogate, None
+            return chr(0x10000 + ((high - 0xD800) << 10) + (code - 0xDC00))
+        prefix = self._unpaired_surrogate() if self._surrogate is not None else ""
+        if code is None:
+            return prefix
+        if 0xD800 <= code < 0xDC00:
+            self._surrogate = code
+            return prefix or None
+        if 0xDC00 <= code < 0xE000:
+            return prefix + "\ufffd"
+        return prefix + chr(code)
+
+    def _unpaired_surrogate(self) -> str:
+        """A held high surrogate with no low half: U+FFFD, since a lone surrogate cannot be encoded."""
+        self._surrogate = None
+        return "\ufffd"
+
+    def _scan_raw(self, ch: str, events: List[Event], delta: List[str]):
+        """Numbers, literals and nested containers are captured verbatim."""
+        if self._depth:
+            self._value.append(ch)
+            if self._in_nested_string:
+                if self._escape is not None:
+                    self._escape = None
+                elif ch == "\\":
+                    self._escape = ""
+                elif ch == '"':
+                    self._in_nested_string = False
+            elif ch == '"':
+                self._in_nested_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if not self._depth:
+                    self._close_raw(events, delta)
+            return
+        if ch == "," or ch == "}" or ch.isspace():
+            self._close_raw(events, delta)
+            if ch == ",":
+                self._state = "key_or_end"
+            elif ch == "}":
+                self._state = "done"
+        else:
+            self._value.append(ch)
+
+    def _close_raw(self, events: List[Event], delta: List[str]):
+        raw = "".join(self._value)
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            try:
+                value = json.loads(repair_json(raw))
+                self.repaired = True
+            except ValueError:
+                value = raw
+        self._close_value(value, events, delta)
+
+    def finish(self) -> List[Event]:
+        """
+        Signals the end of input. A value cut off mid-way is kept as received,
+        except a truncated `intent`, which could name the wrong intent.
+        """
+        events: List[Event] = []
+        delta: List[str] = []
+        if self._state not in ("start", "done"):
+            if self._state == "string" and self._current_key != "intent":
+                self._close_value("".join(self._value), events, delta)
+            elif self._state == "raw":
+                self._close_raw(events, delta)
+            self.repaired = True
+            self._state = "done"
+        if delta:
+            events.append(("text", "".join(delta)))
+        return events
+
+    def result(self) -> Dict[str, Any]:
+        """
+        The parsed fields. Raises ValueError when there are none, or when a
+        repair lost the text, so the caller can retry instead of answering
+        with a placeholder.
+        """
+        if not self.fields or (self.repaired and "text" not in self.fields):
+            raise ValueError("No usable JSON object in model response")
+        return self.fields
+
+    def _close_value(self, value: Any, events: List[Event], delta: List[str]):
+        self.fields[self._current_key] = value
+        self._state = "comma_or_end"
+        if self._current_key == "intent" and isinstance(value, str):
+            if delta:
+                events.append(("text", "".join(delta)))
+                delta.clear()
+            events.append(("intent", value))
+
+
+def repair_json(raw: str) -> str:
+    """Drops trailing commas and closes unterminated strings and containers."""
+    out: List[str] = []
+    closers: List[str] = []
+    in_string = False
+    escape = False
+    for ch in raw:
+        if in_string:
+            out.append(ch)
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            closers.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            while out and out[-1] in ", \n\t\r":
+                if out.pop() == ",":
+                    break
+            if closers:
+                closers.pop()
+        out.append(ch)
+    if in_string:
+        out.append('"')
+    text = "".join(out).rstrip().rstrip(",")
+    return text + "".join(reversed(closers))
+
+
+def parse_response(text: str) -> Dict[str, Any]:
+    """
+    Parses a complete model response with the same tolerance as streaming.
+    Well-formed JSON takes the codec's fast path; see `result()` for when
+    it raises.
+    """
+    try:
+        data = codec.loads(text)
+        if isinstance(data, dict):
+            return data
+    except ValueError:
+        pass
+    parser = PartialResponseParser(stream_keys=())
+    parser.feed(text)
+    parser.finish()
+    return parser.result()
@@ -0,0 +1,263 @@
+import re
+import string
+from typing import Any, Callable, Dict, FrozenSet, List, Mapping, Optional, Tuple
+
+from . import codec
+from .domain_config import DOMAIN_CONFIG
+from .schemas import validate_surface
+
+# =============================================================================
+# A2UI SURFACE TEMPLATES
+# =============================================================================
+# Surfaces are declared once as plain data. Any string containing `{name}`
+# placeholders is a slot filled per request (str.format rules, so `{{` and
+# `}}` are literal braces); everything else is static. Intents in the domain
+# manifest may override or add templates with a `"surface"` entry.
+
+SURFACE_TEMPLATES: Dict[str, Dict[str, Any]] = {
+    "analytics": {
+        "surfaceId": "analytics-view",
+        "content": [
+            {"type": "Text", "props": {"text": "Analytics: {context}", "variant": "h2"}},
+            {"type": "StatBar", "props": {"label": "Performance Index", "value": 85, "color": "#3b82f6"}},
+            {"type": "StatBar", "props": {"label": "Growth Rate", "value": 12, "color": "#10b981"}}
+        ]
+    },
+    "vision": {
+        "surfaceId": "vision-roadmap",
+        "content": [
+            {"type": "Text", "props": {"text": "Strategic Roadmap", "variant": "h2"}},
+            {"type": "Card", "props": {"title": "Phase 1: Foundation"}, "children": [{"type": "Text", "props": {"text": "Laying the global infrastructure for A2UI.", "variant": "body"}}]},
+            {"type": "Card", "props": {"title": "Phase 2: Scale"}, "children": [{"type": "Text", "props": {"text": "Expanding intelligence to niche industries.", "variant": "body"}}]}
+        ]
+    },
+    "directory": {
+        "surfaceId": "directory-list",
+        "content": [
+            {"type": "Text", "props": {"text": "Project Directory", "variant": "h2"}},
+            {"type": "List", "props": {"title": "Active Items", "items": ["Global Supply Chain", "Healthcare Dashboard", "Fintech Bridge"]}}
+        ]
+    },
+    "weather": {
+        "surfaceId": "weather-widget",
+        "content": [
+            {"type": "Text", "props": {"text": "Current Weather: {context}", "variant": "h2"}},
+            {"type": "StatBar", "props": {"label": "Temperature", "value": 72, "color": "#f59e0b"}},
+            {"type": "StatBar", "props": {"label": "Humidity", "value": 45, "color": "#3b82f6"}}
+        ]
+    },
+    "stock": {
+        "surfaceId": "stock-ticker",
+        "content": [
+            {"type": "Text", "props": {"text": "Market Data: {context}", "variant": "h2"}},
+            {"type": "Card", "props": {"title": "GOOGL (Alphabet Inc.)"}, "children": [
+                {"type": "Text", "props": {"text": "$142.50 (+2.4%)", "variant": "h1"}},
+                {"type": "StatBar", "props": {"label": "Volume", "value": 85, "color": "#10b981"}}
+            ]}
+        ]
+    },
+    "time": {
+        "surfaceId": "time-display",
+        "content": [
+            {"type": "Text", "props": {"text": "System Clock", "variant": "h2"}},
+            {"type": "Card", "children": [
+                {"type": "Text", "props": {"text": "10:14 PM GMT-8", "variant": "h1"}},
+                {"type": "Text", "props": {"text": "Tuesday, Jan 27, 2026", "variant": "body"}}
+            ]}
+        ]
+    },
+}
+
+# Used for unknown intents and the fallback path
+DEFAULT_SURFACE_TEMPLATE: Dict[str, Any] = {
+    "surfaceId": "standard-surface",
+    "content": [
+        {"type": "Card", "props": {"title": "Intelligence Node"}, "children": [{"type": "Text", "props": {"text": "Generated responsive UI for: {context}", "variant": "body"}}]}
+    ]
+}
+
+_FORMATTER = string.Formatter()
+_SLOT_MARKER = "\x00slot{}\x00"
+_ENCODED_MARKER = re.compile(r'"\\u0000slot(\d+)\\u0000"')
+
+
+def encode_json(value: Any) -> bytes:
+    """Compact UTF-8 encoding through the shared codec."""
+    return codec.dumps(value)
+
+
+def _slot_fields(text: str) -> List[str]:
+    return [field for _, field, _, _ in _FORMATTER.parse(text) if field is not None]
+
+
+class CompiledSurface:
+    """
+    A template compiled for cheap per-request rendering:
+    - `render()` returns a dict that rebuilds only the containers on the path
+      to a slot; static subtrees are shared between renders (treat as read-only).
+    - `render_json()` substitutes JSON-escaped slot values between cached byte
+      fragments, with no tree walk or re-serialization.
+    """
+    def __init__(self, template: Dict[str, Any]):
+        self.surface_id: str = template["surfaceId"]
+        self.slots: List[str] = []
+        self._build = self._compile(template)
+        self._fragments, self._slot_order = self._compile_json(template)
+
+    def _compile(self, node: Any) -> Callable[[Mapping[str, Any]], Any]:
+        if isinstance(node, str):
+            if not _slot_fields(node):
+                # Unescape `{{`/`}}` once at compile time
+                static = node.format()
+                return lambda values: static
+            for field in _slot_fields(node):
+                if field not in self.slots:
+                    self.slots.append(field)
+            return lambda values: node.format_map(values)
+        if isinstance(node, dict):
+            builders = {k: self._compile(v) for k, v in node.items()}
+            if all(self._is_static(v) for v in node.values()):
+                static = {k: b({}) for k, b in builders.items()}
+                return lambda values: static
+            items = list(builders.items())
+            return lambda values: {k: b(values) for k, b in items}
+        if isinstance(node, list):
+            builders = [self._compile(v) for v in node]
+            if all(self._is_static(v) for v in node):
+                static = [b({}) for b in builders]
+                return lambda values: static
+            return lambda values: [b(values) for b in builders]
+        return lambda values: node
+
+    @classmethod
+    def _is_static(cls, node: Any) -> bool:
+        if isinstance(node, str):
+            return not _slot_fields(node)
+        if isinstance(node, dict):
+            return all(cls._is_static(v) for v in node.values())
+        if isinstance(node, list):
+            return all(cls._is_static(v) for v in node)
+        return True
+
+    def _compile_json(self, template: Dict[str, Any]) -> Tuple[List[bytes], List[str]]:
+        """Serializes the template once, with each slotted string replaced by a marker."""
+        slot_texts: List[str] = []
+
+        def mark(node: Any) -> Any:
+            if isinstance(node, str):
+                if not _slot_fields(node):
+                    return node.format()
+                slot_texts.append(node)
+                return _SLOT_MARKER.format(len(slot_texts) - 1)
+            if isinstance(node, dict):
+                return {k: mark(v) for k, v in node.items()}
+            if isinstance(node, list):
+                return [mark(v) for v in node]
+            return node
+
+        encoded = encode_json(mark(template)).decode("utf-8")
+        fragments: List[bytes] = []
+        order: List[str] = []
+        last = 0
+        for match in _ENCODED_MARKER.finditer(encoded):
+            fragments.append(encoded[last:match.start()].encode("utf-8"))
+            order.append(slot_texts[int(match.group(1))])
+            last = match.end()
+        fragments.append(encoded[last:].encode("utf-8"))
+        return fragments, order
+
+    def render(self, values: Mapping[str, Any]) -> "RenderedSurface":
+        return RenderedSurface(self._build(values), self, values)
+
+    def render_json(self, values: Mapping[str, Any]) -> bytes:
+        parts = [self._fragments[0]]
+        for text, fragment in zip(self._slot_order, self._fragments[1:]):
+            parts.append(encode_json(text.format_map(values)))
+            parts.append(fragment)
+        return b"".join(parts)
+
+
+class RenderedSurface(dict):
+    """
+    A rendered surface: a regular dict (so it logs, caches and compares like
+    one) that can also produce its JSON from the compiled template's cached
+    fragments via `to_json()`.
+    """
+    __slots__ = ("_compiled", "_values", "_json")
+
+    def __init__(self, data: Dict[str, Any], compiled: CompiledSurface, values: Mapping[str, Any]):
+        super().__init__(data)
+        self._compiled = compiled
+        self._values = values
+        self._json: Optional[bytes] = None
+
+    def to_json(self) -> bytes:
+        if self._json is None:
+            self._json = self._compiled.render_json(self._values)
+        return self._json
+
+
+class SurfaceRegistry:
+    """Dispatch table from intent name to compiled surface, with a default for unknown intents."""
+    def __init__(self, templates: Dict[str, Dict[str, Any]], default: Dict[str, Any]):
+        # Templates are checked against the A2UI schema once, here, rather than per render
+        for template in [*templates.values(), default]:
+            validate_surface(template)
+        self._surfaces = {intent: CompiledSurface(t) for intent, t in templates.items()}
+        self.default = CompiledSurface(default)
+
+    @classmethod
+    def from_manifest(cls) -> "SurfaceRegistry":
+        """Built-in templates overlaid with any `"surface"` declared on manifest intents."""
+        templates = dict(SURFACE_TEMPLATES)
+        for intent in DOMAIN_CONFIG["intents"]:
+            if intent.get("surface"):
+                templates[intent["name"]] = intent["surface"]
+        return cls(templates, DEFAULT_SURFACE_TEMPLATE)
+
+    def get(self, intent: str) -> CompiledSurface:
+        return self._surfaces.get(intent, self.default)
+
+    def render(self, intent: str, context: str) -> RenderedSurface:
+        return self.get(intent).render({"context": context})
+
+    def surface_id(self, intent: str) -> str:
+        return self.get(intent).surface_id
+
+    @property
+    def intents(self) -> FrozenSet[str]:
+        return frozenset(self._surfaces)
+
+    @property
+    def surface_ids(self) -> FrozenSet[str]:
+        return frozenset(surface.surface_id for surface in [*self._surfaces.values(), self.default])
+
+
+def surface_id_of(surface: Any) -> str:
+    """surfaceId of a rendered surface dict or a validated model Surface."""
+    if isinstance(surface, dict):
+        return surface.get("surfaceId") or ""
+    return getattr(surface, "surface_id", "") or ""
+
+
+def encode_result(result: Dict[str, Any]) -> bytes:
+    """
+    Encodes an orchestrator result, splicing in pre-rendered surface JSON.
+    Only the small remainder of the result goes through the encoder; native
+    encoders (orjson/msgspec) are faster on the whole dict than Python-level
+    splicing, so with those the result is encoded directly.
+    """
+    if codec.BACKEND != "stdlib":
+        return codec.dumps(result)
+    rest: Dict[str, Any] = {}
+    rendered: List[Tuple[str, RenderedSurface]] = []
+    for key, value in result.items():
+        if isinstance(value, RenderedSurface):
+            rendered.append((key, value))
+        else:
+            rest[key] = value
+    encoded = codec.dumps(rest)
+    if not rendered:
+        return encoded
+    spliced = b",".join(codec.dumps(key) + b":" + value.to_json() for key, value in rendered)
+    return encoded[:-1] + (b"," if rest else b"") + spliced + b"}"
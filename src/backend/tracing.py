@@ -0,0 +1,387 @@
+import contextvars
+import datetime
+import logging
+import os
+import random
+import re
+import secrets
+import time
+import urllib.request
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from . import codec
+from .batch_writer import BatchWriter
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# TRACING
+# =============================================================================
+# OpenTelemetry-style spans for the stages of a query (history, classifier,
+# cache, auth, prompt, model construction, model call, parsing, surface).
+# Whether a trace is recorded is decided once, when its root span starts:
+# by the caller's W3C `traceparent` flag when there is one, otherwise by
+# TRACE_SAMPLE_RATE. Spans of unrecorded traces are one shared no-op object,
+# and with no exporter configured `span()` returns a shared no-op scope, so
+# disabled tracing costs a method call per stage.
+# Finished spans are batched by a `BatchWriter` thread and handed to an
+# exporter: OTLP/HTTP JSON (any OpenTelemetry collector), Google Cloud Trace
+# (google-cloud-trace, optional), or an in-memory list for tests.
+
+_TRACEPARENT = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+# (trace ID, parent span ID, sampled) of a trace continued from a caller
+RemoteParent = Tuple[str, str, bool]
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error", "_tracer")
+    recording = True
+
+    def __init__(self, tracer: "Tracer", name: str, trace_id: str, parent_id: Optional[str]):
+        self._tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = {}
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]):
+        self.attributes.update(attributes)
+
+    def record_exception(self, error: BaseException):
+        self.error = f"{type(error).__name__}: {error}"
+        self.attributes["exception.type"] = type(error).__name__
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            self._tracer._finish(self)
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+
+class _NoopSpan:
+    __slots__ = ()
+    recording = False
+    trace_id = span_id = None
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_attributes(self, attributes: Dict[str, Any]):
+        pass
+
+    def record_exception(self, error: BaseException):
+        pass
+
+    def end(self):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current: "contextvars.ContextVar[Any]" = contextvars.ContextVar("current_span", default=None)
+_remote: "contextvars.ContextVar[Optional[RemoteParent]]" = contextvars.ContextVar("remote_parent", default=None)
+_CURRENT = object()
+
+
+def current_span() -> Any:
+    """The span current in this context, or the no-op span."""
+    return _current.get() or NOOP_SPAN
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[RemoteParent]:
+    match = _TRACEPARENT.match(header.strip().lower()) if header else None
+    if match is None or match.group(1) == "0" * 32:
+        return None
+    return match.group(1), match.group(2), bool(int(match.group(3), 16) & 1)
+
+
+class _Scope:
+    """Makes a span current for a `with` block; an owned span is also ended on exit."""
+    __slots__ = ("span", "_owned", "_token")
+
+    def __init__(self, span: Any, owned: bool = True):
+        self.span = span
+        self._owned = owned
+
+    def __enter__(self) -> Any:
+        self._token = _current.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        _current.reset(self._token)
+        if self._owned:
+            if isinstance(exc, Exception):
+                self.span.record_exception(exc)
+            self.span.end()
+        return False
+
+
+class _NoopScope:
+    __slots__ = ()
+
+    def __enter__(self) -> Any:
+        return NOOP_SPAN
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SCOPE = _NoopScope()
+
+
+class Tracer:
+    """
+    Creates spans and exports finished ones in batches from a writer thread.
+    With `exporter=None` every span is the no-op span. A full queue drops
+    spans rather than blocking the request path.
+    """
+    def __init__(
+        self,
+        exporter: Any = None,
+        sample_rate: float = 1.0,
+        max_queue: int = 2048,
+        batch_size: int = 256,
+        flush_interval: float = 1.0,
+    ):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self._writer: BatchWriter[Span] = BatchWriter(
+            self._export,
+            "trace-exporter",
+            max_queue=max_queue,
+            batch_size=batch_size,
+            flush_interval=flush_interval,
+        )
+        self.stats = {"traces": 0, "spans": 0, "exported": 0, "dropped": 0, "export_errors": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    # -- span creation ---------------------------------------------------------
+
+    def start_span(self, name: str, parent: Any = _CURRENT) -> Any:
+        """
+        A span that is not made current (end it yourself). `parent` defaults
+        to the current span; pass one explicitly where the context does not
+        follow the code, e.g. across the yields of an async generator.
+        """
+        if self.exporter is None:
+            return NOOP_SPAN
+        if parent is _CURRENT:
+            parent = _current.get()
+        if parent is NOOP_SPAN:
+            return NOOP_SPAN
+        if parent is not None:
+            trace_id, parent_id = parent.trace_id, parent.span_id
+        else:
+            remote = _remote.get()
+            if remote is not None:
+                trace_id, parent_id, sampled = remote
+                if not sampled:
+                    return NOOP_SPAN
+            elif self.sample_rate >= 1.0 or random.random() < self.sample_rate:
+                trace_id, parent_id = secrets.token_hex(16), None
+            else:
+                return NOOP_SPAN
+            self.stats["traces"] += 1
+        self.stats["spans"] += 1
+        return Span(self, name, trace_id, parent_id)
+
+    def span(self, name: str, parent: Any = _CURRENT):
+        """`with tracer.span("stage") as span:` -- current for the block, ended on exit."""
+        if self.exporter is None:
+            return _NOOP_SCOPE
+        # An unsampled root is still made current, so its children skip sampling
+        return _Scope(self.start_span(name, parent))
+
+    def use(self, span: Any):
+        """Makes an existing span current for a `with` block without ending it."""
+        if self.exporter is None:
+            return _NOOP_SCOPE
+        return _Scope(span, owned=False)
+
+    @contextmanager
+    def continue_trace(self, traceparent: Optional[str]) -> Iterator[None]:
+        """Root spans started in this block join the caller's trace (W3C `traceparent`)."""
+        remote = parse_traceparent(traceparent) if self.exporter is not None else None
+        if remote is None:
+            yield
+            return
+        token = _remote.set(remote)
+        try:
+            yield
+        finally:
+            _remote.reset(token)
+
+    # -- export ----------------------------------------------------------------
+
+    def _finish(self, span: Span):
+        if not self._writer.put(span):
+            self.stats["dropped"] += 1
+
+    def _export(self, batch: List[Span]):
+        # Runs on the writer thread
+        try:
+            self.exporter.export(batch)
+            self.stats["exported"] += len(batch)
+        except Exception as e:
+            self.stats["export_errors"] += 1
+            logger.warning(f"Trace export failed ({len(batch)} spans lost): {e}")
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Blocks until every span finished so far is exported. Returns False on timeout."""
+        return self._writer.flush(timeout)
+
+    def shutdown(self, timeout: float = 5.0):
+        """Exports pending spans and stops the writer thread."""
+        self._writer.stop(timeout)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "exporter": type(self.exporter).__name__ if self.exporter is not None else None,
+            "sample_rate": self.sample_rate,
+            "queue_depth": self._writer.depth,
+        }
+
+
+# -- exporters -------------------------------------------------------------------
+
+class InMemoryExporter:
+    """Keeps exported spans in a list (tests, local debugging)."""
+    def __init__(self):
+        self.spans: List[Span] = []
+
+    def export(self, spans: List[Span]):
+        self.spans.extend(spans)
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OTLPHttpExporter:
+    """OTLP over HTTP with the JSON encoding, POSTed to `<endpoint>/v1/traces`."""
+    def __init__(self, endpoint: str, service_name: str, timeout: float = 5.0, headers: Optional[Dict[str, str]] = None):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self.timeout = timeout
+        self.headers = {"Content-Type": "application/json", **(headers or {})}
+
+    def encode(self, spans: List[Span]) -> Dict[str, Any]:
+        encoded = []
+        for span in spans:
+            item = {
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": 1,  # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in span.attributes.items()],
+            }
+            if span.parent_id:
+                item["parentSpanId"] = span.parent_id
+            if span.error:
+                item["status"] = {"code": 2, "message": span.error}  # STATUS_CODE_ERROR
+            encoded.append(item)
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+                "scopeSpans": [{"scope": {"name": "backend"}, "spans": encoded}],
+            }]
+        }
+
+    def export(self, spans: List[Span]):
+        request = urllib.request.Request(self.url, data=codec.dumps(self.encode(spans)), headers=self.headers, method="POST")
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+def _cloud_trace_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"bool_value": value}
+    if isinstance(value, int):
+        return {"int_value": value}
+    return {"string_value": {"value": str(value)[:256]}}
+
+
+class CloudTraceExporter:
+    """Google Cloud Trace (v2 API) through the optional google-cloud-trace client."""
+    def __init__(self, project_id: str, client: Any = None):
+        if client is None:
+            from google.cloud import trace_v2
+            client = trace_v2.TraceServiceClient()
+        self.client = client
+        self.project_id = project_id
+
+    def encode(self, span: Span) -> Dict[str, Any]:
+        def timestamp(ns: int) -> datetime.datetime:
+            return datetime.datetime.fromtimestamp(ns / 1e9, tz=datetime.timezone.utc)
+
+        encoded = {
+            "name": f"projects/{self.project_id}/traces/{span.trace_id}/spans/{span.span_id}",
+            "span_id": span.span_id,
+            "display_name": {"value": span.name[:128]},
+            "start_time": timestamp(span.start_ns),
+            "end_time": timestamp(span.end_ns),
+            "attributes": {"attribute_map": {k: _cloud_trace_value(v) for k, v in span.attributes.items()}},
+        }
+        if span.parent_id:
+            encoded["parent_span_id"] = span.parent_id
+        if span.error:
+            encoded["status"] = {"code": 2, "message": span.error}  # google.rpc.Code.UNKNOWN
+        return encoded
+
+    def export(self, spans: List[Span]):
+        self.client.batch_write_spans(name=f"projects/{self.project_id}", spans=[self.encode(s) for s in spans])
+
+
+def build_tracer_from_env() -> Tracer:
+    """
+    TRACE_EXPORTER: none (default), otlp (OTEL_EXPORTER_OTLP_ENDPOINT, default
+    http://localhost:4318) or cloudtrace. TRACE_SAMPLE_RATE: share of traces
+    recorded when the caller did not decide (default 1.0).
+    """
+    kind = os.environ.get("TRACE_EXPORTER", "none").lower()
+    sample_rate = float(os.environ.get("TRACE_SAMPLE_RATE", "1.0"))
+    service_name = os.environ.get("OTEL_SERVICE_NAME", "agent-ui-engine")
+    exporter: Any = None
+    if kind == "otlp":
+        exporter = OTLPHttpExporter(os.environ.get("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318"), service_name)
+    elif kind == "cloudtrace":
+        try:
+            from .auth_manager import get_auth_manager
+            exporter = CloudTraceExporter(get_auth_manager().get_project_id())
+        except Exception as e:
+            logger.warning(f"Cloud Trace unavailable, tracing disabled: {e}")
+    elif kind not in ("", "none"):
+        logger.warning(f"Unknown TRACE_EXPORTER {kind!r}, tracing disabled")
+    if exporter is None or sample_rate <= 0:
+        return Tracer(None, sample_rate=0.0)
+    return Tracer(
+        exporter,
+        sample_rate=sample_rate,
+        max_queue=int(os.environ.get("TRACE_QUEUE_SIZE", "2048")),
+        batch_size=int(os.environ.get("TRACE_BATCH_SIZE", "256")),
+        flush_interval=float(os.environ.get("TRACE_FLUSH_SECONDS", "1")),
+    )
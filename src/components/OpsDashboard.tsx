@@ -1,4 +1,4 @@
-import React, { useEffect, useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import { Terminal, Database, Shield, RefreshCcw, Trash2 } from 'lucide-react';
 
 interface LogEntry {
@@ -11,6 +11,13 @@ const OpsDashboard: React.FC = () => {
   const [logs, setLogs] = useState<LogEntry[]>([]);
   const [health, setHealth] = useState<any>(null);
   const [loading, setLoading] = useState(true);
+  // Timestamp of the newest record shown; the live tail resumes after it
+  const lastSeen = useRef<number | null>(null);
+
+  const showLogs = (entries: LogEntry[]) => {
+    setLogs(entries);
+    if (entries.length) lastSeen.current = entries[entries.length - 1].timestamp;
+  };
 
   const fetchOpsData = async () => {
     try {
@@ -18,7 +25,7 @@ const OpsDashboard: React.FC = () => {
         fetch('http://localhost:8000/agent/logs'),
         fetch('http://localhost:8000/health')
       ]);
-      if (logsRes.ok) setLogs(await logsRes.json());
+      if (logsRes.ok) showLogs(await logsRes.json());
       if (healthRes.ok) setHealth(await healthRes.json());
     } catch (err) {
       console.warn('Backend not reachable for ops data');
@@ -27,15 +34,64 @@ const OpsDashboard: React.FC = () => {
     }
   };
 
+  const fetchHealth = async () => {
+    try {
+      const healthRes = await fetch('http://localhost:8000/health');
+      if (healthRes.ok) setHealth(await healthRes.json());
+    } catch (err) {
+      setHealth(null);
+    }
+  };
+
   const resetLogs = async () => {
     await fetch('http://localhost:8000/agent/debug/reset', { method: 'POST' });
     setLogs([]);
   };
 
   useEffect(() => {
-    fetchOpsData();
-    const interval = setInterval(fetchOpsData, 3000);
-    return () => clearInterval(interval);
+    const healthInterval = setInterval(fetchHealth, 10000);
+    // Push-based tail. Every (re)open follows a fresh /agent/logs read and
+    // replays from the last record seen, so records logged in between are
+    // neither missed nor shown twice.
+    let stream: EventSource | undefined;
+    let retry: ReturnType<typeof setTimeout> | undefined;
+    let unmounted = false;
+
+    const openStream = async () => {
+      await fetchOpsData();
+      if (unmounted) return;
+      const since = lastSeen.current !== null ? `&since=${lastSeen.current}` : '';
+      stream = new EventSource(`http://localhost:8000/agent/logs/stream?replay=50${since}`);
+      stream.onmessage = (event) => {
+        const entry: LogEntry = JSON.parse(event.data);
+        if (lastSeen.current !== null && entry.timestamp <= lastSeen.current) return;
+        lastSeen.current = entry.timestamp;
+        setLogs(prev => [...prev, entry].slice(-50));
+      };
+      // Fell too far behind and was disconnected: re-read the log to fill the gap
+      stream.addEventListener('dropped', () => reconnect(0));
+      // Reconnect ourselves rather than let the browser reuse a stale `since`;
+      // while the backend is unreachable this polls every few seconds
+      stream.onerror = () => reconnect(3000);
+    };
+
+    const reconnect = (delay: number) => {
+      stream?.close();
+      stream = undefined;
+      if (unmounted || retry) return;
+      retry = setTimeout(() => {
+        retry = undefined;
+        openStream();
+      }, delay);
+    };
+
+    openStream();
+    return () => {
+      unmounted = true;
+      stream?.close();
+      clearInterval(healthInterval);
+      if (retry) clearTimeout(retry);
+    };
   }, []);
 
   return (
@@ -0,0 +1,140 @@
+import asyncio
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+DEFAULT_REPLY = {"intent": "analytics", "text": "ok", "keywords": "metrics"}
+
+
+class FakeModels:
+    """
+    Stand-in for the GenerativeModel constructor; pass it as `model_factory`.
+
+    Every model it builds answers from these settings and records into this
+    instance, so each test gets its own state:
+
+    - reply: a dict (sent as JSON), raw response text, an exception to raise,
+      or a callable (model_name, contents) returning one of those
+    - script: (delay, reply) pairs used one per call before falling back to
+      `delay` and `reply`
+    - sync: expose only generate_content, like an SDK without the async API
+    - chunk_size: characters per chunk when streaming
+    - usage: (prompt, candidates) token counts reported as usage_metadata;
+      streams report them on the last chunk
+    - max_concurrent / overload: calls beyond the limit in flight raise
+      overload(), like a per-project quota
+    - build_delay / build_error: blocking or failing model construction
+    """
+
+    def __init__(self, reply=DEFAULT_REPLY, script=(), delay=0.0, sync=False, chunk_size=8, usage=None,
+                 max_concurrent=None, overload=None, build_delay=0.0, build_error=None):
+        self.reply = reply
+        self.script = list(script)
+        self.delay = delay
+        self.sync = sync
+        self.chunk_size = chunk_size
+        self.usage = usage
+        self.max_concurrent = max_concurrent
+        self.overload = overload
+        self.build_delay = build_delay
+        self.build_error = build_error
+        self.built = []  # model names, one per construction
+        self.build_threads = []
+        self.calls = []  # model names, one per generate call
+        self.contents = []
+        self.active = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, model_name, system_instruction):
+        time.sleep(self.build_delay)
+        self.built.append(model_name)
+        self.build_threads.append(threading.current_thread())
+        if self.build_error is not None:
+            raise self.build_error
+        return (SyncFakeModel if self.sync else AsyncFakeModel)(self, model_name)
+
+    def begin(self, model_name, contents):
+        """Records a call and returns its (delay, reply)."""
+        with self._lock:
+            self.calls.append(model_name)
+            self.contents.append(contents)
+            if self.max_concurrent is not None and self.active >= self.max_concurrent:
+                raise self.overload()
+            self.active += 1
+            return self.script.pop(0) if self.script else (self.delay, self.reply)
+
+    def end(self):
+        with self._lock:
+            self.active -= 1
+
+    def answer(self, reply, model_name, contents):
+        """Resolves a reply to response text, raising it if it is an exception."""
+        if callable(reply) and not isinstance(reply, type):
+            reply = reply(model_name, contents)
+        if isinstance(reply, BaseException):
+            raise reply
+        return reply if isinstance(reply, str) else json.dumps(reply)
+
+    def usage_metadata(self):
+        if self.usage is None:
+            return None
+        return SimpleNamespace(prompt_token_count=self.usage[0], candidates_token_count=self.usage[1])
+
+    def chunks(self, text):
+        pieces = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+        return [SimpleNamespace(text=piece, usage_metadata=self.usage_metadata() if i == len(pieces) - 1 else None)
+                for i, piece in enumerate(pieces)]
+
+
+class SyncFakeModel:
+    def __init__(self, owner, model_name):
+        self.owner = owner
+        self.model_name = model_name
+
+    def generate_content(self, contents, generation_config=None, stream=False):
+        delay, reply = self.owner.begin(self.model_name, contents)
+        try:
+            time.sleep(delay)
+        finally:
+            self.owner.end()
+        text = self.owner.answer(reply, self.model_name, contents)
+        if stream:
+            return iter(self.owner.chunks(text))
+        return SimpleNamespace(text=text, usage_metadata=self.owner.usage_metadata())
+
+
+class AsyncFakeModel:
+    def __init__(self, owner, model_name):
+        self.owner = owner
+        self.model_name = model_name
+
+    async def generate_content_async(self, contents, generation_config=None, stream=False):
+        delay, reply = self.owner.begin(self.model_name, contents)
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            self.owner.end()
+        text = self.owner.answer(reply, self.model_name, contents)
+        if not stream:
+            return SimpleNamespace(text=text, usage_metadata=self.owner.usage_metadata())
+
+        async def chunks():
+            for chunk in self.owner.chunks(text):
+                await asyncio.sleep(0)
+                yield chunk
+        return chunks()
+
+
+@pytest.fixture
+def fake_models():
+    """A fresh FakeModels with default settings; configure it in the test."""
+    return FakeModels()
+
+
+@pytest.fixture(scope="session")
+def make_fake_models():
+    """FakeModels itself, for tests that need several or a module-scoped one."""
+    return FakeModels
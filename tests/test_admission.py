@@ -0,0 +1,101 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from backend.admission import AdmissionController, AdmissionRejected, is_overload_error
+from backend.intelligence import IntelligenceOrchestrator
+from backend.resilience import ResilientCaller
+
+
+class ResourceExhausted(Exception):
+    """Same name as the google.api_core quota error."""
+
+
+def test_priority_queue_serves_interactive_first():
+    controller = AdmissionController(max_limit=1)
+    order = []
+
+    async def run():
+        async def job(name, priority):
+            async with controller.admit(priority):
+                order.append(name)
+                await asyncio.sleep(0.01)
+
+        holder = asyncio.ensure_future(job("first", "interactive"))
+        await asyncio.sleep(0)
+        jobs = [asyncio.ensure_future(job("batch", "background")), asyncio.ensure_future(job("user", "interactive"))]
+        await asyncio.gather(holder, *jobs)
+
+    asyncio.run(run())
+    assert order == ["first", "user", "batch"]
+    assert controller.in_flight == 0
+
+
+def test_full_queue_and_long_waits_are_shed():
+    controller = AdmissionController(max_limit=1, max_queue=1, max_wait=0.05)
+
+    async def run():
+        await controller.acquire()
+        waiting = asyncio.ensure_future(controller.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as full:
+            await controller.acquire()
+        with pytest.raises(AdmissionRejected):
+            await waiting
+        return full.value
+
+    rejected = asyncio.run(run())
+    assert rejected.retry_after >= 1 and rejected.reason == "queue full"
+    assert controller.snapshot()["queue_depth"] == 0
+    assert controller.stats["rejected"] == 2 and controller.stats["timed_out"] == 1
+
+
+def test_limit_backs_off_on_quota_errors_and_recovers():
+    controller = AdmissionController(max_limit=8)
+
+    async def run():
+        with pytest.raises(ResourceExhausted):
+            async with controller.admit():
+                raise ResourceExhausted("429 quota exceeded")
+        assert controller.limit == 4
+        for _ in range(40):
+            async with controller.admit():
+                pass
+
+    asyncio.run(run())
+    assert controller.limit == 8
+    assert is_overload_error(SimpleNamespace(code=429)) and not is_overload_error(ValueError("bad json"))
+
+
+def test_burst_against_a_quota_keeps_most_requests_successful(monkeypatch, make_fake_models):
+    monkeypatch.setenv("RESPONSE_CACHE_TTL_SECONDS", "0")
+
+    def burst(admission):
+        # Rejects calls beyond 4 concurrent; no retries, so the limiter alone decides the outcome
+        quota = make_fake_models(delay=0.01, max_concurrent=4, overload=lambda: ResourceExhausted("429 Quota exceeded"))
+        orchestrator = IntelligenceOrchestrator(
+            model_factory=quota, admission=admission, resilience=ResilientCaller(max_attempts=1)
+        )
+
+        async def run():
+            return await asyncio.gather(*(orchestrator.process_query(f"query {i}") for i in range(60)))
+
+        return sum(r["text"] == "ok" for r in asyncio.run(run()))
+
+    unlimited = burst(AdmissionController(max_limit=1000))
+    limited = burst(AdmissionController(max_limit=4, max_queue=100, max_wait=5))
+    assert unlimited <= 4
+    assert limited == 60
+
+
+def test_process_query_raises_when_shed(monkeypatch, fake_models):
+    monkeypatch.setenv("RESPONSE_CACHE_TTL_SECONDS", "0")
+    fake_models.delay = 0.05
+    orchestrator = IntelligenceOrchestrator(model_factory=fake_models, admission=AdmissionController(max_limit=1, max_queue=0))
+
+    async def run():
+        return await asyncio.gather(*(orchestrator.process_query(f"q{i}") for i in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert sum(isinstance(r, AdmissionRejected) for r in results) == 2
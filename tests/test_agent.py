@@ -0,0 +1,184 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+from fastapi.testclient import TestClient
+
+from backend import agent
+from backend.admission import AdmissionRejected
+from backend.intelligence import IntelligenceOrchestrator
+from backend.schemas import Message
+
+GROWTH = {"intent": "analytics", "text": "Growth is up.", "keywords": "metrics"}
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory, make_fake_models):
+    with pytest.MonkeyPatch.context() as mp:
+        mp.chdir(tmp_path_factory.mktemp("agent"))  # interaction log lands here
+        mp.setenv("RESPONSE_CACHE_TTL_SECONDS", "0")
+        mp.setattr(agent, "orchestrator", IntelligenceOrchestrator(model_factory=make_fake_models(reply=GROWTH), metrics=agent.metrics))
+        with TestClient(agent.app) as client:
+            deadline = time.monotonic() + 10
+            while client.get("/ready").status_code != 200 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            yield client
+
+
+def in_flight(endpoint):
+    return agent.metrics.requests_in_flight.labels(endpoint).value
+
+
+def test_app_imports_and_answers_health(client):
+    response = client.get("/health")
+    assert response.status_code == 200
+    assert response.json()["status"] == "healthy"
+
+
+def test_query_returns_the_rendered_surface(client):
+    response = client.post("/agent/query", json={"query": "how are we doing"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["intent"] == "analytics"
+    assert body["text"] == "Growth is up."
+    assert "surface" in body
+    assert in_flight("query") == 0
+
+
+def test_stream_ends_with_the_full_result(client):
+    response = client.post("/agent/query/stream", json={"query": "how are we doing"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert events[-1]["type"] == "done"
+    assert events[-1]["result"]["text"] == "Growth is up."
+    assert in_flight("stream") == 0
+
+
+def test_ready_is_distinct_from_health_and_reports_draining(client, monkeypatch):
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert "models" in response.json()["warmup"]["stages_ms"]
+
+    monkeypatch.setattr(agent, "draining", True)
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json() == {"status": "draining"}
+
+
+def test_metrics_exposes_request_latency_and_readiness(client):
+    client.post("/agent/query", json={"query": "how are we doing"})
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "agent_request_duration_seconds_count{endpoint=\"query\"" in response.text
+    assert "agent_ready 1" in response.text.splitlines()
+
+
+def test_shed_queries_get_503_with_retry_after(client, monkeypatch):
+    async def rejected(*args, **kwargs):
+        raise AdmissionRejected(3, "queue full")
+
+    async def rejected_stream(*args, **kwargs):
+        raise AdmissionRejected(3, "queue full")
+        yield
+
+    monkeypatch.setattr(agent.orchestrator, "process_query", rejected)
+    monkeypatch.setattr(agent.orchestrator, "stream_query", rejected_stream)
+    for path in ("/agent/query", "/agent/query/stream"):
+        response = client.post(path, json={"query": "how are we doing"})
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "3"
+        assert response.json()["retry_after"] == 3
+    assert in_flight("query") == in_flight("stream") == 0
+
+
+def test_stream_errors_before_the_first_event_release_the_in_flight_slot(client, monkeypatch):
+    async def broken_stream(*args, **kwargs):
+        raise RuntimeError("boom")
+        yield
+
+    monkeypatch.setattr(agent.orchestrator, "stream_query", broken_stream)
+    with pytest.raises(RuntimeError):
+        client.post("/agent/query/stream", json={"query": "how are we doing"})
+    assert in_flight("stream") == 0
+
+
+def test_disconnected_client_gets_499_and_the_query_is_cancelled(client, monkeypatch):
+    cancelled = []
+
+    async def slow(*args, **kwargs):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def is_disconnected():
+        return True
+
+    monkeypatch.setattr(agent, "DISCONNECT_POLL_SECONDS", 0.01)
+    monkeypatch.setattr(agent.orchestrator, "process_query", slow)
+    request = agent.ChatRequest(query="how are we doing")
+    http_request = SimpleNamespace(headers={}, is_disconnected=is_disconnected)
+
+    async def run():
+        response = await agent.chat(request, http_request)
+        await asyncio.sleep(0)  # let the cancellation land
+        return response
+
+    response = asyncio.run(run())
+    assert response.status_code == 499
+    assert cancelled == [True]
+    assert in_flight("query") == 0
+
+
+@pytest.mark.filterwarnings("ignore:'backend.agent' found in sys.modules")
+def test_module_entry_point_is_a_single_dev_process_on_port_8000(monkeypatch, tmp_path):
+    import runpy
+
+    import uvicorn
+
+    from backend import server
+
+    calls = []
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(server, "_drain_hooks", [])  # the re-run module registers its own
+    monkeypatch.delenv("PORT", raising=False)
+    monkeypatch.setattr(uvicorn, "run", lambda app, **kwargs: calls.append(kwargs))
+    runpy.run_module("backend.agent", run_name="__main__")
+    assert calls == [{"host": "0.0.0.0", "port": 8000}]
+
+
+def test_session_id_is_passed_to_the_orchestrator(client, monkeypatch):
+    seen = []
+
+    async def process_query(query, history, session_id, priority):
+        seen.append(session_id)
+        return await IntelligenceOrchestrator.process_query(agent.orchestrator, query, history, session_id, priority)
+
+    monkeypatch.setattr(agent.orchestrator, "process_query", process_query)
+    response = client.post("/agent/query", json={"query": "how are we doing", "session_id": "s1"})
+    assert response.status_code == 200
+    assert seen == ["s1"]
+
+
+def test_request_history_arrives_as_messages(client, monkeypatch):
+    seen = []
+
+    async def process_query(query, history, session_id, priority):
+        seen.extend(history)
+        return await IntelligenceOrchestrator.process_query(agent.orchestrator, query, history, session_id, priority)
+
+    monkeypatch.setattr(agent.orchestrator, "process_query", process_query)
+    history = [{"role": "user", "text": "hi"}, {"role": "model", "text": "hello"}]
+    response = client.post("/agent/query", json={"query": "how are we doing", "history": history})
+    assert response.status_code == 200
+    assert seen == [Message("user", "hi"), Message("model", "hello")]
+    assert client.post("/agent/query", json={"query": "q", "history": [{"role": "user"}]}).status_code == 422
@@ -0,0 +1,102 @@
+import asyncio
+import threading
+import time
+
+from backend.auth_manager import AuthManager
+
+
+class CountingAuthManager(AuthManager):
+    """Replaces the network/subprocess token fetch with a slow, counted stub."""
+    def __init__(self, lifetime=3600.0, delay=0.05):
+        super().__init__()
+        self.lifetime = lifetime
+        self.delay = delay
+        self.fetches = 0
+
+    def _fetch_token(self):
+        self.fetches += 1
+        time.sleep(self.delay)
+        return f"token-{self.fetches}", time.time() + self.lifetime
+
+
+def test_concurrent_async_callers_share_one_refresh():
+    auth = CountingAuthManager()
+
+    async def run():
+        tokens = await asyncio.gather(*(auth.get_access_token_async() for _ in range(20)))
+        await auth.stop_background_refresh()
+        return tokens
+
+    assert set(asyncio.run(run())) == {"token-1"}
+    assert auth.fetches == 1
+
+
+def test_concurrent_threads_share_one_refresh():
+    auth = CountingAuthManager()
+    threads = [threading.Thread(target=auth.get_access_token) for _ in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert auth.fetches == 1
+
+
+def test_expiry_margin_and_background_refresh():
+    auth = CountingAuthManager(lifetime=1.5, delay=0)
+    auth.proactive_refresh_seconds = 0.5
+
+    async def run():
+        first = await auth.get_access_token_async(min_validity=0)
+        await asyncio.sleep(1.3)  # background task renews ~1s in
+        second = await auth.get_access_token_async(min_validity=0)
+        await auth.stop_background_refresh()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert (first, second) == ("token-1", "token-2")
+    assert auth.fetches == 2
+
+
+def test_project_discovery_reads_gcloud_config_without_subprocess(tmp_path, monkeypatch):
+    import backend.auth_manager as auth_manager
+
+    config_dir = tmp_path / "gcloud"
+    (config_dir / "configurations").mkdir(parents=True)
+    (config_dir / "active_config").write_text("work\n")
+    (config_dir / "configurations" / "config_work").write_text("[core]\nproject = from-config\n")
+    for env_var in ("GOOGLE_CLOUD_PROJECT", "GCLOUD_PROJECT", "CLOUDSDK_CORE_PROJECT", "CLOUDSDK_ACTIVE_CONFIG_NAME"):
+        monkeypatch.delenv(env_var, raising=False)
+    monkeypatch.setenv("CLOUDSDK_CONFIG", str(config_dir))
+    monkeypatch.setattr(auth_manager, "HAS_GOOGLE_AUTH", False)
+    monkeypatch.setattr(auth_manager.subprocess, "run", None)  # any subprocess call would fail
+
+    auth = AuthManager()
+    assert auth.get_project_id() == "from-config"
+
+    monkeypatch.setenv("GOOGLE_CLOUD_PROJECT", "from-env")
+    assert auth.get_project_id() == "from-config"  # memoized
+    auth.invalidate()
+    assert auth.get_project_id() == "from-env"
+
+
+def test_async_project_discovery_runs_off_the_event_loop(monkeypatch):
+    auth = AuthManager()
+    threads = []
+
+    def discover():
+        threads.append(threading.current_thread() is threading.main_thread())
+        return "proj-async"
+
+    monkeypatch.setattr(auth, "_discover_project_id", discover)
+
+    async def run():
+        return await auth.get_project_id_async(), await auth.get_project_id_async()
+
+    assert asyncio.run(run()) == ("proj-async", "proj-async")
+    assert threads == [False]
+
+
+def test_shared_instance():
+    from backend.auth_manager import get_auth_manager
+
+    assert get_auth_manager() is get_auth_manager()
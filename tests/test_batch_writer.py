@@ -0,0 +1,45 @@
+import threading
+
+import pytest
+
+from backend.batch_writer import BatchWriter
+
+
+def test_flush_waits_for_a_discard_action_and_a_failing_handler_keeps_the_thread_alive():
+    handled, events = [], []
+    started, release = threading.Event(), threading.Event()
+
+    def handle(batch):
+        started.set()
+        release.wait(5)
+        if batch == ["bad"]:
+            raise RuntimeError("boom")
+        handled.extend(batch)
+
+    writer = BatchWriter(handle, "test-writer", batch_size=1, flush_interval=10, on_stop=lambda: events.append("stopped"))
+    writer.put("bad")
+    assert started.wait(5)
+    writer.put("dropped")
+    writer.discard(then=lambda: events.append("discarded"))
+    assert not writer.flush(timeout=0.05)
+    release.set()
+    assert writer.flush()
+    assert events == ["discarded"]
+
+    writer.put("kept")
+    assert writer.stop()
+    assert handled == ["kept"]
+    assert events == ["discarded", "stopped"]
+    assert writer.depth == 0
+
+
+def test_put_reports_drops_under_either_overflow_policy():
+    for overflow, expected in (("drop_newest", [0, 1]), ("drop_oldest", [3, 4])):
+        handled = []
+        writer = BatchWriter(handled.extend, "test-writer", max_queue=2, batch_size=100, flush_interval=10, overflow=overflow)
+        assert [writer.put(i) for i in range(5)] == [True, True, False, False, False]
+        writer.stop()
+        assert handled == expected
+
+    with pytest.raises(ValueError):
+        BatchWriter(handled.extend, "test-writer", overflow="block")
@@ -0,0 +1,37 @@
+import asyncio
+
+from backend.classifier import IntentClassifier
+from backend.intelligence import IntelligenceOrchestrator
+
+
+def test_classifier_scores_agreement_and_evidence():
+    classifier = IntentClassifier()
+
+    stock = classifier.classify("Show me the stock price")
+    assert stock.intent == "stock"
+    assert stock.keywords == ["price", "stock"]
+    assert stock.confidence == 0.75
+
+    assert classifier.classify("what's the weather").confidence == 0.5
+    assert classifier.classify("stock market growth").confidence < 0.75
+    assert classifier.classify("tell me a joke") is None
+
+
+def test_classifier_matches_whole_words_and_phrases():
+    classifier = IntentClassifier([
+        {"name": "quiz", "keywords": ["quiz", "check knowledge"]},
+        {"name": "time", "keywords": ["time"]},
+    ])
+    assert classifier.classify("sometimes") is None
+    assert classifier.classify("please Check Knowledge now").keywords == ["check knowledge"]
+
+
+def test_confident_match_skips_model_with_templates(fake_models):
+    fake_models.build_error = AssertionError("model should not be constructed")
+    orchestrator = IntelligenceOrchestrator(model_factory=fake_models)
+    orchestrator.local_templates = True
+
+    result = asyncio.run(orchestrator.process_query("show me the stock price"))
+    assert result["intent"] == "stock"
+    assert result["text"] == "Here is the latest market data."
+    assert result["surface"]["surfaceId"] == "stock-ticker"
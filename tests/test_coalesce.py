@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from backend.coalesce import SingleFlight, default_coalesce_key
+from backend.intelligence import IntelligenceOrchestrator
+
+
+def test_concurrent_identical_queries_share_one_model_call(monkeypatch, fake_models):
+    monkeypatch.setenv("RESPONSE_CACHE_TTL_SECONDS", "0")
+    fake_models.delay = 0.05
+    orchestrator = IntelligenceOrchestrator(model_factory=fake_models)
+
+    async def run():
+        same = [orchestrator.process_query("Show revenue please") for _ in range(10)]
+        other = orchestrator.process_query("show revenue", [{"role": "user", "text": "earlier"}])
+        return await asyncio.gather(*same, other)
+
+    results = asyncio.run(run())
+    assert len(fake_models.calls) == 2
+    assert all(r["text"] == "ok" for r in results)
+    assert orchestrator.coalescer.snapshot() == {"leaders": 2, "coalesced": 9, "in_flight": 0}
+
+
+def test_custom_key_can_opt_out(monkeypatch, fake_models):
+    monkeypatch.setenv("RESPONSE_CACHE_TTL_SECONDS", "0")
+    fake_models.delay = 0.05
+    orchestrator = IntelligenceOrchestrator(model_factory=fake_models, coalesce_key=lambda *args: None)
+
+    async def run():
+        await asyncio.gather(*(orchestrator.process_query("same") for _ in range(3)))
+
+    asyncio.run(run())
+    assert len(fake_models.calls) == 3
+
+
+def test_errors_reach_every_caller_and_flight_survives_partial_cancel():
+    flights = SingleFlight()
+
+    async def run():
+        gate = asyncio.Event()
+
+        async def work():
+            await gate.wait()
+            raise RuntimeError("quota")
+
+        first = asyncio.ensure_future(flights.do("k", work))
+        second = asyncio.ensure_future(flights.do("k", work))
+        third = asyncio.ensure_future(flights.do("k", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        gate.set()
+        for task in (second, third):
+            with pytest.raises(RuntimeError):
+                await task
+        return flights.snapshot()
+
+    assert asyncio.run(run()) == {"leaders": 1, "coalesced": 2, "in_flight": 0}
+
+
+def test_last_waiter_leaving_cancels_the_call():
+    flights = SingleFlight()
+    cancelled = []
+
+    async def run():
+        async def work():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        task = asyncio.ensure_future(flights.do("k", work))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.sleep(0.01)
+
+    asyncio.run(run())
+    assert cancelled == [True]
+
+
+def test_default_key_normalizes_query_and_hashes_context():
+    assert default_coalesce_key("Show revenue, please!", [], None, "m") == default_coalesce_key("show revenue", [], None, "m")
+    assert default_coalesce_key("show revenue", [], "summary", "m") != default_coalesce_key("show revenue", [], None, "m")
@@ -0,0 +1,54 @@
+import asyncio
+
+from backend.history import HistoryManager, estimate_tokens, extractive_summary
+from backend.intelligence import IntelligenceOrchestrator
+from backend.schemas import Message
+
+
+def turns(n, words=5):
+    return [Message("user" if i % 2 == 0 else "model", f"turn {i} " + "word " * words) for i in range(n)]
+
+
+def test_stateless_history_keeps_recent_turns_and_summarizes_the_rest():
+    manager = HistoryManager(keep_turns=4)
+    prepared = asyncio.run(manager.prepare(turns(10)))
+    assert [t.text.split()[1] for t in prepared.turns] == ["6", "7", "8", "9"]
+    assert prepared.summary.startswith("User: turn 0")
+    assert asyncio.run(manager.prepare(turns(3))).summary is None
+
+
+def test_token_budget_folds_long_turns():
+    manager = HistoryManager(max_tokens=300, summary_max_tokens=100, keep_turns=10)
+    prepared = asyncio.run(manager.prepare(turns(6, words=100)))
+    assert sum(estimate_tokens(t.text) for t in prepared.turns) <= 200
+    assert estimate_tokens(prepared.summary) <= 100
+
+
+def test_conversation_prompt_size_stays_flat():
+    manager = HistoryManager(max_tokens=600, summary_max_tokens=200, keep_turns=4)
+    sizes = []
+    for i in range(50):
+        prepared = asyncio.run(manager.prepare([], session_id="c1"))
+        sizes.append(estimate_tokens(prepared.summary or "") + sum(estimate_tokens(t.text) for t in prepared.turns))
+        asyncio.run(manager.record("c1", f"question {i} " + "word " * 20, f"answer {i} " + "word " * 20))
+    assert max(sizes[10:]) <= 600
+    assert max(sizes[10:]) - min(sizes[10:]) < 60
+    assert manager.stats["turns_folded"] > 80
+
+
+def test_summary_rolls_off_oldest_lines():
+    summary = extractive_summary(None, turns(40), max_tokens=50)
+    assert estimate_tokens(summary) <= 50
+    assert "turn 39" in summary and "turn 0 " not in summary
+
+
+def test_orchestrator_sends_summary_and_records_exchanges(make_fake_models):
+    models = make_fake_models(reply={"intent": "general", "text": "reply", "keywords": "x"}, sync=True)
+    orchestrator = IntelligenceOrchestrator(model_factory=models, history_manager=HistoryManager(keep_turns=2))
+    for i in range(4):
+        asyncio.run(orchestrator.process_query(f"question number {i}", session_id="abc"))
+
+    last = models.contents[-1]
+    assert len(last) == 3  # summary-led user turn, model turn, current query
+    assert last[0]["parts"][0]["text"].startswith("Summary of the earlier conversation:")
+    assert "question number 3" in last[-1]["parts"][0]["text"]
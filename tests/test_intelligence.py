@@ -0,0 +1,84 @@
+import asyncio
+import threading
+import time
+
+from backend.intelligence import IntelligenceOrchestrator
+
+
+def test_sync_model_calls_run_concurrently(make_fake_models):
+    models = make_fake_models(sync=True, delay=0.2)
+    orchestrator = IntelligenceOrchestrator(model_factory=models)
+
+    async def run():
+        start = time.perf_counter()
+        results = await asyncio.gather(*(orchestrator.process_query("show metrics") for _ in range(10)))
+        return results, time.perf_counter() - start
+
+    results, elapsed = asyncio.run(run())
+    orchestrator.shutdown()
+    assert all(r["intent"] == "analytics" for r in results)
+    assert elapsed < 10 * models.delay / 2
+
+
+def test_model_timeout_degrades_to_fallback(make_fake_models):
+    orchestrator = IntelligenceOrchestrator(model_factory=make_fake_models(sync=True, delay=0.2))
+    orchestrator.timeout = 0.05
+
+    result = asyncio.run(orchestrator.process_query("show metrics"))
+    orchestrator.shutdown()
+    assert result["intent"] == "general"
+    assert "timed out" in result["text"]
+
+
+def test_models_are_reused_until_the_manifest_changes(monkeypatch, fake_models):
+    from backend.domain_config import DOMAIN_CONFIG
+
+    orchestrator = IntelligenceOrchestrator(model_factory=fake_models)
+    first = asyncio.run(orchestrator._get_model())
+    assert asyncio.run(orchestrator._get_model()) is first
+
+    monkeypatch.setitem(DOMAIN_CONFIG, "persona", "You are terse.")
+    orchestrator.invalidate_manifest()
+    rebuilt = asyncio.run(orchestrator._get_model())
+    assert rebuilt is not first
+    assert "You are terse." in orchestrator._system_prompt
+
+
+def test_warm_up_builds_every_routed_model_before_the_first_query(fake_models):
+    orchestrator = IntelligenceOrchestrator(model_factory=fake_models)
+    report = asyncio.run(orchestrator.warm_up(generate=True))
+    assert report["errors"] == {}
+    assert set(report["stages_ms"]) == {"project", "prompt", "models", "generation"}
+    assert orchestrator._system_prompt
+    routed = {route.model for route in orchestrator.router.routes.values()} if orchestrator.router else set()
+    assert set(fake_models.built) == routed | {orchestrator.model_name}
+
+    warmed = len(fake_models.built)
+    asyncio.run(orchestrator.process_query("show metrics"))
+    orchestrator.shutdown()
+    assert len(fake_models.built) == warmed
+
+
+def test_concurrent_cache_misses_share_one_build_off_the_event_loop(fake_models):
+    fake_models.build_delay = 0.1  # blocking, like SDK construction or CachedContent.create
+    orchestrator = IntelligenceOrchestrator(model_factory=fake_models)
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.ensure_future(ticker())
+        models = await asyncio.gather(*(orchestrator._get_model() for _ in range(5)))
+        task.cancel()
+        return models, ticks
+
+    models, ticks = asyncio.run(run())
+    orchestrator.shutdown()
+    assert [t is threading.main_thread() for t in fake_models.build_threads] == [False]  # one build, on a worker thread
+    assert all(model is models[0] for model in models)
+    assert ticks >= 3  # the loop kept running during the build
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import os
+import threading
+
+from backend.interaction_log import InteractionLogger, LogBroadcaster
+
+
+def read_records(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_records_are_batched_and_flushed_on_stop(tmp_path):
+    path = str(tmp_path / "log.json")
+    log = InteractionLogger(path, batch_size=4, flush_interval=10)
+    for i in range(10):
+        log.log("CLIENT_TO_SERVER", {"i": i})
+    log.stop()
+
+    records = read_records(path)
+    assert [r["data"]["i"] for r in records] == list(range(10))
+    assert log.stats["written"] == 10
+    assert log.stats["batches"] >= 3
+
+
+def test_overflow_policies_count_drops(tmp_path):
+    newest = InteractionLogger(str(tmp_path / "a.json"), max_queue=2, flush_interval=10, batch_size=100)
+    oldest = InteractionLogger(str(tmp_path / "b.json"), max_queue=2, flush_interval=10, batch_size=100, overflow="drop_oldest")
+    for log in (newest, oldest):
+        for i in range(5):
+            log.log("X", i)
+        log.stop()
+
+    assert [r["data"] for r in read_records(newest.path)] == [0, 1]
+    assert [r["data"] for r in read_records(oldest.path)] == [3, 4]
+    assert newest.stats["dropped"] == oldest.stats["dropped"] == 3
+
+
+def test_rotation_and_reset(tmp_path):
+    path = str(tmp_path / "log.json")
+    log = InteractionLogger(path, batch_size=1, max_bytes=200, backup_count=2)
+    for i in range(10):
+        log.log("X", "x" * 50)
+        assert log.flush()
+    assert os.path.exists(path + ".1") and os.path.exists(path + ".2")
+    assert not os.path.exists(path + ".3")
+    assert log.stats["rotations"] >= 2
+
+    log.reset()
+    assert log.flush()
+    assert not os.path.exists(path) and not os.path.exists(path + ".1")
+    log.stop()
+
+
+def test_rotation_without_backups_truncates_and_counts(tmp_path):
+    path = str(tmp_path / "log.json")
+    log = InteractionLogger(path, batch_size=1, max_bytes=200, backup_count=0)
+    for i in range(10):
+        log.log("X", "x" * 50)
+        assert log.flush()
+    log.stop()
+    assert not os.path.exists(path + ".1")
+    assert os.path.getsize(path) <= 200
+    assert log.stats["rotations"] >= 2
+
+
+def test_broadcaster_replays_and_pushes_live_records(tmp_path):
+    broadcaster = LogBroadcaster(buffer_size=3, max_pending=10)
+    log = InteractionLogger(str(tmp_path / "log.json"), broadcaster=broadcaster)
+    for i in range(5):
+        log.log("X", i)
+
+    async def run():
+        subscription = broadcaster.subscribe(replay=2)
+        # Records logged from another thread are handed over to the loop
+        threading.Thread(target=log.log, args=("Y", "live")).start()
+        return [json.loads(await subscription.get()) for _ in range(3)]
+
+    received = asyncio.run(run())
+    log.stop()
+    assert [r["data"] for r in received] == [3, 4, "live"]
+
+
+def test_replay_since_resumes_after_the_last_record_seen():
+    broadcaster = LogBroadcaster(buffer_size=10)
+    for i in range(5):
+        broadcaster.publish({"timestamp": float(i), "direction": "X", "data": i})
+
+    async def run():
+        subscription = broadcaster.subscribe(replay=10, since=2.0)
+        broadcaster.publish({"timestamp": 5.0, "direction": "X", "data": "live"})
+        return [json.loads(await subscription.get())["data"] for _ in range(3)]
+
+    assert asyncio.run(run()) == [3, 4, "live"]
+
+
+def test_slow_subscriber_is_dropped_without_blocking():
+    broadcaster = LogBroadcaster(max_pending=2)
+
+    async def run():
+        slow = broadcaster.subscribe()
+        for i in range(5):
+            broadcaster.publish({"timestamp": i, "direction": "X", "data": i})
+        return slow, await slow.get()
+
+    slow, payload = asyncio.run(run())
+    assert payload is None and slow.overflowed
+    assert broadcaster.subscriber_count == 0
+    assert broadcaster.stats["subscribers_dropped"] == 1
+
+
+def _write_from_worker(path, worker, count):
+    log = InteractionLogger(path, batch_size=8, flush_interval=0.01, max_bytes=4096, backup_count=50)
+    for i in range(count):
+        log.log("SERVER_TO_CLIENT", {"worker": worker, "i": i, "pad": "x" * 40})
+    log.stop()
+
+
+def test_worker_processes_share_one_log_without_interleaving(tmp_path):
+    import multiprocessing
+
+    path = str(tmp_path / "log.json")
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=_write_from_worker, args=(path, w, 200)) for w in range(3)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join(30)
+        assert process.exitcode == 0
+
+    files = [path] + [f"{path}.{i}" for i in range(1, 51)]
+    records = [r for f in files if os.path.exists(f) for r in read_records(f)]  # every line parses
+    assert len(records) == 600
+    for w in range(3):
+        assert sorted(r["data"]["i"] for r in records if r["data"]["worker"] == w) == list(range(200))
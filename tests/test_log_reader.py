@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+from backend.log_reader import read_log_page
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    path = tmp_path / "log.json"
+    with open(path, "w") as f:
+        for i in range(500):
+            f.write(json.dumps({"timestamp": 1000 + i, "direction": "X", "data": "y" * (i % 37)}) + "\n")
+        f.write('{"timestamp": 99999, "torn')  # a write in progress
+    return str(path)
+
+
+def timestamps(page):
+    return [r["timestamp"] for r in page.records]
+
+
+@pytest.mark.parametrize("block_size", [7, 128, 65536])
+def test_backward_pages_cover_the_log_newest_first(log_path, block_size):
+    page = read_log_page(log_path, limit=50, block_size=block_size)
+    assert timestamps(page) == list(range(1450, 1500))
+
+    seen, cursor = [], None
+    while True:
+        page = read_log_page(log_path, limit=77, cursor=cursor, block_size=block_size)
+        seen = timestamps(page) + seen
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert seen == list(range(1000, 1500))
+
+
+@pytest.mark.parametrize("block_size", [7, 128, 65536])
+def test_forward_since_and_cursor(log_path, block_size):
+    page = read_log_page(log_path, limit=10, since=1200.5, direction="forward", block_size=block_size)
+    assert timestamps(page) == list(range(1201, 1211))
+
+    following = read_log_page(log_path, limit=5, direction="forward", cursor=page.next_cursor, block_size=block_size)
+    assert timestamps(following) == list(range(1211, 1216))
+
+
+def test_backward_since_stops_at_boundary(log_path):
+    page = read_log_page(log_path, limit=100, since=1490)
+    assert timestamps(page) == list(range(1490, 1500))
+    assert page.next_cursor is None
+
+
+def test_missing_file(tmp_path):
+    assert read_log_page(str(tmp_path / "nope.json")).records == []
@@ -0,0 +1,70 @@
+import asyncio
+
+from backend.intelligence import IntelligenceOrchestrator
+from backend.metrics import AgentMetrics, Registry
+from backend.resilience import ResilientCaller
+
+GROWTH = {"intent": "analytics", "text": "Growth is up.", "keywords": "metrics"}
+
+
+def test_registry_renders_prometheus_text_format():
+    registry = Registry()
+    requests = registry.counter("requests_total", "Requests.", ("path",))
+    depth = registry.gauge("queue_depth", "Queue depth.", function=lambda: 7)
+    latency = registry.histogram("latency_seconds", "Latency.", ("intent",), buckets=(0.1, 1.0))
+
+    requests.labels('/a"b').inc()
+    requests.labels('/a"b').inc(2)
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.labels("stock").observe(value)
+
+    lines = registry.render().splitlines()
+    assert "# TYPE requests_total counter" in lines
+    assert 'requests_total{path="/a\\"b"} 3' in lines
+    assert "queue_depth 7" in lines
+    assert 'latency_seconds_bucket{intent="stock",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{intent="stock",le="1"} 3' in lines
+    assert 'latency_seconds_bucket{intent="stock",le="+Inf"} 4' in lines
+    assert 'latency_seconds_count{intent="stock"} 4' in lines
+    assert 'latency_seconds_sum{intent="stock"} 3.65' in lines
+    assert depth.function() == 7
+
+
+def test_orchestrator_records_model_calls_tokens_and_fallbacks(monkeypatch, make_fake_models):
+    monkeypatch.setenv("RESPONSE_CACHE_TTL_SECONDS", "0")
+    monkeypatch.setenv("GENAI_ROUTING", "false")
+    metrics = AgentMetrics()
+    orchestrator = IntelligenceOrchestrator(model_factory=make_fake_models(reply=GROWTH, usage=(120, 12)), metrics=metrics)
+    asyncio.run(orchestrator.process_query("how are we doing"))
+    orchestrator.shutdown()
+
+    model = orchestrator.model_name
+    assert sum(metrics.model_seconds.labels(model, "ok").counts) == 1
+    assert metrics.model_tokens.labels(model, "input").value == 120
+    assert metrics.model_tokens.labels(model, "output").value == 12
+
+    broken = IntelligenceOrchestrator(
+        model_factory=make_fake_models(reply=KeyError("boom")), metrics=metrics, resilience=ResilientCaller(max_attempts=1)
+    )
+    result = asyncio.run(broken.process_query("how are we doing"))
+    broken.shutdown()
+    assert result["text"].startswith("Running in fallback mode")
+    assert metrics.fallbacks.labels("error").value == 1
+    assert sum(metrics.model_seconds.labels(model, "error").counts) == 1
+
+
+def test_observe_request_labels_by_intent_and_surface():
+    metrics = AgentMetrics()
+    metrics.observe_request("query", {"intent": "stock", "surface": {"surfaceId": "stock-ticker", "content": []}}, 0.2)
+    rendered = metrics.registry.render()
+    assert 'agent_request_duration_seconds_count{endpoint="query",intent="stock",surface_id="stock-ticker"} 1' in rendered
+
+
+def test_model_invented_intents_and_surfaces_are_counted_as_other():
+    metrics = AgentMetrics()
+    for n in range(50):
+        metrics.observe_request("query", {"intent": f"made-up-{n}", "surface": {"surfaceId": f"s{n}", "content": []}}, 0.1)
+    metrics.observe_request("query", {"intent": "general", "surface": {"surfaceId": "standard-surface", "content": []}}, 0.1)
+    assert set(metrics.request_seconds._children) == {
+        ("query", "other", "other"), ("query", "general", "standard-surface"),
+    }
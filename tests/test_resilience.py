@@ -0,0 +1,71 @@
+import asyncio
+import json
+import time
+
+from backend.intelligence import IntelligenceOrchestrator
+from backend.resilience import CircuitBreaker, ResilientCaller
+
+OK = json.dumps({"intent": "analytics", "text": "ok", "keywords": "metrics"})
+
+
+class ServiceUnavailable(Exception):
+    """Same name as the google.api_core 503 error."""
+
+
+def orchestrator(monkeypatch, models, script, **policy):
+    """Each model call takes the next (delay, outcome) from `script`, then answers OK."""
+    monkeypatch.setenv("RESPONSE_CACHE_TTL_SECONDS", "0")
+    models.script = list(script)
+    models.reply = OK
+    policy.setdefault("base_delay", 0.001)
+    return IntelligenceOrchestrator(model_factory=models, resilience=ResilientCaller(**policy))
+
+
+def test_transient_errors_and_bad_json_are_retried(monkeypatch, fake_models):
+    orch = orchestrator(monkeypatch, fake_models, [(0, ServiceUnavailable("503")), (0, '{"intent": "analytics", "te'), (0, OK)])
+    result = asyncio.run(orch.process_query("how are we doing"))
+    assert result["text"] == "ok"
+    assert len(fake_models.calls) == 3 and orch.resilience.stats["retries"] == 2
+
+
+def test_permanent_errors_fail_fast(monkeypatch, fake_models):
+    orch = orchestrator(monkeypatch, fake_models, [(0, PermissionError("denied"))])
+    result = asyncio.run(orch.process_query("how are we doing"))
+    assert result["text"].startswith("Running in fallback mode")
+    assert len(fake_models.calls) == 1
+
+
+def test_deadline_bounds_all_attempts(monkeypatch, fake_models):
+    orch = orchestrator(monkeypatch, fake_models, [(1, OK)] * 5, deadline=0.2)
+    start = time.monotonic()
+    result = asyncio.run(orch.process_query("how are we doing"))
+    assert time.monotonic() - start < 0.5
+    assert result["text"].startswith("Running in fallback mode")
+
+
+def test_hedged_request_takes_the_first_success(monkeypatch, fake_models):
+    orch = orchestrator(monkeypatch, fake_models, [(1, OK), (0.01, OK)], hedge=True, hedge_initial_delay=0.05)
+    start = time.monotonic()
+    result = asyncio.run(orch.process_query("how are we doing"))
+    assert time.monotonic() - start < 0.5
+    assert result["text"] == "ok"
+    assert orch.resilience.stats["hedges"] == 1 and orch.resilience.stats["hedge_wins"] == 1
+
+
+def test_breaker_degrades_to_local_surfaces_then_probes(monkeypatch, fake_models):
+    failures = [(0, ServiceUnavailable("503"))] * 2
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    orch = orchestrator(monkeypatch, fake_models, failures, max_attempts=1, breaker=breaker)
+
+    async def run():
+        for _ in range(2):
+            await orch.process_query("show the stock price")
+        degraded = await orch.process_query("show the stock price")
+        await asyncio.sleep(0.06)
+        probed = await orch.process_query("show the stock price")
+        return degraded, probed
+
+    degraded, probed = asyncio.run(run())
+    assert len(fake_models.calls) == 3  # the short-circuited call never reached the model
+    assert degraded["intent"] == "stock" and degraded["surface"]["surfaceId"] == "stock-ticker"
+    assert probed["text"] == "ok" and breaker.state == "closed"
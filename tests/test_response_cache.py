@@ -0,0 +1,137 @@
+import asyncio
+
+from backend.intelligence import IntelligenceOrchestrator
+from backend.response_cache import (
+    InMemoryCacheBackend, RedisCacheBackend, ResponseCache, history_fingerprint, normalize_query
+)
+
+
+class FakeRedis:
+    """Minimal stand-in for a Redis client: get/set(ex=)/delete."""
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key, (None,))[0]
+
+    def set(self, key, value, ex=None):
+        self.data[key] = (value, ex)
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+def test_normalization_and_history_scope():
+    assert normalize_query("  Show METRICS, please!") == "show metrics"
+    history = [{"role": "user", "text": "hi"}, {"role": "agent", "text": "hello"}]
+    assert history_fingerprint(history, 1) == history_fingerprint(history[1:], 1)
+    assert history_fingerprint(history, 2) != history_fingerprint(history[1:], 2)
+    assert history_fingerprint([], 3) == ""
+
+
+def test_in_memory_backend_evicts_lru_and_expires():
+    backend = InMemoryCacheBackend(max_entries=2)
+    backend.set("a", 1, ttl=60)
+    backend.set("b", 2, ttl=60)
+    backend.get("a")
+    backend.set("c", 3, ttl=60)
+    assert backend.get("b") is None and backend.get("a") == 1
+    backend.set("d", 4, ttl=-1)
+    assert backend.get("d") is None
+
+
+def test_exact_and_semantic_tiers():
+    vectors = {"show metrics": [1.0, 0.0], "metrics": [0.99, 0.1], "weather": [0.0, 1.0]}
+    cache = ResponseCache(embedder=vectors.__getitem__, similarity_threshold=0.9)
+
+    async def run():
+        await cache.put("Show metrics!", [], "m", {"intent": "analytics"})
+        exact = await cache.get("show   metrics", [], "m")
+        semantic = await cache.get("metrics please", [], "m")
+        other_model = await cache.get("show metrics", [], "other")
+        unrelated = await cache.get("weather", [], "m")
+        return exact, semantic, other_model, unrelated
+
+    exact, semantic, other_model, unrelated = asyncio.run(run())
+    assert exact == semantic == {"intent": "analytics"}
+    assert other_model is None and unrelated is None
+    assert cache.snapshot()["exact_hits"] == 1
+    assert cache.snapshot()["semantic_hits"] == 1
+    assert cache.snapshot()["misses"] == 2
+
+
+def test_redis_backend_round_trips_with_ttl():
+    client = FakeRedis()
+    cache = ResponseCache(backend=RedisCacheBackend(client), ttl=30)
+
+    async def run():
+        await cache.put("show metrics", [], "m", {"intent": "analytics"})
+        return await cache.get("show metrics", [], "m")
+
+    assert asyncio.run(run()) == {"intent": "analytics"}
+    (_, ttl), = client.data.values()
+    assert ttl == 30
+
+
+def test_process_query_serves_repeats_from_cache(fake_models):
+    orchestrator = IntelligenceOrchestrator(model_factory=fake_models, response_cache=ResponseCache())
+
+    async def run():
+        first = await orchestrator.process_query("show metrics")
+        second = await orchestrator.process_query("Show metrics please")
+        return first, second
+
+    first, second = asyncio.run(run())
+    orchestrator.shutdown()
+    assert first == second
+    assert len(fake_models.calls) == 1
+
+
+def test_summary_is_part_of_the_scope():
+    cache = ResponseCache()
+    recent = [{"role": "user", "text": "and last week?"}]
+
+    async def run():
+        await cache.put("show metrics", recent, "m", {"intent": "analytics"}, summary="We discussed revenue.")
+        return (
+            await cache.get("show metrics", recent, "m", summary="We discussed revenue."),
+            await cache.get("show metrics", recent, "m", summary="We discussed headcount."),
+            await cache.get("show metrics", recent, "m"),
+        )
+
+    same, other_summary, no_summary = asyncio.run(run())
+    assert same == {"intent": "analytics"}
+    assert other_summary is None and no_summary is None
+
+
+def test_a_miss_embeds_the_query_once():
+    embedded = []
+
+    def embed(text):
+        embedded.append(text)
+        return [1.0, 0.0] if "metrics" in text else [0.0, 1.0]
+
+    cache = ResponseCache(embedder=embed)
+
+    async def run():
+        for query in ("show metrics", "weather"):
+            lookup = await cache.lookup(query, [], "m")
+            assert lookup.result is None and lookup.vector is not None
+            await cache.put(query, [], "m", {"intent": query}, vector=lookup.vector)
+
+    asyncio.run(run())
+    assert embedded == ["show metrics", "weather"]
+    assert cache.snapshot()["semantic_index_size"] == 2
+
+
+def test_process_query_reuses_the_lookup_embedding_when_storing(fake_models):
+    embedded = []
+
+    def embed(text):
+        embedded.append(text)
+        return [1.0, 0.0]
+
+    orchestrator = IntelligenceOrchestrator(model_factory=fake_models, response_cache=ResponseCache(embedder=embed))
+    asyncio.run(orchestrator.process_query("show metrics"))
+    orchestrator.shutdown()
+    assert embedded == ["show metrics"]
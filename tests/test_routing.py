@@ -0,0 +1,96 @@
+import asyncio
+
+from backend.classifier import IntentClassifier
+from backend.domain_config import DOMAIN_CONFIG
+from backend.intelligence import IntelligenceOrchestrator
+from backend.routing import ModelRouter
+
+
+def test_rules_route_by_local_match():
+    router = ModelRouter(DOMAIN_CONFIG["routing"])
+    classify = IntentClassifier().classify
+    assert router.choose(classify("is it sunny or cloudy")).name == "fast"
+    assert router.choose(classify("show growth metrics")).name == "standard"
+    assert router.choose(classify("stock growth")).name == "large"  # ambiguous keyword hits
+    assert router.choose(classify("tell me a story")).name == "fast"  # unmatched: cheap first pass
+
+
+def per_model(model_name, contents):
+    """Answers by model: the small model can only say "general"."""
+    intent = "general" if model_name.endswith("8b") else "vision"
+    return {"intent": intent, "text": model_name, "keywords": "plans"}
+
+
+def test_general_answers_escalate_to_a_larger_model(monkeypatch, fake_models):
+    monkeypatch.setenv("RESPONSE_CACHE_TTL_SECONDS", "0")
+    monkeypatch.setenv("GENAI_ROUTING", "true")
+    monkeypatch.setenv("GENAI_ROUTING_ESCALATION", "true")
+    fake_models.reply = per_model
+    orchestrator = IntelligenceOrchestrator(model_factory=fake_models)
+
+    result = asyncio.run(orchestrator.process_query("tell me about our plans"))
+    assert fake_models.calls == ["gemini-1.5-flash-8b", "gemini-1.5-flash"]
+    assert result["intent"] == "vision" and result["text"] == "gemini-1.5-flash"
+
+    stats = orchestrator.router.snapshot()
+    assert stats["fast"]["calls"] == 1 and stats["fast"]["escalations"] == 1
+    assert stats["standard"]["calls"] == 1 and stats["standard"]["cost_usd"] > stats["fast"]["cost_usd"] > 0
+    assert stats["standard"]["p50_ms"] is not None and stats["large"]["calls"] == 0
+
+
+def test_routes_at_or_above_the_escalation_target_do_not_escalate(monkeypatch, fake_models):
+    router = ModelRouter(DOMAIN_CONFIG["routing"], escalate=True)
+    assert router.escalation(router.routes["fast"], "general") is router.routes["standard"]
+    assert router.escalation(router.routes["standard"], "general") is None
+    assert router.escalation(router.routes["large"], "general") is None
+
+    monkeypatch.setenv("RESPONSE_CACHE_TTL_SECONDS", "0")
+    monkeypatch.setenv("GENAI_ROUTING", "true")
+    monkeypatch.setenv("GENAI_ROUTING_ESCALATION", "true")
+    fake_models.reply = lambda model_name, contents: {"intent": "general", "text": model_name, "keywords": ""}
+    orchestrator = IntelligenceOrchestrator(model_factory=fake_models)
+    # Ambiguous low-confidence keyword hits route to "large"
+    result = asyncio.run(orchestrator.process_query("stock growth"))
+    assert fake_models.calls == ["gemini-1.5-pro"]
+    assert result["text"] == "gemini-1.5-pro"
+    assert orchestrator.router.snapshot()["large"]["escalations"] == 0
+
+
+def test_routing_is_opt_in_and_keeps_genai_model_by_default(monkeypatch, fake_models):
+    monkeypatch.setenv("RESPONSE_CACHE_TTL_SECONDS", "0")
+    monkeypatch.delenv("GENAI_ROUTING", raising=False)
+    monkeypatch.setenv("GENAI_MODEL", "gemini-custom")
+    fake_models.reply = per_model
+    orchestrator = IntelligenceOrchestrator(model_factory=fake_models)
+    asyncio.run(orchestrator.process_query("tell me about our plans"))
+    assert orchestrator.router is None
+    assert fake_models.calls == ["gemini-custom"]
+
+
+def test_escalation_is_opt_in(monkeypatch, fake_models):
+    monkeypatch.setenv("RESPONSE_CACHE_TTL_SECONDS", "0")
+    monkeypatch.setenv("GENAI_ROUTING", "true")
+    monkeypatch.delenv("GENAI_ROUTING_ESCALATION", raising=False)
+    fake_models.reply = per_model
+    orchestrator = IntelligenceOrchestrator(model_factory=fake_models)
+    result = asyncio.run(orchestrator.process_query("tell me about our plans"))
+    assert fake_models.calls == ["gemini-1.5-flash-8b"]  # one call, no second sequential one
+    assert result["intent"] == "general"
+    assert orchestrator.router.snapshot()["fast"]["escalations"] == 0
+
+
+def test_route_stats_use_the_sdk_token_counts(monkeypatch, make_fake_models):
+    monkeypatch.setenv("RESPONSE_CACHE_TTL_SECONDS", "0")
+    monkeypatch.setenv("GENAI_ROUTING", "true")
+    models = make_fake_models(reply={"intent": "weather", "text": "Sunny.", "keywords": "sun"}, usage=(123, 45))
+    orchestrator = IntelligenceOrchestrator(model_factory=models)
+
+    async def run():
+        await orchestrator.process_query("is it sunny or cloudy")
+        async for _ in orchestrator.stream_query("is it sunny or cloudy"):
+            pass
+
+    asyncio.run(run())
+    fast = orchestrator.router.snapshot()["fast"]
+    assert (fast["calls"], fast["input_tokens"], fast["output_tokens"]) == (2, 246, 90)
+    assert fast["cost_usd"] == round(2 * (123 * 0.0375 + 45 * 0.15) / 1_000_000, 6)
@@ -0,0 +1,76 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from backend import codec
+from backend.intelligence import IntelligenceOrchestrator
+from backend.schemas import Component, Message, StatBar, Surface, SurfaceValidationError, Text, message_fields, validate_surface
+from backend.surfaces import DEFAULT_SURFACE_TEMPLATE, SURFACE_TEMPLATES, SurfaceRegistry
+
+MODEL_SURFACE = {
+    "surfaceId": "custom",
+    "content": [
+        {"type": "Text", "props": {"text": "Revenue", "variant": "h2"}},
+        {"type": "Card", "props": {"title": "Q3"}, "children": [{"type": "StatBar", "props": {"label": "Growth", "value": 12.5}}]},
+        {"type": "List", "props": {"items": ["a", "b"]}},
+    ],
+}
+
+
+def test_validated_surface_round_trips_through_the_codec():
+    surface = validate_surface(MODEL_SURFACE)
+    assert isinstance(surface, Surface)
+    assert isinstance(surface.content[0], Text)
+    assert isinstance(surface.content[1].children[0], StatBar)
+    assert codec.loads(codec.dumps({"surface": surface})) == {"surface": MODEL_SURFACE}
+
+
+def test_builtin_templates_satisfy_the_schema():
+    for template in [*SURFACE_TEMPLATES.values(), DEFAULT_SURFACE_TEMPLATE]:
+        assert validate_surface(template).to_dict() == template
+
+
+@pytest.mark.parametrize("bad", [
+    {"content": []},
+    {"surfaceId": "x", "content": [{"type": "Chart"}]},
+    {"surfaceId": "x", "content": [{"type": "Text", "props": {}}]},
+    {"surfaceId": "x", "content": [{"type": "StatBar", "props": {"label": "a", "value": "high"}}]},
+    {"surfaceId": "x", "content": [{"type": "List", "props": {"items": [1]}}]},
+    {"surfaceId": "x", "content": [{"type": "Text", "props": {"text": "a"}, "children": []}]},
+])
+def test_invalid_surfaces_are_rejected(bad):
+    with pytest.raises(SurfaceValidationError):
+        validate_surface(bad)
+
+
+def test_registry_rejects_invalid_manifest_surfaces():
+    with pytest.raises(SurfaceValidationError):
+        SurfaceRegistry({"broken": {"surfaceId": "b", "content": [{"type": "Text"}]}}, DEFAULT_SURFACE_TEMPLATE)
+
+
+def test_messages_are_read_without_copies():
+    assert message_fields(Message("user", "hi")) == ("user", "hi")
+    assert message_fields({"role": "model", "text": "yo"}) == ("model", "yo")
+    assert message_fields(SimpleNamespace(role="user", text="pydantic-like")) == ("user", "pydantic-like")
+
+
+def test_model_surface_is_used_when_valid_and_template_otherwise(make_fake_models):
+    replies = [dict(intent="analytics", text="ok", keywords="x", surface=MODEL_SURFACE),
+               dict(intent="analytics", text="ok", keywords="x", surface={"surfaceId": "bad", "content": [{"type": "Nope"}]})]
+    orchestrator = IntelligenceOrchestrator(model_factory=make_fake_models(script=[(0, r) for r in replies], sync=True))
+    history = [Message("user", "earlier"), SimpleNamespace(role="model", text="reply")]
+    valid = asyncio.run(orchestrator.process_query("show revenue", history))
+    invalid = asyncio.run(orchestrator.process_query("show growth", history))
+
+    assert codec.loads(codec.dumps(valid["surface"])) == MODEL_SURFACE
+    assert invalid["surface"]["surfaceId"] == "analytics-view"
+
+
+def test_component_without_to_dict_cannot_be_instantiated():
+    class Chart(Component):
+        __slots__ = ()
+        type_name = "Chart"
+
+    with pytest.raises(TypeError):
+        Chart()
@@ -0,0 +1,104 @@
+import signal
+
+import pytest
+
+uvicorn = pytest.importorskip("uvicorn")
+
+from backend import server
+
+
+def test_config_defaults_to_available_cpus(monkeypatch):
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    monkeypatch.setenv("PORT", "9123")
+    config = server.build_config()
+    assert config.workers == server.available_cpus() >= 1
+    assert config.port == 9123
+    assert config.timeout_graceful_shutdown == 8
+
+    monkeypatch.setenv("WEB_CONCURRENCY", "3")
+    assert server.build_config().workers == 3
+
+
+def test_shutdown_signal_runs_drain_hooks_once_before_the_servers_handler(monkeypatch):
+    calls = []
+    monkeypatch.setattr(server, "_drain_hooks", [])
+    monkeypatch.setattr(server, "_drained", False)
+    server.on_drain(lambda: calls.append("drain"))
+    server.on_drain(lambda: 1 / 0)  # a failing hook does not block shutdown
+
+    original = signal.getsignal(signal.SIGTERM)
+    signal.signal(signal.SIGTERM, lambda signum, frame: calls.append("server"))
+    try:
+        server.install_drain_handler()
+        handler = signal.getsignal(signal.SIGTERM)
+        handler(signal.SIGTERM, None)
+        handler(signal.SIGTERM, None)
+    finally:
+        signal.signal(signal.SIGTERM, original)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+    assert calls == ["drain", "server", "server"]
+
+
+DRAIN_APP = '''
+import os
+
+from backend.server import install_drain_handler, on_drain
+
+on_drain(lambda: open(os.path.join(os.environ["DRAIN_DIR"], str(os.getpid())), "w").close())
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                install_drain_handler()
+            await send({"type": message["type"] + ".complete"})
+            if message["type"] == "lifespan.shutdown":
+                return
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+'''
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_module_entry_point_runs_drain_hooks_in_every_worker(tmp_path, workers):
+    import os
+    import socket
+    import subprocess
+    import sys
+    import time
+    import urllib.request
+
+    (tmp_path / "drain_app.py").write_text(DRAIN_APP)
+    drained = tmp_path / "drained"
+    drained.mkdir()
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    src = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join([src, str(tmp_path)]),
+        "APP_MODULE": "drain_app:app",
+        "WEB_CONCURRENCY": str(workers),
+        "HOST": "127.0.0.1",
+        "PORT": str(port),
+        "LOG_LEVEL": "warning",
+        "DRAIN_DIR": str(drained),
+    }
+    process = subprocess.Popen([sys.executable, "-m", "backend.server"], env=env)
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1)
+                break
+            except OSError:
+                assert time.monotonic() < deadline, "server did not start"
+                time.sleep(0.05)
+        time.sleep(0.5)  # every worker is up
+    finally:
+        process.send_signal(signal.SIGTERM)
+        # uvicorn re-raises the signal once it has shut down gracefully
+        assert process.wait(timeout=30) in (0, -signal.SIGTERM)
+    assert len(list(drained.iterdir())) == workers
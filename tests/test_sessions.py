@@ -0,0 +1,83 @@
+import asyncio
+import time
+
+from backend.history import HistoryManager
+from backend.schemas import Message
+from backend.sessions import InMemorySessionStore, RedisSessionStore
+
+
+class FakeRedis:
+    """Minimal stand-in for a Redis client: lists, strings, expire and delete."""
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+
+    def rpush(self, key, *values):
+        self.data.setdefault(key, []).extend(v if isinstance(v, bytes) else v.encode() for v in values)
+        return len(self.data[key])
+
+    def lrange(self, key, start, stop):
+        items = self.data.get(key, [])
+        return items[start:] if stop == -1 else items[start:stop + 1]
+
+    def ltrim(self, key, start, stop):
+        self.data[key] = self.lrange(key, start, stop)
+
+    def get(self, key):
+        value = self.data.get(key)
+        return value.encode() if isinstance(value, str) else value
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+        self.ttls[key] = ex
+
+    def expire(self, key, seconds):
+        self.ttls[key] = seconds
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+
+def test_in_memory_store_appends_compacts_and_expires():
+    store = InMemorySessionStore(max_sessions=2, ttl=0.05)
+    store.append("a", [Message("user", "1"), Message("model", "2"), Message("user", "3")])
+    store.compact("a", "summary", 2)
+    assert store.load("a") == ("summary", [Message("user", "3")])
+
+    store.append("b", [Message("user", "x")])
+    store.append("c", [Message("user", "y")])
+    assert store.load("a").turns == [] and store.evictions == 1
+    time.sleep(0.06)
+    assert store.load("b").turns == []
+
+
+def test_redis_store_round_trips_with_ttl():
+    client = FakeRedis()
+    store = RedisSessionStore(client, ttl=60)
+
+    async def run():
+        await store.append("s", [Message("user", "héllo"), {"role": "model", "text": "hi"}])
+        await store.compact("s", "older", 1)
+        data = await store.load("s")
+        await store.delete("s")
+        return data, await store.load("s")
+
+    data, deleted = asyncio.run(run())
+    assert data == ("older", [Message("model", "hi")])
+    assert deleted == (None, [])
+    assert set(client.ttls.values()) == {60}
+
+
+def test_session_mode_only_needs_the_delta():
+    manager = HistoryManager(keep_turns=4, store=RedisSessionStore(FakeRedis()))
+
+    async def run():
+        for i in range(5):
+            await manager.prepare([Message("user", f"note {i}")], session_id="s")
+            await manager.record("s", f"q{i}", f"a{i}")
+        return await manager.prepare([], session_id="s")
+
+    prepared = asyncio.run(run())
+    assert [t.text for t in prepared.turns] == ["a3", "note 4", "q4", "a4"]
+    assert "note 0" in prepared.summary
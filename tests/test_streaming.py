@@ -0,0 +1,115 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from backend.intelligence import IntelligenceOrchestrator
+import pytest
+
+from backend.stream_parser import PartialResponseParser, parse_response, repair_json
+
+PAYLOAD = json.dumps({"intent": "stock", "text": "GOOGL is up \"2.4%\" today.", "keywords": "GOOGL"})
+
+
+def chunked(text, size=5):
+    return [SimpleNamespace(text=text[i:i + size]) for i in range(0, len(text), size)]
+
+
+def collect(orchestrator):
+    async def run():
+        return [event async for event in orchestrator.stream_query("stock price")]
+    events = asyncio.run(run())
+    orchestrator.shutdown()
+    return events
+
+
+def test_parser_emits_intent_then_text_deltas():
+    parser = PartialResponseParser()
+    events = []
+    for chunk in chunked(PAYLOAD, size=3):
+        events.extend(parser.feed(chunk.text))
+
+    assert events[0] == ("intent", "stock")
+    assert "".join(value for kind, value in events if kind == "text") == json.loads(PAYLOAD)["text"]
+    assert parser.done
+    assert parser.fields["keywords"] == "GOOGL"
+
+
+def test_parser_captures_nested_and_literal_values():
+    parser = PartialResponseParser()
+    parser.feed('{"intent": "quiz", "score": 0.9, "extra": {"a": ["}", 1]}, "ok": true}')
+    assert parser.fields == {"intent": "quiz", "score": 0.9, "extra": {"a": ["}", 1]}, "ok": True}
+
+
+def test_parse_response_repairs_fences_and_trailing_commas():
+    text = '```json\n{"intent": "stock", "text": "Up.", "extra": {"a": [1, 2,],},}\n```'
+    assert parse_response(text) == {"intent": "stock", "text": "Up.", "extra": {"a": [1, 2]}}
+
+
+def test_parser_finish_keeps_truncated_values():
+    parser = PartialResponseParser()
+    events = parser.feed('{"intent": "stock", "text": "GOOGL is u')
+    assert parser.finish() == []  # the partial text was already streamed
+    assert events[0] == ("intent", "stock")
+    assert parser.fields == {"intent": "stock", "text": "GOOGL is u"}
+    assert parser.repaired
+
+    assert parse_response('{"intent": "quiz", "text": "Hi", "extra": {"a": [1, "b') == {
+        "intent": "quiz", "text": "Hi", "extra": {"a": [1, "b"]},
+    }
+    assert repair_json('{"a": [1, 2,') == '{"a": [1, 2]}'
+
+
+def test_escaped_surrogate_pairs_survive_chunk_boundaries():
+    from backend import codec
+
+    raw = '{"intent": "stock", "text": "Up \\ud83d\\ude00 today \\ud83d!"}'
+    for split in range(len(raw)):
+        parser = PartialResponseParser()
+        events = parser.feed(raw[:split]) + parser.feed(raw[split:])
+        text = "".join(value for kind, value in events if kind == "text")
+        assert text == "Up \U0001F600 today \ufffd!"  # a lone high half becomes U+FFFD
+        for kind, value in events:
+            codec.dumps_str({"type": kind, "value": value})  # encodable mid-stream
+
+    fenced = "```json\n" + raw + "\n```"  # forces the tolerant path
+    assert parse_response(fenced)["text"] == "Up \U0001F600 today \ufffd!"
+
+
+def test_parse_response_rejects_unrecoverable_output():
+    # A cut-off intent could name the wrong one, so it is dropped rather than guessed
+    with pytest.raises(ValueError):
+        parse_response('{"intent": "sto')
+    with pytest.raises(ValueError):
+        parse_response('{"intent": "stock", "te')  # repaired, but the answer is lost
+    with pytest.raises(ValueError):
+        parse_response("Sorry, I cannot help with that.")
+
+
+def test_process_query_accepts_fenced_output(make_fake_models):
+    fenced = make_fake_models(reply="```json\n" + PAYLOAD[:-1] + ",}\n```", sync=True)
+    orchestrator = IntelligenceOrchestrator(model_factory=fenced)
+    result = asyncio.run(orchestrator.process_query("stock price"))
+    orchestrator.shutdown()
+
+    assert result["text"] == json.loads(PAYLOAD)["text"]
+    assert orchestrator.resilience.stats["retries"] == 0
+
+
+def test_stream_query_with_sync_model(make_fake_models):
+    # Sync SDK shape: generate_content(stream=True) returns an iterator of chunks
+    events = collect(IntelligenceOrchestrator(model_factory=make_fake_models(reply=PAYLOAD, sync=True, chunk_size=5)))
+
+    assert events[0]["type"] == "intent"
+    assert events[0]["surface"] == {"surfaceId": "stock-ticker", "content": []}
+    text = "".join(e["delta"] for e in events if e["type"] == "text")
+    assert text == json.loads(PAYLOAD)["text"]
+    assert [e["type"] for e in events[-2:]] == ["surface", "done"]
+    assert events[-1]["result"]["surface"]["surfaceId"] == "stock-ticker"
+
+
+def test_stream_query_with_async_model(make_fake_models):
+    # Async SDK shape: generate_content_async(stream=True) resolves to an async iterator
+    events = collect(IntelligenceOrchestrator(model_factory=make_fake_models(reply=PAYLOAD, chunk_size=5)))
+
+    assert events[0]["intent"] == "stock"
+    assert events[-1]["result"]["text"] == json.loads(PAYLOAD)["text"]
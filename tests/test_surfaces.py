@@ -0,0 +1,50 @@
+import json
+
+from backend.surfaces import CompiledSurface, SurfaceRegistry, encode_json, encode_result
+
+TEMPLATE = {
+    "surfaceId": "demo",
+    "content": [
+        {"type": "Text", "props": {"text": "Hello {context}", "variant": "h2"}},
+        {"type": "Card", "props": {"title": "Static {{braces}}"}, "children": [{"type": "Text", "props": {"text": "fixed"}}]},
+    ],
+}
+
+
+def test_render_shares_static_subtrees_and_rebuilds_slots():
+    compiled = CompiledSurface(TEMPLATE)
+    first = compiled.render({"context": "a"})
+    second = compiled.render({"context": "b"})
+
+    assert compiled.slots == ["context"]
+    assert first["content"][0]["props"]["text"] == "Hello a"
+    assert second["content"][0]["props"]["text"] == "Hello b"
+    assert first["content"][1] is second["content"][1]
+    assert first["content"][1]["props"]["title"] == "Static {braces}"
+
+
+def test_render_json_matches_full_serialization():
+    compiled = CompiledSurface(TEMPLATE)
+    for context in ["plain", 'quotes " and \\ backslash', "{not a slot}", "ünïcode\n"]:
+        surface = compiled.render({"context": context})
+        assert surface.to_json() == encode_json(dict(surface))
+        assert json.loads(surface.to_json()) == surface
+
+
+def test_registry_dispatch_and_default():
+    registry = SurfaceRegistry.from_manifest()
+    assert registry.surface_id("stock") == "stock-ticker"
+    assert registry.surface_id("unknown") == "standard-surface"
+
+    result = {"intent": "stock", "text": "hi", "surface": registry.render("stock", "GOOGL"), "source": {"title": "x"}}
+    assert json.loads(encode_result(result)) == json.loads(json.dumps(result))
+
+
+def test_encode_result_splices_surfaces_on_stdlib(monkeypatch):
+    from backend import codec
+
+    monkeypatch.setattr(codec, "BACKEND", "stdlib")
+    registry = SurfaceRegistry.from_manifest()
+    result = {"intent": "weather", "surface": registry.render("weather", "sunny"), "text": "ok"}
+    assert json.loads(encode_result(result)) == json.loads(json.dumps(result))
+    assert json.loads(encode_result({"surface": registry.render("time", "")})) == {"surface": registry.render("time", "")}
@@ -0,0 +1,143 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from backend.intelligence import IntelligenceOrchestrator
+from backend.tracing import NOOP_SPAN, InMemoryExporter, OTLPHttpExporter, Tracer, parse_traceparent
+
+GROWTH = {"intent": "analytics", "text": "Growth is up.", "keywords": "metrics"}
+
+
+def traced_orchestrator(monkeypatch, models, sample_rate=1.0):
+    monkeypatch.setenv("RESPONSE_CACHE_TTL_SECONDS", "0")
+    exporter = InMemoryExporter()
+    tracer = Tracer(exporter, sample_rate=sample_rate, flush_interval=0.01)
+    return IntelligenceOrchestrator(model_factory=models, tracer=tracer), exporter
+
+
+def by_name(spans):
+    return {span.name: span for span in spans}
+
+
+def test_process_query_records_a_span_per_stage(monkeypatch, make_fake_models):
+    orchestrator, exporter = traced_orchestrator(monkeypatch, make_fake_models(reply=GROWTH, usage=(120, 12)))
+    asyncio.run(orchestrator.process_query("how are we doing"))
+    orchestrator.shutdown()
+
+    spans = by_name(exporter.spans)
+    root = spans["agent.process_query"]
+    assert {"history.prepare", "intent.classify", "model.create", "prompt.build",
+            "model.generate", "response.parse", "surface.render"} <= set(spans)
+    assert all(span.trace_id == root.trace_id for span in exporter.spans)
+    assert root.parent_id is None
+    assert spans["model.generate"].parent_id == root.span_id
+    assert spans["model.generate"].attributes["gen_ai.usage.input_tokens"] == 120
+    assert spans["model.generate"].attributes["gen_ai.usage.output_tokens"] == 12
+    assert root.attributes["intent"] == "analytics"
+    assert root.attributes["surface_id"]
+
+
+def test_cache_hit_and_fallback_attributes(monkeypatch, make_fake_models):
+    orchestrator, exporter = traced_orchestrator(monkeypatch, make_fake_models(reply=GROWTH))
+    monkeypatch.setenv("RESPONSE_CACHE_TTL_SECONDS", "60")
+    orchestrator = IntelligenceOrchestrator(model_factory=make_fake_models(reply=GROWTH), tracer=orchestrator.tracer)
+
+    async def run():
+        await orchestrator.process_query("how are we doing")
+        await orchestrator.process_query("how are we doing")
+    asyncio.run(run())
+    orchestrator.tracer.flush()
+    lookups = [span.attributes["cache.hit"] for span in exporter.spans if span.name == "cache.lookup"]
+    assert lookups == [False, True]
+
+    monkeypatch.setenv("RESPONSE_CACHE_TTL_SECONDS", "0")
+    orchestrator = IntelligenceOrchestrator(model_factory=make_fake_models(reply=KeyError("boom")), tracer=orchestrator.tracer)
+    asyncio.run(orchestrator.process_query("how are we doing"))
+    orchestrator.shutdown()
+    root = [span for span in exporter.spans if span.name == "agent.process_query"][-1]
+    assert root.attributes["fallback"] == "error"
+    assert root.error.startswith("KeyError")
+
+
+def test_stream_query_spans_share_the_root(monkeypatch, make_fake_models):
+    orchestrator, exporter = traced_orchestrator(monkeypatch, make_fake_models(reply=GROWTH))
+
+    async def run():
+        return [event async for event in orchestrator.stream_query("how are we doing")]
+    events = asyncio.run(run())
+    orchestrator.shutdown()
+
+    assert events[-1]["type"] == "done"
+    spans = by_name(exporter.spans)
+    root = spans["agent.stream_query"]
+    assert spans["model.stream"].parent_id == root.span_id
+    assert spans["surface.render"].parent_id == root.span_id
+    assert spans["model.stream"].attributes["gen_ai.usage.estimated"] is True
+    assert "stream.first_chunk_ms" in spans["model.stream"].attributes
+
+
+def test_unsampled_and_disabled_tracers_record_nothing(monkeypatch, fake_models):
+    orchestrator, exporter = traced_orchestrator(monkeypatch, fake_models, sample_rate=0.0)
+    asyncio.run(orchestrator.process_query("how are we doing"))
+    orchestrator.shutdown()
+    assert exporter.spans == []
+    assert orchestrator.tracer.stats["spans"] == 0
+
+    disabled = Tracer(None)
+    with disabled.span("anything") as span:
+        assert span is NOOP_SPAN
+
+
+def test_continue_trace_follows_the_callers_decision():
+    exporter = InMemoryExporter()
+    tracer = Tracer(exporter, sample_rate=0.0)
+    trace_id, parent_id = "4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7"
+    assert parse_traceparent(f"00-{trace_id}-{parent_id}-01") == (trace_id, parent_id, True)
+    assert parse_traceparent("garbage") is None
+
+    with tracer.continue_trace(f"00-{trace_id}-{parent_id}-01"):
+        with tracer.span("root"):
+            with tracer.span("child"):
+                pass
+    with tracer.continue_trace(f"00-{trace_id}-{parent_id}-00"):
+        with tracer.span("unsampled") as span:
+            assert span is NOOP_SPAN
+    tracer.shutdown()
+
+    root, child = sorted(exporter.spans, key=lambda s: s.name != "root")
+    assert (root.trace_id, root.parent_id) == (trace_id, parent_id)
+    assert child.parent_id == root.span_id
+
+
+def test_otlp_exporter_posts_json_to_a_collector():
+    received = []
+
+    class Collector(BaseHTTPRequestHandler):
+        def do_POST(self):
+            received.append((self.path, json.loads(self.rfile.read(int(self.headers["Content-Length"])))))
+            self.send_response(200)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Collector)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        tracer = Tracer(OTLPHttpExporter(f"http://127.0.0.1:{server.server_port}", "test-service"))
+        with tracer.span("stage") as span:
+            span.set_attributes({"cache.hit": True, "tokens": 3})
+        assert tracer.flush()
+        tracer.shutdown()
+    finally:
+        server.shutdown()
+
+    path, body = received[0]
+    assert path == "/v1/traces"
+    resource = body["resourceSpans"][0]
+    assert resource["resource"]["attributes"][0]["value"]["stringValue"] == "test-service"
+    exported = resource["scopeSpans"][0]["spans"][0]
+    assert exported["name"] == "stage"
+    assert {"key": "tokens", "value": {"intValue": "3"}} in exported["attributes"]
+    assert tracer.stats["exported"] == 1